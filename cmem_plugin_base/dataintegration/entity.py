@@ -1,6 +1,51 @@
 """Instance of any given concept."""
 
-from collections.abc import Iterator, Sequence
+import sys
+from array import array
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from itertools import islice
+from operator import itemgetter
+from types import MappingProxyType
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+    from cmem_plugin_base.dataintegration.utils.arrow import ArrowStream
+
+
+class ValueInterner:
+    """Interns repeated values, so that equal values share a single string object.
+
+    Only values of low cardinality (such as type names, language tags or flags) profit
+    from interning. Therefore, values longer than `max_length` are never interned and
+    once `max_size` distinct values have been seen, no further values are added.
+
+    :param max_size: The maximum number of distinct values to hold.
+    :param max_length: The maximum length of a value to be interned.
+    """
+
+    __slots__ = ("_values", "max_length", "max_size")
+
+    def __init__(self, max_size: int = 65536, max_length: int = 64) -> None:
+        self.max_size = max_size
+        self.max_length = max_length
+        self._values: dict[str, str] = {}
+
+    def __call__(self, value: str) -> str:
+        """Return the interned instance of the given value."""
+        if len(value) > self.max_length:
+            return value
+        interned = self._values.get(value)
+        if interned is not None:
+            return interned
+        if len(self._values) < self.max_size:
+            self._values[value] = value
+        return value
+
+    def __len__(self) -> int:
+        """Return the number of interned values."""
+        return len(self._values)
 
 
 class EntityPath:
@@ -11,10 +56,12 @@ class EntityPath:
     :param is_single_value If true, a single value is expected and supporting datasets
     will not use arrays etc. For instance, in XML, attributes will be used instead of
     nested elements.
+
+    Path strings are interned, since the same paths are used by many schemata.
     """
 
     def __init__(self, path: str, is_relation: bool = False, is_single_value: bool = False) -> None:
-        self.path = path
+        self.path = sys.intern(path)
         self.is_relation = is_relation
         self.is_single_value = is_single_value
 
@@ -49,6 +96,10 @@ class EntitySchema:
     :param path_to_root: Specifies a path which defines where this schema is located
     in the schema tree. Empty by default.
     :param sub_schemata: Nested entity schemata
+
+    The paths and sub schemata are held in tuples, so that the hash value and the path
+    index can be cached. Assigning one of the attributes resets the cache, while the
+    paths of a schema must not be modified in place.
     """
 
     def __init__(
@@ -58,14 +109,53 @@ class EntitySchema:
         path_to_root: EntityPath | None = None,
         sub_schemata: Sequence["EntitySchema"] | None = None,
     ) -> None:
+        self._hash: int | None = None
+        self._path_index: Mapping[str, int] | None = None
         self.type_uri = type_uri
         self.paths = paths
-        if path_to_root is None:
-            self.path_to_root = EntityPath("")
-        else:
-            self.path_to_root = path_to_root
+        self.path_to_root = path_to_root if path_to_root is not None else EntityPath("")
         self.sub_schemata = sub_schemata
 
+    @property
+    def type_uri(self) -> str:
+        """The entity type"""
+        return self._type_uri
+
+    @type_uri.setter
+    def type_uri(self, type_uri: str) -> None:
+        self._type_uri = type_uri
+        self._hash = None
+
+    @property
+    def paths(self) -> Sequence[EntityPath]:
+        """Ordered tuple of paths"""
+        return self._paths
+
+    @paths.setter
+    def paths(self, paths: Sequence[EntityPath]) -> None:
+        self._paths = tuple(paths)
+        self._hash = None
+        self._path_index = None
+
+    @property
+    def path_to_root(self) -> EntityPath:
+        """The location of this schema in the schema tree"""
+        return self._path_to_root
+
+    @path_to_root.setter
+    def path_to_root(self, path_to_root: EntityPath) -> None:
+        self._path_to_root = path_to_root
+        self._hash = None
+
+    @property
+    def sub_schemata(self) -> Sequence["EntitySchema"] | None:
+        """Nested entity schemata"""
+        return self._sub_schemata
+
+    @sub_schemata.setter
+    def sub_schemata(self, sub_schemata: Sequence["EntitySchema"] | None) -> None:
+        self._sub_schemata = tuple(sub_schemata) if sub_schemata is not None else None
+
     def __repr__(self) -> str:
         """Get a string representation"""
         obj = {"type_uri": self.type_uri, "paths": self.paths, "path_to_root": self.path_to_root}
@@ -73,6 +163,8 @@ class EntitySchema:
 
     def __eq__(self, other: object) -> bool:
         """Compare"""
+        if self is other:
+            return True
         return (
             isinstance(other, EntitySchema)
             and self.type_uri == other.type_uri
@@ -82,14 +174,52 @@ class EntitySchema:
         )
 
     def __hash__(self) -> int:
-        """Return a hash value based on its attributes."""
-        return hash(
-            (
-                self.type_uri,
-                tuple(self.paths),
-                self.path_to_root,
-                tuple(self.sub_schemata) if self.sub_schemata is not None else None,
-            )
+        """Return a hash value based on its attributes.
+
+        The hash value of the sub schemata is not cached, since they may be changed
+        independently.
+        """
+        if self._hash is None:
+            self._hash = hash((self.type_uri, self.paths, self.path_to_root))
+        return hash((self._hash, self.sub_schemata))
+
+    @property
+    def path_index(self) -> Mapping[str, int]:
+        """Map each path string to its column in this schema.
+
+        If a path occurs multiple times, it is mapped to its first column.
+        """
+        if self._path_index is None:
+            index: dict[str, int] = {}
+            for column, path in enumerate(self.paths):
+                index.setdefault(path.path, column)
+            self._path_index = MappingProxyType(index)
+        return self._path_index
+
+    def index_of(self, path: str | EntityPath) -> int:
+        """Get the column of a path in this schema.
+
+        Raises a KeyError if the schema does not contain the path.
+        """
+        key = path.path if isinstance(path, EntityPath) else path
+        try:
+            return self.path_index[key]
+        except KeyError:
+            raise KeyError(f"Path '{key}' not found in schema '{self.type_uri}'.") from None
+
+    def projector(self, target: "EntitySchema", strict: bool = True) -> "SchemaProjector":
+        """Compile a projector that maps entities of this schema onto a target schema."""
+        return SchemaProjector(source=self, target=target, strict=strict)
+
+    def compact(self) -> "EntitySchema":
+        """Return an equal schema with an interned type URI and compact sub schemata."""
+        return EntitySchema(
+            type_uri=sys.intern(self.type_uri),
+            paths=self.paths,
+            path_to_root=self.path_to_root,
+            sub_schemata=tuple(_.compact() for _ in self.sub_schemata)
+            if self.sub_schemata is not None
+            else None,
         )
 
 
@@ -107,6 +237,105 @@ class Entity:
         self.uri = uri
         self.values = values
 
+    def compact(self, interner: ValueInterner | None = None) -> "Entity":
+        """Return an equal entity that holds its values in immutable tuples.
+
+        :param interner: If provided, values are interned, so that repeated values
+            share a single string object.
+        """
+        if interner is None:
+            values = tuple(tuple(_) for _ in self.values)
+        else:
+            values = tuple(tuple(map(interner, _)) for _ in self.values)
+        return Entity(uri=self.uri, values=values)
+
+
+class EntityBatch:
+    """A chunk of entities, stored column by column.
+
+    Instead of one `Entity` object per row, a batch holds the URIs of all rows and,
+    for each path of the schema, one flat buffer with the values of all rows plus
+    the row offsets into this buffer. The values of row `i` in column `c` are
+    `values[c][offsets[c][i]:offsets[c][i + 1]]`.
+
+    :param schema: All entities in this batch conform to this entity schema.
+    :param uris: The URIs of the entities in this batch.
+    :param values: One flat value buffer for each path in the schema.
+    :param offsets: Row offsets into the value buffer for each path in the schema.
+        Each sequence holds `len(uris) + 1` ascending offsets, starting with 0.
+    """
+
+    __slots__ = ("offsets", "schema", "uris", "values")
+
+    def __init__(
+        self,
+        schema: EntitySchema,
+        uris: Sequence[str],
+        values: Sequence[Sequence[str]],
+        offsets: Sequence[Sequence[int]],
+    ) -> None:
+        if len(values) != len(schema.paths) or len(offsets) != len(schema.paths):
+            raise ValueError(
+                f"Expected {len(schema.paths)} columns but got {len(values)} value buffers "
+                f"and {len(offsets)} offset sequences."
+            )
+        for column_offsets in offsets:
+            if len(column_offsets) != len(uris) + 1:
+                raise ValueError(
+                    f"Expected {len(uris) + 1} offsets per column but got {len(column_offsets)}."
+                )
+        self.schema = schema
+        self.uris = uris
+        self.values = values
+        self.offsets = offsets
+
+    @classmethod
+    def from_entities(cls, entities: Iterable[Entity], schema: EntitySchema) -> "EntityBatch":
+        """Create a batch from a collection of row entities."""
+        uris: list[str] = []
+        values: list[list[str]] = [[] for _ in schema.paths]
+        offsets: list[array[int]] = [array("Q", [0]) for _ in schema.paths]
+        for entity in entities:
+            uris.append(entity.uri)
+            for buffer, column_offsets, cell in zip(values, offsets, entity.values, strict=True):
+                buffer.extend(cell)
+                column_offsets.append(len(buffer))
+        return cls(schema=schema, uris=uris, values=values, offsets=offsets)
+
+    def __len__(self) -> int:
+        """Return the number of entities in this batch."""
+        return len(self.uris)
+
+    def __repr__(self) -> str:
+        """Get a string representation"""
+        return f"EntityBatch({{'schema': {self.schema!r}, 'size': {len(self)}}})"
+
+    def column(self, index: int) -> list[Sequence[str]]:
+        """Get the values of all entities for the path at the given schema index."""
+        buffer = self.values[index]
+        column_offsets = self.offsets[index]
+        return [
+            buffer[start:end]
+            for start, end in zip(column_offsets, islice(column_offsets, 1, None), strict=False)
+        ]
+
+    def row_values(self, row: int) -> list[Sequence[str]]:
+        """Get the values of a single entity, with one sequence of values per path."""
+        return [
+            buffer[column_offsets[row] : column_offsets[row + 1]]
+            for buffer, column_offsets in zip(self.values, self.offsets, strict=True)
+        ]
+
+    def entity(self, row: int) -> Entity:
+        """Get a single entity of this batch."""
+        return Entity(uri=self.uris[row], values=self.row_values(row))
+
+    def __iter__(self) -> Iterator[Entity]:
+        """Iterate over the entities of this batch as row entities."""
+        columns = [self.column(index) for index in range(len(self.values))]
+        for row, uri in enumerate(self.uris):
+            yield Entity(uri=uri, values=[column[row] for column in columns])
+
 
 class Entities:
     """Holds a collection of entities and their schema.
@@ -126,3 +355,337 @@ class Entities:
         self.entities = entities
         self.schema = schema
         self.sub_entities = sub_entities
+
+    @classmethod
+    def from_batches(
+        cls,
+        batches: Iterable[EntityBatch],
+        schema: EntitySchema,
+        sub_entities: Sequence["Entities"] | None = None,
+    ) -> "Entities":
+        """Create entities from a collection of batches that conform to the given schema."""
+        return Entities(
+            entities=(entity for batch in batches for entity in batch),
+            schema=schema,
+            sub_entities=sub_entities,
+        )
+
+    def compact(self, interner: ValueInterner | None = None) -> "Entities":
+        """Return entities that are held in compact form, see `Entity.compact`.
+
+        The entities are converted lazily while being iterated. Sub entities are
+        converted as well. If no interner is provided, a new one is shared by all
+        entities.
+        """
+        if interner is None:
+            interner = ValueInterner()
+        return Entities(
+            entities=(_.compact(interner) for _ in self.entities),
+            schema=self.schema.compact(),
+            sub_entities=[_.compact(interner) for _ in self.sub_entities]
+            if self.sub_entities is not None
+            else None,
+        )
+
+    @classmethod
+    def from_arrow(cls, stream: "ArrowStream | pa.RecordBatchReader") -> "Entities":
+        """Create entities from a stream of Arrow record batches.
+
+        Needs the optional pyarrow dependency, see `utils.arrow.from_arrow`.
+        """
+        from cmem_plugin_base.dataintegration.utils.arrow import from_arrow  # noqa: PLC0415
+
+        return from_arrow(stream)
+
+    def to_arrow(self, batch_size: int = 10000) -> "ArrowStream":
+        """Convert the entities to a stream of Arrow record batches.
+
+        Needs the optional pyarrow dependency, see `utils.arrow.to_arrow`.
+        """
+        from cmem_plugin_base.dataintegration.utils.arrow import to_arrow  # noqa: PLC0415
+
+        return to_arrow(self, batch_size)
+
+    def iter_batches(self, size: int) -> Iterator[EntityBatch]:
+        """Iterate over the entities in batches of at most `size` entities.
+
+        Consumes the underlying entities iterator, i.e., the entities can either be
+        iterated row by row or in batches, but not both.
+        """
+        if size < 1:
+            raise ValueError(f"Batch size must be positive, but got {size}.")
+        entities = iter(self.entities)
+        while batch := EntityBatch.from_entities(islice(entities, size), self.schema):
+            yield batch
+
+    def map(
+        self, function: Callable[[Entity], Entity], schema: EntitySchema | None = None
+    ) -> "EntityPipeline":
+        """Lazily apply a function to each entity.
+
+        :param function: Maps an entity to a new entity.
+        :param schema: The schema of the new entities, if it differs from the current one.
+        """
+        return self._append(_PipelineStep(_MAP, function), schema)
+
+    def filter(self, predicate: Callable[[Entity], bool]) -> "EntityPipeline":
+        """Lazily drop all entities for which the predicate returns false.
+
+        Sub entities are kept, even if they are only referenced by dropped entities.
+        """
+        return self._append(_PipelineStep(_FILTER, predicate), None)
+
+    def flat_map(
+        self, function: Callable[[Entity], Iterable[Entity]], schema: EntitySchema | None = None
+    ) -> "EntityPipeline":
+        """Lazily replace each entity by any number of entities.
+
+        :param function: Maps an entity to a collection of new entities.
+        :param schema: The schema of the new entities, if it differs from the current one.
+        """
+        return self._append(_PipelineStep(_FLAT_MAP, function), schema)
+
+    def batch(
+        self,
+        size: int,
+        function: Callable[[EntityBatch], Iterable[Entity]],
+        schema: EntitySchema | None = None,
+    ) -> "EntityPipeline":
+        """Lazily apply a function to batches of at most `size` entities.
+
+        :param size: The maximum number of entities in a batch.
+        :param function: Maps a batch to a collection of new entities. As batches are
+            iterable, the function may return a new batch.
+        :param schema: The schema of the new entities, if it differs from the current one.
+        """
+        if size < 1:
+            raise ValueError(f"Batch size must be positive, but got {size}.")
+        return self._append(_PipelineStep(_BATCH, function, size, self.schema), schema)
+
+    def select_paths(self, paths: Sequence[str | EntityPath]) -> "EntityPipeline":
+        """Lazily restrict the entities to the given paths of the current schema.
+
+        Raises a KeyError if the current schema does not contain one of the paths, like
+        `EntitySchema.index_of`.
+        """
+        selected = [self.schema.paths[self.schema.index_of(_)] for _ in paths]
+        schema = EntitySchema(
+            type_uri=self.schema.type_uri,
+            paths=selected,
+            path_to_root=self.schema.path_to_root,
+            sub_schemata=self.schema.sub_schemata,
+        )
+        return self._append(_PipelineStep.select(self.schema.projector(schema)), schema)
+
+    def _plan(self) -> tuple[Iterable[Entity], tuple["_PipelineStep", ...]]:
+        """Get the source entities and the pipeline steps that are applied to them."""
+        return self.entities, ()
+
+    def _append(self, step: "_PipelineStep", schema: EntitySchema | None) -> "EntityPipeline":
+        """Create a new pipeline that applies an additional step."""
+        source, steps = self._plan()
+        if step.kind == _SELECT and steps and steps[-1].kind == _SELECT:
+            # two projections are fused to a single one from the original schema
+            previous: SchemaProjector = steps[-1].projector  # type: ignore[assignment]
+            current: SchemaProjector = step.projector  # type: ignore[assignment]
+            step = _PipelineStep.select(previous.source.projector(current.target))
+            steps = steps[:-1]
+        return EntityPipeline(
+            source=source,
+            steps=(*steps, step),
+            schema=schema if schema is not None else self.schema,
+            sub_entities=self.sub_entities,
+        )
+
+
+class SchemaProjector:
+    """Maps entities of a source schema onto a target schema.
+
+    The columns of the target paths are resolved once when the projector is created,
+    so that projecting an entity only needs a tuple index per path. Paths are matched
+    by their path string.
+
+    :param source: The schema of the incoming entities.
+    :param target: The schema the entities are projected onto, e.g., the schema of a
+        `FixedSchemaPort`.
+    :param strict: If true, all target paths must be present in the source schema.
+        Otherwise, missing paths are projected to empty values.
+    """
+
+    __slots__ = ("_getter", "indices", "source", "target")
+
+    def __init__(self, source: EntitySchema, target: EntitySchema, strict: bool = True) -> None:
+        path_index = source.path_index
+        indices = tuple(path_index.get(_.path) for _ in target.paths)
+        missing = [
+            path.path for path, column in zip(target.paths, indices, strict=True) if column is None
+        ]
+        if strict and missing:
+            raise ValueError(
+                f"Paths {missing} of schema '{target.type_uri}' not found "
+                f"in schema '{source.type_uri}'."
+            )
+        self.source = source
+        self.target = target
+        self.indices = indices
+        self._getter = _compile_getter(indices)
+
+    @property
+    def is_identity(self) -> bool:
+        """Check if the projection returns the values unchanged."""
+        return self.indices == tuple(range(len(self.source.paths)))
+
+    def __call__(self, values: Sequence[Sequence[str]]) -> tuple[Sequence[str], ...]:
+        """Project the values of an entity of the source schema."""
+        return self._getter(values)
+
+    def entity(self, entity: Entity) -> Entity:
+        """Project an entity of the source schema."""
+        return Entity(uri=entity.uri, values=self._getter(entity.values))
+
+    def entities(self, entities: Entities) -> Entities:
+        """Project a collection of entities of the source schema."""
+        return Entities(
+            entities=map(self.entity, entities.entities),
+            schema=self.target,
+            sub_entities=entities.sub_entities,
+        )
+
+
+def _compile_getter(
+    indices: tuple[int | None, ...],
+) -> Callable[[Sequence[Sequence[str]]], tuple[Sequence[str], ...]]:
+    """Compile a function that selects the values at the given indices."""
+    if None in indices:
+        return lambda values: tuple(values[_] if _ is not None else () for _ in indices)
+    match indices:
+        case ():
+            return lambda _: ()
+        case (index,):
+            return lambda values: (values[index],)  # type: ignore[index]
+        case _:
+            return itemgetter(*indices)
+
+
+_MAP = "map"
+_FILTER = "filter"
+_SELECT = "select"
+_FLAT_MAP = "flat_map"
+_BATCH = "batch"
+
+
+class _PipelineStep:
+    """A single step of an entity pipeline."""
+
+    __slots__ = ("function", "kind", "projector", "schema", "size")
+
+    def __init__(
+        self,
+        kind: str,
+        function: Callable,
+        size: int = 0,
+        schema: EntitySchema | None = None,
+        projector: SchemaProjector | None = None,
+    ) -> None:
+        self.kind = kind
+        self.function = function
+        self.size = size
+        self.schema = schema
+        self.projector = projector
+
+    @classmethod
+    def select(cls, projector: SchemaProjector) -> "_PipelineStep":
+        """Create a step that projects entities onto another schema."""
+        return cls(_SELECT, projector.entity, projector=projector)
+
+
+class EntityPipeline(Entities):
+    """Entities that are computed lazily by applying a pipeline of steps to a source.
+
+    Pipelines are created by the combinators of `Entities`, such as `map` or `filter`.
+    Each combinator returns a new pipeline with an additional step, the source is not
+    iterated until the entities of the pipeline are iterated. When iterated, all
+    consecutive per-entity steps are fused into a single loop, so stacking steps does not
+    stack generators.
+
+    :param source: The source entities.
+    :param steps: The steps that are applied to the source entities.
+    :param schema: The schema of the entities after applying all steps.
+    :param sub_entities: Additional entity collections.
+    """
+
+    def __init__(
+        self,
+        source: Iterable[Entity],
+        steps: tuple[_PipelineStep, ...],
+        schema: EntitySchema,
+        sub_entities: Sequence[Entities] | None = None,
+    ) -> None:
+        super().__init__(entities=iter(()), schema=schema, sub_entities=sub_entities)
+        self._source = source
+        self._steps = steps
+        self._iterator: Iterator[Entity] | None = None
+
+    @property  # type: ignore[override]
+    def entities(self) -> Iterator[Entity]:
+        """Get the iterator over the entities of this pipeline."""
+        if self._iterator is None:
+            self._iterator = _execute(self._source, self._steps)
+        return self._iterator
+
+    @entities.setter
+    def entities(self, entities: Iterator[Entity]) -> None:
+        self._iterator = entities
+
+    def _plan(self) -> tuple[Iterable[Entity], tuple[_PipelineStep, ...]]:
+        """Get the source entities and the pipeline steps that are applied to them."""
+        return self._source, self._steps
+
+
+def _execute(source: Iterable[Entity], steps: Sequence[_PipelineStep]) -> Iterator[Entity]:
+    """Execute pipeline steps, fusing consecutive per-entity steps into one loop."""
+    entities = iter(source)
+    start = 0
+    for index, step in enumerate(steps):
+        if step.kind in (_FLAT_MAP, _BATCH):
+            entities = _fused(entities, steps[start:index])
+            entities = _expand(entities, step)
+            start = index + 1
+    return _fused(entities, steps[start:])
+
+
+def _fused(entities: Iterator[Entity], steps: Sequence[_PipelineStep]) -> Iterator[Entity]:
+    """Apply a sequence of map, filter and select steps in a single loop."""
+    if not steps:
+        return entities
+    if len(steps) == 1 and steps[0].kind != _FILTER:
+        return map(steps[0].function, entities)
+    return _fused_loop(entities, [(_.kind == _FILTER, _.function) for _ in steps])
+
+
+def _fused_loop(
+    entities: Iterator[Entity], functions: Sequence[tuple[bool, Callable]]
+) -> Iterator[Entity]:
+    """Apply functions to each entity, dropping the entity if a filter function fails."""
+    for entity in entities:
+        current = entity
+        for is_filter, function in functions:
+            if is_filter:
+                if not function(current):
+                    break
+            else:
+                current = function(current)
+        else:
+            yield current
+
+
+def _expand(entities: Iterator[Entity], step: _PipelineStep) -> Iterator[Entity]:
+    """Apply a flat map or batch step."""
+    function = step.function
+    if step.kind == _FLAT_MAP:
+        for entity in entities:
+            yield from function(entity)
+    else:
+        schema: EntitySchema = step.schema  # type: ignore[assignment]
+        while batch := EntityBatch.from_entities(islice(entities, step.size), schema):
+            yield from function(batch)
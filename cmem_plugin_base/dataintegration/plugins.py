@@ -1,11 +1,17 @@
 """All Plugins base classes."""
 
 import logging
-from collections.abc import Sequence
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from typing import TYPE_CHECKING
 
 from cmem_plugin_base.dataintegration.context import ExecutionContext
-from cmem_plugin_base.dataintegration.entity import Entities
+from cmem_plugin_base.dataintegration.entity import Entities, Entity, EntityBatch, EntitySchema
 from cmem_plugin_base.dataintegration.ports import InputPorts, Port
+from cmem_plugin_base.dataintegration.utils.processes import process_pool, worker_count
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
 
 
 class PluginLogger:
@@ -84,6 +90,86 @@ class WorkflowPlugin(PluginBase):
         """
 
 
+def parallel_map(  # noqa: PLR0913
+    entities: Entities,
+    function: Callable[[Entity], Entity] | Callable[[EntityBatch], Iterable[Entity]],
+    *,
+    schema: EntitySchema | None = None,
+    per_batch: bool = False,
+    chunk_size: int = 1000,
+    max_workers: int | None = None,
+    max_in_flight: int | None = None,
+) -> Entities:
+    """Apply a function to all entities using a pool of worker processes.
+
+    The entities are sent to the workers in chunks and the results are returned in the
+    order of the input entities. At most `max_in_flight` chunks are submitted at a time,
+    so a slow consumer does not cause the input to be read into memory. Nothing is
+    computed until the returned entities are iterated.
+
+    :param entities: The input entities. Sub entities are passed through unchanged.
+    :param function: A picklable function, i.e., a function defined at the top level of
+        an importable module. Maps an entity to a new entity or, if `per_batch` is
+        true, a batch to a collection of entities.
+    :param schema: The schema of the new entities, if it differs from the input schema.
+    :param per_batch: Whether the function is applied to batches instead of entities.
+    :param chunk_size: The number of entities that are sent to a worker at once.
+    :param max_workers: The number of worker processes, defaults to the number of CPUs.
+    :param max_in_flight: The maximum number of chunks that are processed or waiting to
+        be consumed, defaults to twice the number of workers.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size must be positive, but got {chunk_size}.")
+    if max_in_flight is not None and max_in_flight < 1:
+        raise ValueError(f"Maximum in-flight chunks must be positive, but got {max_in_flight}.")
+    worker = _apply_to_batch if per_batch else _apply_to_entities
+    return Entities(
+        entities=_parallel_map(
+            entities.iter_batches(chunk_size), worker, function, max_workers, max_in_flight
+        ),
+        schema=schema if schema is not None else entities.schema,
+        sub_entities=entities.sub_entities,
+    )
+
+
+def _parallel_map(
+    batches: Iterator[EntityBatch],
+    worker: Callable[[Callable, EntityBatch], Iterable[Entity]],
+    function: Callable,
+    max_workers: int | None,
+    max_in_flight: int | None,
+) -> Iterator[Entity]:
+    """Process batches in a process pool and yield the results in order."""
+    workers = worker_count(max_workers)
+    limit = max_in_flight if max_in_flight is not None else 2 * workers
+    with process_pool(workers) as executor:
+        pending: deque[Future[Iterable[Entity]]] = deque()
+        try:
+            for batch in batches:
+                if len(pending) >= limit:
+                    yield from pending.popleft().result()
+                pending.append(executor.submit(worker, function, batch))
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _apply_to_entities(function: Callable[[Entity], Entity], batch: EntityBatch) -> list[Entity]:
+    """Apply a function to each entity of a batch, executed by a worker process."""
+    return [function(_) for _ in batch]
+
+
+def _apply_to_batch(
+    function: Callable[[EntityBatch], Iterable[Entity]], batch: EntityBatch
+) -> Iterable[Entity]:
+    """Apply a function to a batch, executed by a worker process."""
+    result = function(batch)
+    # batches are returned as they are, since they are transferred more efficiently
+    return result if isinstance(result, EntityBatch) else list(result)
+
+
 class TransformPlugin(PluginBase):
     """Base class of all transform operator plugins."""
 
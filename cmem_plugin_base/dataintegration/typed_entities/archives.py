@@ -0,0 +1,190 @@
+"""Pool of open zip archives shared by the entries read from them."""
+
+import io
+import threading
+import zipfile
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from functools import partial
+from typing import IO
+
+DEFAULT_ARCHIVE_POOL_SIZE = 8
+"""Default number of archives that are kept open."""
+
+
+class _PooledArchive:
+    """An open archive and the number of its entries that are open."""
+
+    __slots__ = ("archive", "evicted", "references")
+
+    def __init__(self, archive: zipfile.ZipFile) -> None:
+        self.archive = archive
+        self.references = 0
+        self.evicted = False
+
+
+class _PooledEntry(io.BufferedIOBase):
+    """An entry of a pooled archive, which releases the archive when it is closed."""
+
+    def __init__(self, entry: IO[bytes], release: Callable[[], None]) -> None:
+        self._entry = entry
+        self._release: Callable[[], None] | None = release
+        self.name = entry.name
+
+    def readable(self) -> bool:
+        """Entries are readable."""
+        return True
+
+    def seekable(self) -> bool:
+        """Check if the entry supports seeking."""
+        return self._entry.seekable()
+
+    def read(self, size: int | None = -1) -> bytes:
+        """Read up to size bytes, all remaining bytes by default."""
+        return self._entry.read(-1 if size is None else size)
+
+    def read1(self, size: int = -1) -> bytes:
+        """Read up to size bytes with at most one read of the archive."""
+        return self._entry.read1(size)  # type: ignore[attr-defined, no-any-return]
+
+    def peek(self, size: int = 0) -> bytes:
+        """Get buffered bytes without advancing the position."""
+        return self._entry.peek(size)  # type: ignore[attr-defined, no-any-return]
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Change the position within the entry."""
+        return self._entry.seek(offset, whence)
+
+    def tell(self) -> int:
+        """Get the position within the entry."""
+        return self._entry.tell()
+
+    def close(self) -> None:
+        """Close the entry and release its archive."""
+        if self._release is not None:
+            try:
+                self._entry.close()
+            finally:
+                self._release()
+                self._release = None
+        super().close()
+
+
+class ArchivePool:
+    """A pool of open zip archives with least recently used eviction.
+
+    Reading an entry from an archive requires parsing its central directory, and for
+    remote files downloading the archive. The pool keeps the most recently used
+    archives open, so that many entries are read from a single open archive. Archives
+    are keyed by their path and version, so changed archives are opened again.
+
+    Each open entry holds a reference to its archive. Evicted archives are closed as
+    soon as none of their entries is open anymore. The pool is thread-safe.
+
+    :param max_size: The number of archives that are kept open, 0 disables pooling.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_ARCHIVE_POOL_SIZE) -> None:
+        if max_size < 0:
+            raise ValueError("The size of the archive pool must not be negative.")
+        self.max_size = max_size
+        self._archives: OrderedDict[Hashable, _PooledArchive] = OrderedDict()
+        self._requests: OrderedDict[Hashable, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Get the number of pooled archives."""
+        return len(self._archives)
+
+    def __contains__(self, key: object) -> bool:
+        """Check if an archive is pooled."""
+        return key in self._archives
+
+    def open(
+        self, key: Hashable, entry_path: str, open_archive: Callable[[], zipfile.ZipFile]
+    ) -> IO[bytes]:
+        """Open an entry of a pooled archive, opening and pooling the archive if needed.
+
+        Raises a KeyError if the archive does not contain the entry.
+
+        :param key: The key of the archive, e.g. its path and version.
+        :param entry_path: The path of the entry within the archive.
+        :param open_archive: Opens the archive if it is not pooled.
+        """
+        pooled = self._acquire(key, open_archive)
+        try:
+            entry = pooled.archive.open(entry_path, "r")
+        except BaseException:
+            self._release(pooled)
+            raise
+        return _PooledEntry(entry, partial(self._release, pooled))  # type: ignore[return-value]
+
+    def repeated(self, key: Hashable) -> bool:
+        """Record a request of an archive, returns True if it has been requested before.
+
+        This allows to read a single entry without opening the archive for random access,
+        and to pool the archive once more entries are read from it.
+        """
+        with self._lock:
+            if key in self._requests:
+                self._requests.move_to_end(key)
+                return True
+            self._requests[key] = None
+            while len(self._requests) > 4 * self.max_size:
+                self._requests.popitem(last=False)
+            return False
+
+    def clear(self) -> None:
+        """Evict all archives, archives with open entries are closed with their last entry."""
+        with self._lock:
+            evicted = list(self._archives.values())
+            self._archives.clear()
+            self._requests.clear()
+        self._close(evicted)
+
+    def _acquire(
+        self, key: Hashable, open_archive: Callable[[], zipfile.ZipFile]
+    ) -> _PooledArchive:
+        """Get a pooled archive and reference it."""
+        with self._lock:
+            pooled = self._archives.get(key)
+            if pooled is not None:
+                self._archives.move_to_end(key)
+                pooled.references += 1
+                return pooled
+        # archives are opened without holding the lock, since this may take a while
+        archive = open_archive()
+        with self._lock:
+            pooled = self._archives.get(key)
+            if pooled is None:
+                pooled = self._archives[key] = _PooledArchive(archive)
+                archive = None  # type: ignore[assignment]
+            pooled.references += 1
+            evicted = []
+            while len(self._archives) > self.max_size:
+                evicted.append(self._archives.popitem(last=False)[1])
+        if archive is not None:
+            archive.close()
+        self._close(evicted)
+        return pooled
+
+    def _release(self, pooled: _PooledArchive) -> None:
+        """Release a reference to a pooled archive."""
+        with self._lock:
+            pooled.references -= 1
+            close = pooled.evicted and not pooled.references
+        if close:
+            pooled.archive.close()
+
+    def _close(self, evicted: list[_PooledArchive]) -> None:
+        """Mark archives as evicted and close the ones without open entries."""
+        for pooled in evicted:
+            with self._lock:
+                pooled.evicted = True
+                close = not pooled.references
+            if close:
+                pooled.archive.close()
+
+
+ARCHIVE_POOL = ArchivePool()
+"""The archive pool that is shared by all files, see `File.archive_pool`."""
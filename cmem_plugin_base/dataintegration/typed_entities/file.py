@@ -1,29 +1,75 @@
 """File entities"""
 
+import codecs
 import gzip
 import io
+import mimetypes
+import mmap
+import os
+import shutil
+import struct
+import tempfile
 import zipfile
 from abc import abstractmethod
-from collections.abc import Iterator
-from contextlib import contextmanager
-from io import BytesIO
+from collections.abc import Hashable, Iterator
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
 from typing import IO
 
-from cmem.cmempy.workspace.projects.resources.resource import get_resource_response
+from cmem.cmempy.workspace.projects.resources.resource import (
+    get_resource_metadata,
+    get_resource_response,
+)
+from requests import HTTPError
 
 from cmem_plugin_base.dataintegration.entity import Entity, EntityPath
 from cmem_plugin_base.dataintegration.typed_entities import instance_uri, path_uri, type_uri
+from cmem_plugin_base.dataintegration.typed_entities.archives import ARCHIVE_POOL, ArchivePool
 from cmem_plugin_base.dataintegration.typed_entities.typed_entities import (
     TypedEntitySchema,
 )
 
+STREAM_BUFFER_SIZE = 64 * 1024
+"""Number of bytes that are read from a file at once."""
+
+SNIFF_SIZE = 1024
+"""Number of bytes at the start of the content that are checked to detect text."""
+
+SPOOL_MEMORY_LIMIT = 16 * 1024 * 1024
+"""Number of bytes of an archive that are spooled in memory before using a temporary file."""
+
+_LOCAL_FILE_HEADER = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_FILE_SIGNATURE = b"PK\x03\x04"
+_CENTRAL_DIRECTORY_SIGNATURES = (b"PK\x01\x02", b"PK\x05\x06")
+_ENCRYPTED_FLAG = 0x1
+_DATA_DESCRIPTOR_FLAG = 0x8
+_UTF8_FLAG = 0x800
+_ZIP64_SIZE = 0xFFFFFFFF
+
+_SIGNATURES = (
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\x1f\x8b", "application/gzip"),
+)
+"""Leading bytes of common binary formats and their MIME types."""
+
+
+def _buffered(stream: IO[bytes]) -> io.BufferedReader:
+    """Get a buffered reader of a stream, which supports `peek`."""
+    if isinstance(stream, io.BufferedReader):
+        return stream
+    return io.BufferedReader(stream, STREAM_BUFFER_SIZE)  # type: ignore[arg-type]
+
 
 def _is_gzip(stream: io.BufferedReader) -> bool:
-    """Check if a stream contains gzip-compressed data."""
-    head = stream.read(2)
-    stream.seek(0)
-    return head == b"\x1f\x8b"
+    """Check if a stream contains gzip-compressed data, without consuming it."""
+    return stream.peek(2)[:2] == b"\x1f\x8b"
 
 
 def _prepare_stream_for_processing(
@@ -37,6 +83,8 @@ def _prepare_stream_for_processing(
     3. Detects if the content is text or binary
     4. Returns appropriate stream wrapper
 
+    The content is sniffed with `peek`, so the stream does not need to be seekable.
+
     Args:
         input_stream: The input stream to process (should be in binary mode)
 
@@ -46,44 +94,166 @@ def _prepare_stream_for_processing(
         - Boolean indicating if the content is text (True) or binary (False)
 
     """
-    buffered = io.BufferedReader(input_stream)  # type: ignore[type-var]
+    buffered, _, sample = _sniff(input_stream)
+    if not _is_utf8(sample):
+        return buffered, False
+    return io.TextIOWrapper(buffered, encoding="utf-8"), True
+
 
-    decompressed_stream = gzip.GzipFile(fileobj=buffered) if _is_gzip(buffered) else buffered  # type: ignore[arg-type]
+def _sniff(input_stream: IO[bytes]) -> tuple[io.BufferedReader, bool, bytes]:
+    """Get the decompressed stream, whether it is gzip compressed and a sample of its content."""
+    buffered = _buffered(input_stream)
+    compressed = _is_gzip(buffered)
+    if compressed:
+        buffered = _buffered(gzip.GzipFile(fileobj=buffered, mode="rb"))  # type: ignore[arg-type]
+    return buffered, compressed, buffered.peek(SNIFF_SIZE)[:SNIFF_SIZE]
 
-    sample = decompressed_stream.read(1024)
-    decompressed_stream.seek(0)
 
+def _is_utf8(sample: bytes) -> bool:
+    """Check if a sample is UTF-8 text, it may end within a multibyte character."""
     try:
-        sample.decode("utf-8")
-        is_text = True
-        stream_for_processing = io.TextIOWrapper(decompressed_stream, encoding="utf-8")
+        codecs.getincrementaldecoder("utf-8")().decode(sample)
     except UnicodeDecodeError:
-        is_text = False
-        stream_for_processing = decompressed_stream  # type: ignore[assignment]
+        return False
+    return True
+
+
+def _detect_mime(name: str, sample: bytes, is_text: bool) -> str:
+    """Detect the MIME type of content by its leading bytes or the extension of its name."""
+    for signature, mime in _SIGNATURES:
+        if sample.startswith(signature):
+            return mime
+    guessed, _ = mimetypes.guess_type(name, strict=False)
+    if guessed is not None:
+        return guessed
+    if not is_text:
+        return "application/octet-stream"
+    head = sample.lstrip()
+    if head.startswith(b"<?xml"):
+        return "application/xml"
+    if head[:1] in (b"{", b"["):
+        return "application/json"
+    return "text/plain"
+
+
+def _stream_zip_entry(stream: io.BufferedReader, entry_path: str) -> IO[bytes] | None:
+    """Open an entry of an archive by reading its local file headers sequentially.
+
+    The data of the entries before the requested entry is skipped. Returns None if the
+    archive cannot be read sequentially, e.g. if the size of an entry is stored after
+    its data, in which case the archive must be opened with random access.
+
+    Raises a KeyError if the archive does not contain the entry.
+    """
+    while True:
+        header = stream.read(_LOCAL_FILE_HEADER.size)
+        if header[:4] in _CENTRAL_DIRECTORY_SIGNATURES:
+            raise KeyError(entry_path)
+        if len(header) < _LOCAL_FILE_HEADER.size or header[:4] != _LOCAL_FILE_SIGNATURE:
+            return None
+        (_, _, _, flags, method, _, _, crc, compress_size, file_size, name_size, extra_size) = (
+            _LOCAL_FILE_HEADER.unpack(header)
+        )
+        if flags & (_ENCRYPTED_FLAG | _DATA_DESCRIPTOR_FLAG) or _ZIP64_SIZE in (
+            compress_size,
+            file_size,
+        ):
+            return None
+        name = stream.read(name_size).decode("utf-8" if flags & _UTF8_FLAG else "cp437")
+        stream.read(extra_size)
+        if name == entry_path:
+            info = zipfile.ZipInfo(name)
+            info.flag_bits = flags
+            info.compress_type = method
+            info.compress_size = compress_size
+            info.file_size = file_size
+            info.CRC = crc
+            return zipfile.ZipExtFile(stream, "r", info, close_fileobj=True)  # type: ignore[return-value]
+        while compress_size:
+            skipped = len(stream.read(min(compress_size, STREAM_BUFFER_SIZE)))
+            if not skipped:
+                return None
+            compress_size -= skipped
+
+
+def _spool_archive(stream: IO[bytes]) -> zipfile.ZipFile:
+    """Open an archive for random access, by spooling it to a temporary file first.
+
+    The temporary file is removed when the archive is closed.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_LIMIT)  # noqa: SIM115
+    try:
+        with stream:
+            shutil.copyfileobj(stream, spool, STREAM_BUFFER_SIZE)
+        spool.seek(0)
+        return zipfile.ZipFile(spool, "r")
+    except BaseException:
+        spool.close()
+        raise
+
+
+def _iter_lines(view: memoryview) -> Iterator[memoryview]:
+    """Iterate over the lines of a buffer as slices, which keep their line break."""
+    find = getattr(view.obj, "find", None)
+    if find is None:
+        find = view.tobytes().find
+    size = view.nbytes
+    start = 0
+    while start < size:
+        end = find(b"\n", start)
+        end = size if end < 0 else end + 1
+        yield view[start:end]
+        start = end
+
+
+def _release(view: memoryview, mapping: mmap.mmap | None = None) -> None:
+    """Release a buffer, unless slices of it are still in use, then it is left to the GC."""
+    with suppress(BufferError):
+        view.release()
+        if mapping is not None:
+            mapping.close()
+
+
+@dataclass(frozen=True)
+class FileMetadata:
+    """The result of probing the content of a file.
+
+    :param compression: The compression of the content, "gzip" or None.
+    :param is_text: Whether the decompressed content is UTF-8 text.
+    :param size: The size of the stored file in bytes, None if unknown, e.g. for entries
+        of archives.
+    :param mime: The detected MIME type of the stored file.
+    :param version: The version of the file that has been probed, see `File.version`.
+    """
 
-    return stream_for_processing, is_text
+    compression: str | None
+    is_text: bool
+    size: int | None
+    mime: str
+    version: Hashable
 
 
 class _TextToBytesWrapper:
-    """Helper class to wrap a text stream and provide a bytes interface."""
+    """Helper class to wrap a text stream and provide a bytes interface in an encoding."""
 
-    def __init__(self, text_stream: io.TextIOWrapper) -> None:
+    def __init__(self, text_stream: io.TextIOWrapper, encoding: str = "utf-8") -> None:
         self._text_stream = text_stream
+        self._encoding = encoding
 
     def read(self, size: int = -1) -> bytes:
         """Read and encode text as bytes."""
         text_content = self._text_stream.read(size)
-        return text_content.encode("utf-8") if text_content else b""
+        return text_content.encode(self._encoding) if text_content else b""
 
     def readline(self, size: int = -1) -> bytes:
         """Read a line and encode as bytes."""
         text_line = self._text_stream.readline(size)
-        return text_line.encode("utf-8") if text_line else b""
+        return text_line.encode(self._encoding) if text_line else b""
 
     def __iter__(self) -> Iterator[bytes]:
         """Iterate over lines as bytes."""
         for line in self._text_stream:
-            yield line.encode("utf-8")
+            yield line.encode(self._encoding)
 
     def close(self) -> None:
         """Close the underlying text stream."""
@@ -96,6 +266,46 @@ class _TextToBytesWrapper:
         self.close()
 
 
+class _Utf8CheckingReader(io.BufferedIOBase):
+    """A binary stream that checks incrementally that the bytes read from it are UTF-8.
+
+    The bytes are passed through unchanged, a UnicodeDecodeError is raised as soon as
+    an invalid sequence is read, or at the end if it ends within a multibyte character.
+    """
+
+    def __init__(self, stream: io.BufferedReader) -> None:
+        self._stream = stream
+        self._decode = codecs.getincrementaldecoder("utf-8")().decode
+        self.name = getattr(stream, "name", None)
+
+    def readable(self) -> bool:
+        """Streams are readable."""
+        return True
+
+    def read(self, size: int | None = -1) -> bytes:
+        """Read up to size bytes, all remaining bytes by default."""
+        size = -1 if size is None else size
+        return self._check(self._stream.read(size), final=size < 0)
+
+    def read1(self, size: int = -1) -> bytes:
+        """Read up to size bytes with at most one read of the underlying stream."""
+        return self._check(self._stream.read1(size))
+
+    def readline(self, size: int | None = -1) -> bytes:
+        """Read a line, including its line break."""
+        return self._check(self._stream.readline(-1 if size is None else size))
+
+    def close(self) -> None:
+        """Close the underlying stream."""
+        self._stream.close()
+        super().close()
+
+    def _check(self, data: bytes, final: bool = False) -> bytes:
+        """Check the next bytes of the stream, the end is reached if they are empty."""
+        self._decode(data, final or not data)
+        return data
+
+
 class File:
     """A file entity that can be held in a FileEntitySchema.
 
@@ -103,13 +313,19 @@ class File:
     :param file_type: The type of the file (one of: "Local", "Project").
     :param mime: The MIME type of the file, if known.
     :param entry_path: If the file path points to a archive, the entry within the archive.
+
+    Entries are read from archives that are kept open in `archive_pool`, which is shared
+    by all files unless it is replaced.
     """
 
+    archive_pool: ArchivePool = ARCHIVE_POOL
+
     def __init__(self, path: str, file_type: str, mime: str | None, entry_path: str | None) -> None:
         self.path = path
         self.file_type = file_type
         self.mime = mime
         self.entry_path = entry_path
+        self._metadata: dict[str, FileMetadata] = {}
 
     @abstractmethod
     def read_stream(self, project_id: str) -> IO[bytes]:
@@ -119,21 +335,63 @@ class File:
         Caller is responsible for closing the stream.
         """
 
+    def version(self, project_id: str) -> Hashable:
+        """Get a token that changes when the content of the file changes.
+
+        Returns None if the version cannot be determined.
+        """
+        return self._stat(project_id)[0]
+
+    def _stat(self, project_id: str) -> tuple[Hashable, int | None]:
+        """Get the version and the size of the stored file, without reading its content."""
+        return None, None
+
+    def probe(self, project_id: str, refresh: bool = False) -> FileMetadata:
+        """Probe the compression, content type, size and MIME type of the file.
+
+        The metadata is memoized per project and reused as long as the version of the file
+        is unchanged, so only the first call reads the start of the content. If the MIME
+        type of the file is unknown, it is set to the detected MIME type.
+
+        :param project_id: The project of the file.
+        :param refresh: Probe the content even if the version is unchanged.
+        """
+        version, size = self._stat(project_id)
+        metadata = self._metadata.get(project_id)
+        if metadata is not None and not refresh and metadata.version == version:
+            return metadata
+        with self.read_stream(project_id) as stream:
+            _, compressed, sample = _sniff(stream)
+        is_text = _is_utf8(sample)
+        metadata = FileMetadata(
+            compression="gzip" if compressed else None,
+            is_text=is_text,
+            size=size,
+            mime="application/gzip"
+            if compressed
+            else _detect_mime(self.entry_path or self.path, sample, is_text),
+            version=version,
+        )
+        self._metadata[project_id] = metadata
+        if self.mime is None:
+            self.mime = metadata.mime
+        return metadata
+
     def is_text(self, project_id: str) -> bool:
         """Check if the file contains text data.
 
         Returns True if the file content can be decoded as UTF-8 text, False otherwise.
         This method automatically handles gzip decompression if needed.
+        The result is memoized, see `probe`.
         """
-        with self.read_stream(project_id) as stream:
-            _, is_text = _prepare_stream_for_processing(stream)
-            return is_text
+        return self.probe(project_id).is_text
 
     def is_bytes(self, project_id: str) -> bool:
         """Check if the file contains binary data.
 
         Returns True if the file content is binary (cannot be decoded as UTF-8), False otherwise.
         This method automatically handles gzip decompression if needed.
+        The result is memoized, see `probe`.
         """
         return not self.is_text(project_id)
 
@@ -153,13 +411,40 @@ class File:
         """Read the file content as bytes.
 
         Returns the file content as bytes. Automatically handles gzip decompression if needed.
+        The bytes are returned as they are stored, text is not decoded.
         """
         with self.read_stream(project_id) as stream:
-            processed_stream, is_text = _prepare_stream_for_processing(stream)
-            if is_text:
-                content = processed_stream.read()  # type: ignore[attr-defined]
-                return content.encode("utf-8") if isinstance(content, str) else content
-            return processed_stream.read()  # type: ignore[return-value]
+            return _sniff(stream)[0].read()
+
+    @contextmanager
+    def buffer(self, project_id: str) -> Iterator[memoryview]:
+        """Get the file content as a buffer for random access.
+
+        Returns a context manager that yields a read-only memoryview of the content.
+        Automatically handles gzip decompression if needed. Uncompressed local files are
+        memory-mapped instead of being copied into memory.
+
+        Example:
+            ```python
+            with file.buffer(project_id) as content:
+                header = bytes(content[:4])
+            ```
+
+        """
+        view = memoryview(self.read_bytes(project_id))
+        try:
+            yield view
+        finally:
+            _release(view)
+
+    def iter_lines(self, project_id: str) -> Iterator[memoryview]:
+        """Iterate over the lines of the file content without copying them.
+
+        Each line is a memoryview slice of `buffer`, including its line break. Use
+        `bytes(line)` to keep a line after the iteration.
+        """
+        with self.buffer(project_id) as view:
+            yield from _iter_lines(view)
 
     @contextmanager
     def text_stream(self, project_id: str) -> Iterator[io.TextIOWrapper]:
@@ -184,11 +469,22 @@ class File:
             yield processed_stream  # type: ignore[misc]
 
     @contextmanager
-    def bytes_stream(self, project_id: str) -> Iterator[IO[bytes]]:
+    def bytes_stream(
+        self, project_id: str, encoding: str | None = None, check_utf8: bool = False
+    ) -> Iterator[IO[bytes]]:
         """Get a binary stream for memory-efficient processing.
 
         Returns a context manager that yields a binary stream for reading file content.
-        Automatically handles gzip decompression if needed.
+        Automatically handles gzip decompression if needed. The decompressed bytes are
+        passed through unchanged, text is only decoded and encoded again if it is
+        requested in an encoding other than UTF-8.
+
+        Args:
+            project_id: The project of the file.
+            encoding: Transcode the UTF-8 text content to this encoding. Raises
+                UnicodeDecodeError if the file content is not valid UTF-8 text.
+            check_utf8: Check incrementally while reading that the content is valid
+                UTF-8 text, raising UnicodeDecodeError at the first invalid byte.
 
         Example:
             ```python
@@ -198,15 +494,33 @@ class File:
             ```
 
         """
+        if encoding is not None and codecs.lookup(encoding).name != "utf-8":
+            with self.text_stream(project_id) as text_stream:
+                yield _TextToBytesWrapper(text_stream, encoding)  # type: ignore[misc]
+            return
         with self.read_stream(project_id) as raw_stream:
-            processed_stream, is_text = _prepare_stream_for_processing(raw_stream)
-            if is_text:
-                # Convert text stream back to bytes for consistent API
-                text_stream = processed_stream  # type: ignore[assignment]
-                # Create a bytes stream by encoding the text stream
-                yield _TextToBytesWrapper(text_stream)  # type: ignore[arg-type,misc]
-            else:
-                yield processed_stream  # type: ignore[misc]
+            stream = _sniff(raw_stream)[0]
+            yield _Utf8CheckingReader(stream) if check_utf8 else stream  # type: ignore[misc]
+
+    def iter_chunks(
+        self, project_id: str, size: int = STREAM_BUFFER_SIZE, check_utf8: bool = False
+    ) -> Iterator[bytes]:
+        """Iterate over the decompressed file content in chunks of bytes.
+
+        The chunks are read from `bytes_stream` as they are, each chunk holds up to `size`
+        bytes and only the last chunk may be smaller.
+
+        Args:
+            project_id: The project of the file.
+            size: The maximum number of bytes of a chunk.
+            check_utf8: Check incrementally that the content is valid UTF-8 text.
+
+        """
+        if size <= 0:
+            raise ValueError("The size of chunks must be positive.")
+        with self.bytes_stream(project_id, check_utf8=check_utf8) as stream:
+            while chunk := stream.read(size):
+                yield chunk
 
 
 class LocalFile(File):
@@ -222,11 +536,12 @@ class LocalFile(File):
         Caller is responsible for closing the stream.
         """
         if self.entry_path:
-            archive = zipfile.ZipFile(self.path, "r")
+            key = ("Local", str(Path(self.path).resolve()), self.version(project_id))
             try:
-                return archive.open(self.entry_path, "r")
+                return self.archive_pool.open(
+                    key, self.entry_path, partial(zipfile.ZipFile, self.path, "r")
+                )
             except KeyError as err:
-                archive.close()
                 raise FileNotFoundError(
                     f"Entry '{self.entry_path}' not found in archive '{self.path}'."
                 ) from err
@@ -235,6 +550,36 @@ class LocalFile(File):
                 raise FileNotFoundError(f"File '{self.path}' does not exist.")
             return Path(self.path).open("rb")
 
+    @contextmanager
+    def buffer(self, project_id: str) -> Iterator[memoryview]:
+        """Get the file content as a buffer for random access.
+
+        Uncompressed files are memory-mapped, so the content is not copied into memory.
+        Compressed files and archive entries are read into memory.
+        """
+        mapping = None
+        if not self.entry_path:
+            with self.read_stream(project_id) as stream:
+                if os.fstat(stream.fileno()).st_size and not _is_gzip(stream):  # type: ignore[arg-type]
+                    mapping = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapping is None:
+            with super().buffer(project_id) as view:
+                yield view
+            return
+        view = memoryview(mapping)
+        try:
+            yield view
+        finally:
+            _release(view, mapping)
+
+    def _stat(self, project_id: str) -> tuple[Hashable, int | None]:
+        """Get the modification time and size of the file or archive."""
+        try:
+            stat = Path(self.path).stat()
+        except OSError:
+            return None, None
+        return (stat.st_mtime_ns, stat.st_size), None if self.entry_path else stat.st_size
+
 
 class ProjectFile(File):
     """A project file"""
@@ -247,22 +592,51 @@ class ProjectFile(File):
 
         Returns a file-like object (stream) in binary mode.
         Caller is responsible for closing the stream.
+
+        The resource is streamed from the HTTP response without loading it into memory.
+        The first entry that is read from an archive is streamed as well. If the archive
+        requires random access or further entries are read from it, the archive is spooled
+        to a temporary file once and kept in the `archive_pool`.
         """
+        if not self.entry_path:
+            return self._open_resource(project_id)
+        key = ("Project", project_id, self.path, self.version(project_id))
+        pool = self.archive_pool
+        try:
+            if key not in pool and not pool.repeated(key):
+                stream = self._open_resource(project_id)
+                try:
+                    entry = _stream_zip_entry(stream, self.entry_path)
+                except BaseException:
+                    stream.close()
+                    raise
+                if entry is not None:
+                    return entry
+                stream.close()
+            return pool.open(
+                key, self.entry_path, lambda: _spool_archive(self._open_resource(project_id))
+            )
+        except KeyError as err:
+            raise FileNotFoundError(
+                f"Entry '{self.entry_path}' not found in project file '{self.path}'."
+            ) from err
+
+    def _stat(self, project_id: str) -> tuple[Hashable, int | None]:
+        """Get the version and the size of the resource from its metadata."""
+        try:
+            metadata = get_resource_metadata(project_id, self.path)
+        except HTTPError as err:
+            raise FileNotFoundError(f"Project file '{self.path}' not found.") from err
+        size = metadata.get("size")
+        return (size, metadata.get("modified")), None if self.entry_path else size
+
+    def _open_resource(self, project_id: str) -> io.BufferedReader:
+        """Open the body of the resource response as a buffered stream."""
         response = get_resource_response(project_id, self.path)
         if response.status_code != 200:  # noqa: PLR2004
+            response.close()
             raise FileNotFoundError(f"Project file '{self.path}' not found.")
-        response_bytes = BytesIO(response.raw.read())
-        if self.entry_path:
-            archive = zipfile.ZipFile(response_bytes, "r")
-            try:
-                return archive.open(self.entry_path, "r")
-            except KeyError as err:
-                archive.close()
-                raise FileNotFoundError(
-                    f"Entry '{self.entry_path}' not found in project file '{self.path}'."
-                ) from err
-        else:
-            return response_bytes
+        return io.BufferedReader(response.raw, STREAM_BUFFER_SIZE)
 
 
 class FileEntitySchema(TypedEntitySchema[File]):
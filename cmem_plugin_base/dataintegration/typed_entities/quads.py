@@ -1,6 +1,5 @@
 """Quad entities"""
 
-import uuid
 from typing import ClassVar, cast
 
 from pydantic import BaseModel
@@ -10,6 +9,7 @@ from cmem_plugin_base.dataintegration.typed_entities import path_uri, type_uri
 from cmem_plugin_base.dataintegration.typed_entities.typed_entities import (
     TypedEntitySchema,
 )
+from cmem_plugin_base.dataintegration.utils.uris import UriMinter, Uuid5Minter
 
 # --- RDF Node Types ---
 
@@ -110,7 +110,14 @@ def create_node(
 
 
 class QuadEntitySchema(TypedEntitySchema[Quad]):
-    """Entity schema that holds a collection of RDF quads."""
+    """Entity schema that holds a collection of RDF quads.
+
+    The URIs of the quad entities are minted from the subject, predicate, object, object
+    language, object data type and graph by `minter`. By default, these are name based
+    UUIDs, so equal quads get equal URIs.
+    """
+
+    minter: UriMinter
 
     def __init__(self):
         # The parent class TypedEntitySchema implements a singleton pattern
@@ -128,6 +135,7 @@ class QuadEntitySchema(TypedEntitySchema[Quad]):
                     EntityPath(path_uri("quad/graph")),
                 ],
             )
+            self.minter = Uuid5Minter()
 
     def to_entity(self, quad: Quad) -> Entity:
         """Create a generic entity from an RDF quad."""
@@ -145,22 +153,8 @@ class QuadEntitySchema(TypedEntitySchema[Quad]):
             case _:
                 object_data_type = []
 
-        # Generate a UUID-based URI
-        uri_components = "".join(
-            [
-                quad.subject.value,
-                quad.predicate.value,
-                quad.object.value,
-                object_language[0] if object_language else "",
-                object_data_type[0] if object_data_type else "",
-                quad.graph.value if quad.graph else "",
-            ]
-        )
-        uri = f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_DNS, uri_components)}"
-
-        # Build entity
-        return Entity(
-            uri=uri,
+        # Build entity with a URI that is minted from the quad
+        return self.minter.entity(
             values=[
                 [quad.subject.value],
                 [quad.subject.type],
@@ -171,6 +165,14 @@ class QuadEntitySchema(TypedEntitySchema[Quad]):
                 object_data_type,
                 [quad.graph.value] if quad.graph else [],
             ],
+            content=[
+                quad.subject.value,
+                quad.predicate.value,
+                quad.object.value,
+                object_language[0] if object_language else "",
+                object_data_type[0] if object_data_type else "",
+                quad.graph.value if quad.graph else "",
+            ],
         )
 
     def from_entity(self, entity: Entity) -> Quad:
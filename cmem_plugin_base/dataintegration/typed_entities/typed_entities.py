@@ -47,12 +47,17 @@ class TypedEntitySchema[T](EntitySchema):
         """Create typed entities from generic entities.
 
         Returns None if the entities do not match the target type.
+        If the paths of the entities are ordered differently, they are projected
+        onto the paths of this schema.
         """
         # TODO(robert): add validation
         # CMEM-6095
         if entities.schema.type_uri == self.type_uri:
             if isinstance(entities, TypedEntities):
                 return entities
+            projector = entities.schema.projector(self, strict=False)
+            if not projector.is_identity:
+                entities = projector.entities(entities)
             return TypedEntities(map(self.from_entity, entities.entities), self)
         raise ValueError(
             f"Expected entities of type '{self.type_uri}' but got '{entities.schema.type_uri}'."
@@ -0,0 +1,216 @@
+"""Apache Arrow interchange for entities.
+
+This module needs the optional `pyarrow` dependency, which is installed with the
+`arrow` extra of this package.
+
+Entities are converted to Arrow record batches with one column for the entity URIs
+followed by one column per schema path. Single value paths are mapped to string
+columns, all other paths are mapped to list columns of strings. The entity schema is
+kept in the metadata of the Arrow schema, so that entities can be restored from it.
+"""
+
+from collections.abc import Iterator, Sequence
+from itertools import pairwise
+
+from cmem_plugin_base.dataintegration.entity import (
+    Entities,
+    EntityBatch,
+    EntityPath,
+    EntitySchema,
+)
+from cmem_plugin_base.dataintegration.utils.uris import UlidMinter
+
+try:
+    import pyarrow as pa
+except ImportError as error:
+    raise ImportError(
+        "Arrow interchange needs pyarrow, install it with 'cmem-plugin-base[arrow]'."
+    ) from error
+
+URI_COLUMN = "#uri"
+"""Name of the column that holds the entity URIs."""
+
+_TYPE_URI = b"cmem:type_uri"
+_PATH_TO_ROOT = b"cmem:path_to_root"
+_IS_RELATION = b"cmem:is_relation"
+_IS_SINGLE_VALUE = b"cmem:is_single_value"
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+class ArrowStream:
+    """A stream of Arrow record batches that holds a collection of entities.
+
+    :param reader: The record batches of the entities.
+    :param sub_streams: A separate stream for each collection of sub entities.
+    """
+
+    def __init__(
+        self, reader: pa.RecordBatchReader, sub_streams: Sequence["ArrowStream"] | None = None
+    ) -> None:
+        self.reader = reader
+        self.sub_streams = sub_streams if sub_streams is not None else []
+
+
+def schema_to_arrow(schema: EntitySchema) -> pa.Schema:
+    """Convert an entity schema to an Arrow schema."""
+    fields = [pa.field(URI_COLUMN, pa.string(), nullable=False)]
+    fields.extend(
+        pa.field(
+            path.path,
+            pa.string() if path.is_single_value else pa.list_(pa.string()),
+            metadata={
+                _IS_RELATION: _flag(path.is_relation),
+                _IS_SINGLE_VALUE: _flag(path.is_single_value),
+            },
+        )
+        for path in schema.paths
+    )
+    return pa.schema(
+        fields,
+        metadata={_TYPE_URI: schema.type_uri, _PATH_TO_ROOT: schema.path_to_root.path},
+    )
+
+
+def schema_from_arrow(arrow_schema: pa.Schema) -> EntitySchema:
+    """Convert an Arrow schema to an entity schema.
+
+    Schemata that have not been created by `schema_to_arrow` are supported as well.
+    In that case, list columns are mapped to multi value paths and all other columns
+    to single value paths.
+    """
+    metadata = arrow_schema.metadata or {}
+    paths = []
+    for field in arrow_schema:
+        if field.name == URI_COLUMN:
+            continue
+        field_metadata = field.metadata or {}
+        is_list = pa.types.is_list(field.type) or pa.types.is_large_list(field.type)
+        paths.append(
+            EntityPath(
+                path=field.name,
+                is_relation=field_metadata.get(_IS_RELATION) == b"true",
+                is_single_value=field_metadata.get(_IS_SINGLE_VALUE, _flag(not is_list)) == b"true",
+            )
+        )
+    return EntitySchema(
+        type_uri=metadata.get(_TYPE_URI, b"").decode(),
+        paths=paths,
+        path_to_root=EntityPath(metadata.get(_PATH_TO_ROOT, b"").decode()),
+    )
+
+
+def batch_to_arrow(batch: EntityBatch, arrow_schema: pa.Schema) -> pa.RecordBatch:
+    """Convert a batch of entities to an Arrow record batch.
+
+    Multi value columns are built from the flat value buffer and the offsets of the
+    entity batch at once, without creating intermediate Python objects per row.
+    """
+    columns = [pa.array(batch.uris, pa.string())]
+    for path, values, offsets in zip(batch.schema.paths, batch.values, batch.offsets, strict=True):
+        if path.is_single_value:
+            columns.append(pa.array(_single_values(path, values, offsets), pa.string()))
+        else:
+            columns.append(
+                pa.ListArray.from_arrays(
+                    pa.array(offsets, pa.int32()), pa.array(values, pa.string())
+                )
+            )
+    return pa.RecordBatch.from_arrays(columns, schema=arrow_schema)
+
+
+def batch_from_arrow(record_batch: pa.RecordBatch, schema: EntitySchema) -> EntityBatch:
+    """Convert an Arrow record batch to a batch of entities.
+
+    The entity schema must have been derived from the record batch schema by
+    `schema_from_arrow`. Columns that do not hold strings are cast to strings first.
+    Each column is converted to Python strings at once. If the record batch does not
+    contain a URI column, new URIs are generated.
+    """
+    uri_index = record_batch.schema.get_field_index(URI_COLUMN)
+    if uri_index >= 0:
+        uris = record_batch.column(uri_index).cast(pa.string()).to_pylist()
+    else:
+        mint = UlidMinter().mint
+        uris = [mint() for _ in range(record_batch.num_rows)]
+    values = []
+    offsets = []
+    for index, column in enumerate(record_batch.columns):
+        if index != uri_index:
+            column_values, column_offsets = _column_from_arrow(column)
+            values.append(column_values)
+            offsets.append(column_offsets)
+    return EntityBatch(schema=schema, uris=uris, values=values, offsets=offsets)
+
+
+def to_arrow(entities: Entities, batch_size: int = DEFAULT_BATCH_SIZE) -> ArrowStream:
+    """Convert entities and their sub entities to Arrow streams.
+
+    The entities are converted lazily while the record batches are read.
+    """
+    arrow_schema = schema_to_arrow(entities.schema)
+    batches = (batch_to_arrow(_, arrow_schema) for _ in entities.iter_batches(batch_size))
+    return ArrowStream(
+        reader=pa.RecordBatchReader.from_batches(arrow_schema, batches),
+        sub_streams=[to_arrow(_, batch_size) for _ in entities.sub_entities or []],
+    )
+
+
+def from_arrow(stream: ArrowStream | pa.RecordBatchReader) -> Entities:
+    """Convert Arrow streams to entities.
+
+    The record batches are converted lazily while the entities are iterated.
+    """
+    if isinstance(stream, ArrowStream):
+        reader = stream.reader
+        sub_entities = [from_arrow(_) for _ in stream.sub_streams]
+    else:
+        reader = stream
+        sub_entities = []
+    schema = schema_from_arrow(reader.schema)
+    return Entities.from_batches(
+        batches=(batch_from_arrow(_, schema) for _ in reader),
+        schema=schema,
+        sub_entities=sub_entities,
+    )
+
+
+def _flag(value: bool) -> bytes:
+    """Encode a boolean metadata value."""
+    return b"true" if value else b"false"
+
+
+def _single_values(
+    path: EntityPath, values: Sequence[str], offsets: Sequence[int]
+) -> Iterator[str | None]:
+    """Get one optional value per row of a single value column."""
+    for start, end in pairwise(offsets):
+        if end - start > 1:
+            raise ValueError(
+                f"Path '{path.path}' is single valued, but holds {end - start} values."
+            )
+        yield values[start] if end > start else None
+
+
+def _column_from_arrow(column: pa.Array) -> tuple[list[str], list[int]]:
+    """Convert an Arrow column to a flat value buffer and row offsets."""
+    if pa.types.is_list(column.type) or pa.types.is_large_list(column.type):
+        if column.null_count:
+            column = column.fill_null(pa.scalar([], column.type))
+        column_offsets = column.offsets.to_pylist()
+        start = column_offsets[0]
+        flat = column.values.slice(start, column_offsets[-1] - start)
+        if not pa.types.is_string(flat.type):
+            flat = flat.cast(pa.string())
+        if flat.null_count:
+            raise ValueError("List columns must not contain null values.")
+        return flat.to_pylist(), [_ - start for _ in column_offsets]
+    if not pa.types.is_string(column.type):
+        column = column.cast(pa.string())
+    values = []
+    offsets = [0]
+    for value in column.to_pylist():
+        if value is not None:
+            values.append(value)
+        offsets.append(len(values))
+    return values, offsets
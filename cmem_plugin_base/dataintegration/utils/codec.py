@@ -0,0 +1,415 @@
+"""Compact binary encoding of entities and entity schemata.
+
+The encoding is used to spill, cache and transfer entities between processes.
+Every stream starts with a magic number and a format version. Counts and lengths
+in headers are encoded as unsigned LEB128 varints, strings are encoded as a varint
+byte length followed by the UTF-8 bytes.
+
+Entities are encoded in blocks of up to `DEFAULT_BLOCK_SIZE` entities. A block holds
+the number of values per path of each entity and a single UTF-8 buffer with all URIs
+followed by all values. The strings in the buffer are separated by NUL characters, so
+that they are decoded with a single `str.split`. If a string of the block contains a
+NUL character, the buffer holds the strings without separators, preceded by the length
+of each string. The value counts and lengths are stored as little-endian arrays with the
+smallest integer width (1 to 8 bytes) that fits all numbers in the block, so that a
+block is encoded and decoded with a few bulk operations instead of one operation per
+value. The cyclic garbage collector is paused while a block is decoded, see
+`gc_paused`.
+
+A stream of `Entities` consists of a header with the schemata of the entities and
+(recursively) of their sub entities, followed by one section of blocks per
+collection of entities in the same order. Each section ends with an empty block.
+"""
+
+import gc
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from io import BytesIO
+from itertools import accumulate, chain, islice, repeat
+from typing import IO
+
+from cmem_plugin_base.dataintegration.entity import Entities, Entity, EntityPath, EntitySchema
+
+MAGIC = b"CMEE"
+"""Magic number at the start of each encoded stream."""
+
+VERSION = 2
+"""Version of the binary format."""
+
+DEFAULT_BLOCK_SIZE = 1000
+"""Default number of entities per block."""
+
+_IS_RELATION = 1
+_IS_SINGLE_VALUE = 2
+_NO_SUB_SCHEMATA = 0
+_TYPECODES = (("B", 0xFF), ("H", 0xFFFF), ("I", 0xFFFFFFFF), ("Q", 0xFFFFFFFFFFFFFFFF))
+_SEPARATED = len(_TYPECODES)
+_SEPARATOR = "\x00"
+
+
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """Pause the cyclic garbage collector.
+
+    Building or decoding entities allocates many lists, which triggers collections that
+    traverse all objects, including the entities that have been built before. Entities
+    cannot form reference cycles, so these collections are pure overhead.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class EntityWriter:
+    """Writes the binary encoding to a stream."""
+
+    def __init__(self, stream: IO[bytes]) -> None:
+        self.stream = stream
+
+    def write_header(self) -> None:
+        """Write the magic number and format version."""
+        self.stream.write(MAGIC)
+        self.write_varint(VERSION)
+
+    def write_varint(self, value: int) -> None:
+        """Write an unsigned integer as LEB128 varint."""
+        self.stream.write(_varint(value))
+
+    def write_string(self, value: str) -> None:
+        """Write a length-prefixed UTF-8 string."""
+        encoded = value.encode("utf-8", "surrogatepass")
+        self.stream.write(_varint(len(encoded)))
+        self.stream.write(encoded)
+
+    def write_path(self, path: EntityPath) -> None:
+        """Write an entity path."""
+        self.write_string(path.path)
+        self.write_varint(
+            (_IS_RELATION if path.is_relation else 0)
+            | (_IS_SINGLE_VALUE if path.is_single_value else 0)
+        )
+
+    def write_schema(self, schema: EntitySchema) -> None:
+        """Write an entity schema including its sub schemata."""
+        self.write_string(schema.type_uri)
+        self.write_path(schema.path_to_root)
+        self.write_varint(len(schema.paths))
+        for path in schema.paths:
+            self.write_path(path)
+        if schema.sub_schemata is None:
+            self.write_varint(_NO_SUB_SCHEMATA)
+        else:
+            self.write_varint(len(schema.sub_schemata) + 1)
+            for sub_schema in schema.sub_schemata:
+                self.write_schema(sub_schema)
+
+    def write_block(self, entities: Iterable[Entity], columns: int) -> int:
+        """Write a block of entities that all hold `columns` sequences of values.
+
+        Returns the number of written entities, an empty block ends a section.
+        """
+        uris: list[str] = []
+        values: list[str] = []
+        counts: list[int] = []
+        for entity in entities:
+            if len(entity.values) != columns:
+                raise ValueError(
+                    f"Entity '{entity.uri}' has {len(entity.values)} values, expected {columns}."
+                )
+            uris.append(entity.uri)
+            counts.extend(map(len, entity.values))
+            values.extend(chain.from_iterable(entity.values))
+        size = len(uris)
+        self.write_varint(size)
+        if size == 0:
+            return 0
+        strings = uris + values
+        self._write_array(counts)
+        text = _SEPARATOR.join(strings)
+        if text.count(_SEPARATOR) == len(strings) - 1:
+            self.stream.write(bytes((_SEPARATED,)))
+        else:
+            self._write_array(list(map(len, strings)))
+            text = "".join(strings)
+        blob = text.encode("utf-8", "surrogatepass")
+        self.write_varint(len(blob))
+        self.stream.write(blob)
+        return size
+
+    def write_section(
+        self, entities: Iterable[Entity], columns: int, block_size: int = DEFAULT_BLOCK_SIZE
+    ) -> None:
+        """Write all entities in blocks, followed by an empty block."""
+        iterator = iter(entities)
+        while self.write_block(islice(iterator, block_size), columns):
+            pass
+
+    def _write_array(self, numbers: list[int]) -> None:
+        """Write unsigned integers as an array of the smallest sufficient width."""
+        maximum = max(numbers, default=0)
+        code = next(code for code, (_, limit) in enumerate(_TYPECODES) if maximum <= limit)
+        encoded = array(_TYPECODES[code][0], numbers)
+        if sys.byteorder == "big":
+            encoded.byteswap()
+        self.stream.write(bytes((code,)))
+        self.stream.write(encoded.tobytes())
+
+
+class EntityReader:
+    """Reads the binary encoding from a stream."""
+
+    def __init__(self, stream: IO[bytes]) -> None:
+        self.stream = stream
+
+    def read_header(self) -> None:
+        """Read and check the magic number and format version."""
+        magic = self.stream.read(len(MAGIC))
+        if magic != MAGIC:
+            raise ValueError("Stream does not contain encoded entities.")
+        version = self.read_varint()
+        if version != VERSION:
+            raise ValueError(f"Unsupported entity encoding version {version}.")
+
+    def read_exactly(self, size: int) -> bytes:
+        """Read the given number of bytes."""
+        data = self.stream.read(size)
+        if len(data) != size:
+            raise EOFError("Unexpected end of encoded entities.")
+        return data
+
+    def read_varint(self) -> int:
+        """Read an unsigned LEB128 varint."""
+        result = 0
+        shift = 0
+        while True:
+            byte = self.stream.read(1)
+            if not byte:
+                raise EOFError("Unexpected end of encoded entities.")
+            result |= (byte[0] & 0x7F) << shift
+            if byte[0] < 0x80:  # noqa: PLR2004
+                return result
+            shift += 7
+
+    def read_string(self) -> str:
+        """Read a length-prefixed UTF-8 string."""
+        return self.read_exactly(self.read_varint()).decode("utf-8", "surrogatepass")
+
+    def read_path(self) -> EntityPath:
+        """Read an entity path."""
+        path = self.read_string()
+        flags = self.read_varint()
+        return EntityPath(
+            path=path,
+            is_relation=bool(flags & _IS_RELATION),
+            is_single_value=bool(flags & _IS_SINGLE_VALUE),
+        )
+
+    def read_schema(self) -> EntitySchema:
+        """Read an entity schema including its sub schemata."""
+        type_uri = self.read_string()
+        path_to_root = self.read_path()
+        paths = [self.read_path() for _ in range(self.read_varint())]
+        sub_schemata_count = self.read_varint()
+        sub_schemata = (
+            [self.read_schema() for _ in range(sub_schemata_count - 1)]
+            if sub_schemata_count != _NO_SUB_SCHEMATA
+            else None
+        )
+        return EntitySchema(
+            type_uri=type_uri, paths=paths, path_to_root=path_to_root, sub_schemata=sub_schemata
+        )
+
+    def read_block(self, columns: int) -> list[Entity]:
+        """Read a block of entities, returns an empty list at the end of a section."""
+        size = self.read_varint()
+        if size == 0:
+            return []
+        with gc_paused():
+            counts = self._read_array(size * columns)
+            total = size + sum(counts)
+            code = self.read_exactly(1)[0]
+            lengths = self._read_array(total, code) if code != _SEPARATED else None
+            text = self.read_exactly(self.read_varint()).decode("utf-8", "surrogatepass")
+            if lengths is None:
+                strings = text.split(_SEPARATOR)
+                if len(strings) != total:
+                    raise ValueError(f"Expected {total} strings, but got {len(strings)}.")
+            else:
+                strings = _slices(text, lengths)
+            values = strings[size:]
+            # if every path of every entity holds a single value, no counts are needed
+            single = len(values) == len(counts) and max(counts, default=1) == 1
+            cells = [[_] for _ in values] if single else _slices(values, counts)
+            if not columns:
+                return [Entity(uri, []) for uri in strings[:size]]
+            return list(map(Entity, strings[:size], _slices(cells, repeat(columns, size))))
+
+    def read_section(self, columns: int) -> Iterator[Entity]:
+        """Read all blocks of a section."""
+        while block := self.read_block(columns):
+            yield from block
+
+    def skip_section(self, columns: int) -> None:
+        """Skip all remaining blocks of a section."""
+        while self.read_block(columns):
+            pass
+
+    def _read_array(self, size: int, code: int | None = None) -> array:
+        """Read unsigned integers that have been written by `EntityWriter._write_array`.
+
+        :param size: The number of integers.
+        :param code: The width code of the array, if it has been read already.
+        """
+        if code is None:
+            code = self.read_exactly(1)[0]
+        if code >= len(_TYPECODES):
+            raise ValueError(f"Invalid array width code {code}.")
+        numbers = array(_TYPECODES[code][0])
+        numbers.frombytes(self.read_exactly(size * numbers.itemsize))
+        if sys.byteorder == "big":
+            numbers.byteswap()
+        return numbers
+
+
+def _slices[T: (str, list)](sequence: T, lengths: Iterable[int]) -> list[T]:
+    """Split a sequence into consecutive slices of the given lengths."""
+    offsets = list(accumulate(lengths, initial=0))
+    return list(map(sequence.__getitem__, map(slice, offsets, islice(offsets, 1, None))))
+
+
+def _varint(value: int) -> bytes:
+    """Encode an unsigned integer as LEB128 varint."""
+    if value < 0:
+        raise ValueError(f"Cannot encode negative number {value}.")
+    if value < 0x80:  # noqa: PLR2004
+        return bytes((value,))
+    encoded = bytearray()
+    while value >= 0x80:  # noqa: PLR2004
+        encoded.append((value & 0x7F) | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def encode_schema(schema: EntitySchema) -> bytes:
+    """Encode an entity schema including its sub schemata."""
+    stream = BytesIO()
+    writer = EntityWriter(stream)
+    writer.write_header()
+    writer.write_schema(schema)
+    return stream.getvalue()
+
+
+def decode_schema(data: bytes) -> EntitySchema:
+    """Decode an entity schema that has been encoded by `encode_schema`."""
+    reader = EntityReader(BytesIO(data))
+    reader.read_header()
+    return reader.read_schema()
+
+
+def encode_entity(entity: Entity) -> bytes:
+    """Encode a single entity."""
+    stream = BytesIO()
+    writer = EntityWriter(stream)
+    writer.write_header()
+    writer.write_varint(len(entity.values))
+    writer.write_block([entity], len(entity.values))
+    return stream.getvalue()
+
+
+def decode_entity(data: bytes) -> Entity:
+    """Decode a single entity that has been encoded by `encode_entity`."""
+    reader = EntityReader(BytesIO(data))
+    reader.read_header()
+    entities = reader.read_block(reader.read_varint())
+    if len(entities) != 1:
+        raise ValueError(f"Expected a single entity, but got {len(entities)}.")
+    return entities[0]
+
+
+def write_entities(
+    entities: Entities, stream: IO[bytes], block_size: int = DEFAULT_BLOCK_SIZE
+) -> None:
+    """Write entities and all their sub entities to a binary stream."""
+    writer = EntityWriter(stream)
+    writer.write_header()
+    _write_schemata(writer, entities)
+    _write_sections(writer, entities, block_size)
+
+
+def read_entities(stream: IO[bytes]) -> Entities:
+    """Read entities that have been written by `write_entities`.
+
+    The entities are decoded lazily while being iterated. The entities and the
+    sub entities are stored one after another, so they should be iterated in this
+    order. Iterating a later collection skips the remaining entities of all
+    previous collections, which cannot be read afterwards.
+    """
+    reader = EntityReader(stream)
+    reader.read_header()
+    sections: list[_Section] = []
+    entities = _read_schemata(reader, sections)
+    for index, section in enumerate(sections):
+        section.previous = sections[:index]
+    return entities
+
+
+def _write_schemata(writer: EntityWriter, entities: Entities) -> None:
+    """Write the schemata of entities and their sub entities."""
+    writer.write_schema(entities.schema)
+    sub_entities = entities.sub_entities or []
+    writer.write_varint(len(sub_entities))
+    for _ in sub_entities:
+        _write_schemata(writer, _)
+
+
+def _write_sections(writer: EntityWriter, entities: Entities, block_size: int) -> None:
+    """Write the entities and their sub entities in pre-order."""
+    writer.write_section(entities.entities, len(entities.schema.paths), block_size)
+    for _ in entities.sub_entities or []:
+        _write_sections(writer, _, block_size)
+
+
+class _Section:
+    """Lazily reads the entities of one section of a stream."""
+
+    def __init__(self, reader: EntityReader, columns: int) -> None:
+        self.reader = reader
+        self.columns = columns
+        self.previous: list[_Section] = []
+        self.started = False
+        self.finished = False
+
+    def __iter__(self) -> Iterator[Entity]:
+        if self.started:
+            raise ValueError("Encoded entities can only be iterated once.")
+        self.started = True
+        for section in self.previous:
+            section.skip()
+        while not self.finished:
+            block = self.reader.read_block(self.columns)
+            if not block:
+                self.finished = True
+            yield from block
+
+    def skip(self) -> None:
+        """Skip the remaining entities of this section."""
+        if not self.finished:
+            self.started = True
+            self.finished = True
+            self.reader.skip_section(self.columns)
+
+
+def _read_schemata(reader: EntityReader, sections: list[_Section]) -> Entities:
+    """Read the schemata of entities and their sub entities and register their sections."""
+    schema = reader.read_schema()
+    section = _Section(reader, len(schema.paths))
+    sections.append(section)
+    sub_entities = [_read_schemata(reader, sections) for _ in range(reader.read_varint())]
+    return Entities(entities=iter(section), schema=schema, sub_entities=sub_entities)
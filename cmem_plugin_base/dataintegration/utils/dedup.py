@@ -0,0 +1,226 @@
+"""Streaming deduplication of entities."""
+
+import json
+import math
+from collections.abc import Callable, Sequence
+from hashlib import blake2b
+from typing import TYPE_CHECKING
+
+from cmem_plugin_base.dataintegration.entity import Entities, Entity, EntityPath
+from cmem_plugin_base.dataintegration.utils.replay import DEFAULT_MEMORY_LIMIT
+from cmem_plugin_base.dataintegration.utils.sqlite import SpillDatabase
+
+if TYPE_CHECKING:
+    import sqlite3
+    from pathlib import Path
+
+DEFAULT_EXPECTED_COUNT = 1_000_000
+"""Default number of distinct keys a Bloom filter is sized for."""
+
+DEFAULT_FALSE_POSITIVE_RATE = 0.01
+"""Default probability that a Bloom filter reports an unseen key as seen."""
+
+_KEY_OVERHEAD = 80
+"""Estimated number of bytes a key occupies in a set, in addition to its characters."""
+
+
+class BloomFilter:
+    """A Bloom filter over strings.
+
+    The filter never reports an added key as unseen, but reports unseen keys as seen
+    with a probability of about `false_positive_rate`, as long as at most
+    `expected_count` keys have been added.
+
+    :param expected_count: The number of keys the filter is sized for.
+    :param false_positive_rate: The probability of reporting an unseen key as seen.
+    """
+
+    __slots__ = ("bits", "expected_count", "hash_count", "size")
+
+    def __init__(
+        self,
+        expected_count: int = DEFAULT_EXPECTED_COUNT,
+        false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE,
+    ) -> None:
+        if expected_count < 1:
+            raise ValueError(f"Expected count must be positive, but got {expected_count}.")
+        if not 0 < false_positive_rate < 1:
+            raise ValueError(
+                f"False positive rate must be between 0 and 1, but got {false_positive_rate}."
+            )
+        self.expected_count = expected_count
+        self.size = max(
+            8, math.ceil(-expected_count * math.log(false_positive_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / expected_count * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, key: str) -> bool:
+        """Add a key, returns whether the key has (probably) not been added before."""
+        bits = self.bits
+        added = False
+        for position in self._positions(key):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                added = True
+        return added
+
+    def __contains__(self, key: str) -> bool:
+        """Check if a key has (probably) been added."""
+        bits = self.bits
+        return all(bits[_ >> 3] & (1 << (_ & 7)) for _ in self._positions(key))
+
+    def _positions(self, key: str) -> list[int]:
+        """Get the bit positions of a key by double hashing a single digest."""
+        digest = blake2b(key.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(first + index * second) % size for index in range(self.hash_count)]
+
+
+class KeySet:
+    """An exact set of strings that spills to a temporary SQLite database.
+
+    Keys are held in memory until `memory_limit` bytes are reached. Then all keys are
+    moved to the database and the memory is reused. A Bloom filter in front of the
+    database answers most lookups of unseen keys without reading from disk.
+
+    The temporary database is removed when `close` is called or the object is garbage
+    collected.
+
+    :param memory_limit: The number of bytes of keys that are held in memory.
+    """
+
+    def __init__(self, memory_limit: int = DEFAULT_MEMORY_LIMIT) -> None:
+        self.memory_limit = memory_limit
+        self.memory_size = 0
+        self.spill_path: Path | None = None
+        self._memory: set[str] = set()
+        self._spilled: BloomFilter | None = None
+        self._connection: sqlite3.Connection | None = None
+        self._database: SpillDatabase | None = None
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Get the number of keys."""
+        return self._count
+
+    def __contains__(self, key: str) -> bool:
+        """Check if a key has been added."""
+        return key in self._memory or self._is_spilled(key)
+
+    def add(self, key: str) -> bool:
+        """Add a key, returns whether the key has not been added before."""
+        if key in self._memory or self._is_spilled(key):
+            return False
+        self._memory.add(key)
+        self._count += 1
+        self.memory_size += _KEY_OVERHEAD + len(key)
+        if self.memory_size > self.memory_limit:
+            self._spill()
+        return True
+
+    def close(self) -> None:
+        """Remove the spill database and drop all keys."""
+        if self._database is not None:
+            self._database.close()
+        self._connection = None
+        self._spilled = None
+        self._memory = set()
+        self.memory_size = 0
+        self._count = 0
+
+    def _is_spilled(self, key: str) -> bool:
+        """Check if a key has been moved to the database."""
+        if self._spilled is None or key not in self._spilled:
+            return False
+        return (
+            self._connection.execute(  # type: ignore[union-attr]
+                "SELECT 1 FROM keys WHERE key = ?", (key,)
+            ).fetchone()
+            is not None
+        )
+
+    def _spill(self) -> None:
+        """Move all keys from memory to the database."""
+        if self._connection is None:
+            self._database = SpillDatabase(
+                "keys-", "CREATE TABLE keys (key TEXT PRIMARY KEY) WITHOUT ROWID"
+            )
+            self.spill_path = self._database.path
+            self._connection = self._database.connection
+        spilled = self._spilled
+        if spilled is None or self._count > spilled.expected_count:
+            # a larger filter keeps the false positive rate low, which is amortized
+            # by growing it by a constant factor
+            spilled = BloomFilter(expected_count=4 * self._count)
+            for (key,) in self._connection.execute("SELECT key FROM keys"):
+                spilled.add(key)
+            self._spilled = spilled
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO keys VALUES (?)", ((_,) for _ in self._memory)
+            )
+        for key in self._memory:
+            spilled.add(key)
+        self._memory = set()
+        self.memory_size = 0
+
+
+def entity_key(
+    entities: Entities, paths: Sequence[EntityPath | str] | None = None
+) -> Callable[[Entity], str]:
+    """Get a function that builds the deduplication key of an entity.
+
+    :param entities: The entities whose schema contains the paths.
+    :param paths: The paths whose values make up the key, the entity URI is used if
+        no paths are given.
+    """
+    if not paths:
+        return _uri
+    indices = [entities.schema.index_of(_) for _ in paths]
+
+    def key(entity: Entity) -> str:
+        values = entity.values
+        return json.dumps([list(values[_]) for _ in indices], ensure_ascii=False)
+
+    return key
+
+
+def _uri(entity: Entity) -> str:
+    """Get the URI of an entity."""
+    return entity.uri
+
+
+def deduplicate(  # noqa: PLR0913
+    entities: Entities,
+    paths: Sequence[EntityPath | str] | None = None,
+    *,
+    approximate: bool = False,
+    expected_count: int = DEFAULT_EXPECTED_COUNT,
+    false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+) -> Entities:
+    """Lazily drop entities whose key has been seen before, keeping the first one.
+
+    In exact mode, the seen keys are kept in a `KeySet`, which spills to disk above
+    `memory_limit` bytes. In approximate mode, the keys are kept in a `BloomFilter` of
+    fixed size, which drops a unique entity with a probability of about
+    `false_positive_rate`, as long as there are at most `expected_count` unique keys.
+
+    :param entities: The input entities. Sub entities are passed through unchanged.
+    :param paths: The paths whose values make up the key, the entity URI is used if
+        no paths are given.
+    :param approximate: Whether to use a Bloom filter instead of an exact set.
+    :param expected_count: The number of unique keys the Bloom filter is sized for.
+    :param false_positive_rate: The probability of dropping a unique entity.
+    :param memory_limit: The number of bytes of keys the exact set holds in memory.
+    """
+    key = entity_key(entities, paths)
+    seen: BloomFilter | KeySet = (
+        BloomFilter(expected_count, false_positive_rate) if approximate else KeySet(memory_limit)
+    )
+    add = seen.add
+    return entities.filter(lambda _: add(key(_)))
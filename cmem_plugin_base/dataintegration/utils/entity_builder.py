@@ -1,8 +1,26 @@
 """utils module for building entities from python objects dict|list."""
 
-from ulid import ULID
+import json
+import logging
+import pickle
+import random
+import tempfile
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from dataclasses import dataclass, field
+from io import BytesIO
+from itertools import chain, islice
+from typing import IO, TYPE_CHECKING, Literal
 
+from cmem_plugin_base.dataintegration.context import ExecutionReport
 from cmem_plugin_base.dataintegration.entity import Entities, Entity, EntityPath, EntitySchema
+from cmem_plugin_base.dataintegration.utils.codec import EntityReader, EntityWriter, gc_paused
+from cmem_plugin_base.dataintegration.utils.json_stream import iter_json_items
+from cmem_plugin_base.dataintegration.utils.processes import process_pool, worker_count
+from cmem_plugin_base.dataintegration.utils.replay import DEFAULT_MEMORY_LIMIT, EntityQueue
+from cmem_plugin_base.dataintegration.utils.uris import UlidMinter, UriMinter
+
+if TYPE_CHECKING:
+    from cmem_plugin_base.dataintegration.typed_entities.file import File
 
 
 def merge_path_values(paths_map1: dict, paths_map2: dict) -> dict:
@@ -21,76 +39,68 @@ def merge_path_values(paths_map1: dict, paths_map2: dict) -> dict:
 
     """
     for key, value in paths_map2.items():
-        current_path_map = {}
-        if paths_map1.get(key) is not None:
-            current_path_map = paths_map1[key]
-        current_path_map = current_path_map | value
-        paths_map1[key] = current_path_map
+        current_path_map = paths_map1.get(key)
+        if current_path_map is None:
+            paths_map1[key] = dict(value)
+        else:
+            current_path_map.update(value)
     return paths_map1
 
 
 def generate_paths_from_data(data: dict | list, path: str | None = "root") -> dict:
     """Generate a dictionary representing paths and data types from a nested JSON structure.
 
-    This function recursively traverses a nested JSON structure ('data') and builds
-    a dictionary ('paths_map') where keys are paths and values are dictionaries
-    containing keys and their corresponding data types.
+    This function traverses a nested JSON structure ('data') and builds a dictionary
+    ('paths_map') where keys are paths and values are dictionaries containing keys and
+    their corresponding data types. The traversal uses an explicit stack, so the depth
+    of the structure is not limited by the recursion limit.
 
     Args:
         data (dict or list): The nested JSON structure to traverse.
-        path (str, optional): The current path (used for recursion). Default is 'root'.
+        path (str, optional): The path of the data. Default is 'root'.
 
     Returns:
         dict: A dictionary representing paths and data types.
 
     """
-    paths_map: dict = {}
-    if isinstance(data, list):
-        for _ in data:
-            paths_map = merge_path_values(paths_map, generate_paths_from_data(_, path=path))
-    if isinstance(data, dict):
-        key_to_type_map = {}
-        for key, value in data.items():
-            key_to_type_map[key] = type(value).__name__
-            if key_to_type_map[key] == "dict":
-                sub_path = f"{path}/{key}"
-                paths_map = merge_path_values(
-                    paths_map, generate_paths_from_data(data=value, path=sub_path)
-                )
-            if key_to_type_map[key] == "list":
-                for _ in value:
-                    if isinstance(_, dict):
-                        key_to_type_map[key] = "list_dict"
-                        sub_path = f"{path}/{key}"
-                        paths_map = merge_path_values(
-                            paths_map, generate_paths_from_data(data=_, path=sub_path)
-                        )
-        paths_map[path] = key_to_type_map
-    return paths_map
-
-
-def _get_schema(data: dict | list) -> dict[str, EntitySchema] | None:
-    """Get the schema of an entity."""
-    if not data:
-        return None
-    paths_map = generate_paths_from_data(data=data)
-    path_to_schema_map = {}
-    for path, key_to_type_map in paths_map.items():
-        schema_paths = []
-        for _key, _type in key_to_type_map.items():
-            schema_paths.append(
-                EntityPath(
-                    path=_key,
-                    is_relation=_type in ("dict", "list_dict"),
-                    is_single_value=_type not in ("list", "list_dict"),
-                )
-            )
-        schema = EntitySchema(
-            type_uri="",
-            paths=schema_paths,
-        )
-        path_to_schema_map[path] = schema
-    return path_to_schema_map
+    key_to_type_maps: dict[str, dict] = {}
+    completed: dict[str, None] = {}
+    stack: list[tuple[str | None, object]] = [(path, data)]
+    while stack:
+        current_path, current = stack.pop()
+        if current is None:
+            # all values of the first object of this path have been traversed
+            completed.setdefault(current_path)  # type: ignore[arg-type]
+            continue
+        if isinstance(current, list):
+            stack.extend((current_path, _) for _ in reversed(current) if isinstance(_, dict | list))
+            continue
+        if not isinstance(current, dict):
+            continue
+        if current_path not in completed:
+            stack.append((current_path, None))
+        children: list[tuple[str | None, object]] = []
+        key_to_type_map = _get_key_to_type_map(current_path, current, children)
+        merge_path_values(key_to_type_maps, {current_path: key_to_type_map})
+        stack.extend(reversed(children))
+    return {_: key_to_type_maps[_] for _ in completed}
+
+
+def _get_key_to_type_map(
+    path: str | None, data: dict, children: list[tuple[str | None, object]]
+) -> dict[str, str]:
+    """Get the data type of each key of an object, collecting its sub objects."""
+    key_to_type_map = {}
+    for key, value in data.items():
+        key_to_type_map[key] = type(value).__name__
+        if key_to_type_map[key] == "dict":
+            children.append((f"{path}/{key}", value))
+        elif key_to_type_map[key] == "list":
+            for _ in value:
+                if isinstance(_, dict):
+                    key_to_type_map[key] = "list_dict"
+                    children.append((f"{path}/{key}", _))
+    return key_to_type_map
 
 
 def extend_path_list(path_to_entities: dict, sub_path_to_entities: dict) -> None:
@@ -116,79 +126,449 @@ def extend_path_list(path_to_entities: dict, sub_path_to_entities: dict) -> None
         path_to_entities[key] = entities
 
 
-def _get_entity(
-    path_from_root: str,
-    path_to_schema_map: dict,
-    data: dict,
-) -> dict:
-    """Get an entity based on the schema and data."""
-    path_to_entities: dict = {}
-    entity_uri = f"urn:x-ulid:{ULID()}"
-    values = []
-    schema = path_to_schema_map[path_from_root]
-    for _ in schema.paths:
-        if data.get(_.path) is None:
-            values.append([""])
-        elif not _.is_relation:
-            values.append(
-                [f"{data.get(_.path)}"]
-                if _.is_single_value
-                else [f"{_v}" for _v in data.get(_.path)]  # type: ignore[union-attr]
-            )
+@dataclass
+class SchemaPolicy:
+    """Defines how the schema of the data is inferred.
+
+    Use one of the class methods to create a policy. By default, the schema is
+    inferred from all records.
+
+    Keys that are not part of the inferred or explicit schema are handled according to
+    `unseen_keys`. They are either ignored, ignored with a warning, or used to extend
+    the schema. A key is also unseen, if its values do not fit its path, e.g. an object
+    for a path that has only held strings so far.
+    """
+
+    mode: Literal["full", "first", "reservoir", "explicit"] = "full"
+    """The records that the schema is inferred from."""
+
+    sample_size: int = 1000
+    """The number of records that are sampled in the modes `first` and `reservoir`."""
+
+    schemata: Mapping[str, EntitySchema] = field(default_factory=dict)
+    """The explicit schema of each path from the root, such as `root` or `root/city`."""
+
+    unseen_keys: Literal["ignore", "warn", "extend"] = "warn"
+    """How to handle keys that are not part of the schema."""
+
+    report: ExecutionReport | None = None
+    """Receives the warnings about unseen keys, otherwise they are logged."""
+
+    seed: int | None = None
+    """The seed of the random reservoir sample."""
+
+    def __post_init__(self) -> None:
+        """Validate the policy."""
+        if self.sample_size < 1:
+            raise ValueError(f"Sample size must be positive, but got {self.sample_size}.")
+        if self.mode == "explicit" and "root" not in self.schemata:
+            raise ValueError("An explicit schema needs a schema for the 'root' path.")
+
+    @classmethod
+    def full(cls) -> "SchemaPolicy":
+        """Infer the schema from all records."""
+        return cls(mode="full")
+
+    @classmethod
+    def first(
+        cls,
+        sample_size: int,
+        unseen_keys: Literal["ignore", "warn", "extend"] = "warn",
+        report: ExecutionReport | None = None,
+    ) -> "SchemaPolicy":
+        """Infer the schema from the first `sample_size` records."""
+        return cls(mode="first", sample_size=sample_size, unseen_keys=unseen_keys, report=report)
+
+    @classmethod
+    def reservoir(
+        cls,
+        sample_size: int,
+        unseen_keys: Literal["ignore", "warn", "extend"] = "warn",
+        report: ExecutionReport | None = None,
+        seed: int | None = None,
+    ) -> "SchemaPolicy":
+        """Infer the schema from `sample_size` records that are sampled uniformly."""
+        return cls(
+            mode="reservoir",
+            sample_size=sample_size,
+            unseen_keys=unseen_keys,
+            report=report,
+            seed=seed,
+        )
+
+    @classmethod
+    def explicit(
+        cls,
+        schema: EntitySchema | Mapping[str, EntitySchema],
+        unseen_keys: Literal["ignore", "warn", "extend"] = "warn",
+        report: ExecutionReport | None = None,
+    ) -> "SchemaPolicy":
+        """Use the given schema of the root entities, or of each path from the root."""
+        schemata = {"root": schema} if isinstance(schema, EntitySchema) else dict(schema)
+        return cls(mode="explicit", schemata=schemata, unseen_keys=unseen_keys, report=report)
+
+    def sample(self, data: list) -> Iterable:
+        """Get the records of a list that the schema is inferred from."""
+        if self.mode == "first":
+            return data[: self.sample_size]
+        if self.mode == "reservoir":
+            if len(data) <= self.sample_size:
+                return data
+            return random.Random(self.seed).sample(data, self.sample_size)  # noqa: S311
+        return []
+
+    def warn(self, path: str, key: str) -> None:
+        """Report an unseen key."""
+        message = f"Ignored key '{key}' of path '{path}', which is not part of the schema."
+        if self.report is not None:
+            self.report.warnings.append(message)
         else:
-            _data: list[dict] = [data.get(_.path)] if _.is_single_value else data.get(_.path)  # type: ignore[assignment,list-item]
-            sub_entities_uri = []
-            for _v in _data:
-                sub_entity_path = f"{path_from_root}/{_.path}"
-                sub_path_to_entities = _get_entity(
-                    path_from_root=sub_entity_path,
-                    path_to_schema_map=path_to_schema_map,
-                    data=_v,
-                )
-                sub_entity = sub_path_to_entities[sub_entity_path].pop()
-                sub_entities_uri.append(sub_entity.uri)
-                sub_path_to_entities[sub_entity_path].append(sub_entity)
-                extend_path_list(path_to_entities, sub_path_to_entities)
-            values.append(sub_entities_uri)
-    entity = Entity(uri=entity_uri, values=values)
-    entities = path_to_entities.get(path_from_root, [])
-    entities.append(entity)
-    path_to_entities[path_from_root] = entities
-    return path_to_entities
-
-
-def _get_entities(
-    data: dict | list,
-    path_to_schema_map: dict[str, EntitySchema],
-) -> dict[str, list[Entity]]:
-    """Get entities based on the schema, data, and sub-entities."""
-    path_to_entities: dict[str, list[Entity]] = {}
-    if isinstance(data, list):
-        for _ in data:
-            sub_path_to_entities = _get_entity(
-                path_from_root="root", path_to_schema_map=path_to_schema_map, data=_
+            logging.getLogger(__name__).warning(message)
+
+
+def _value_kind(value: object) -> tuple[bool, bool]:
+    """Get whether a value is a relation and whether it is a single value."""
+    if isinstance(value, dict):
+        return True, True
+    if isinstance(value, list):
+        return any(isinstance(_, dict) for _ in value), False
+    return False, True
+
+
+PARTITIONS_PER_WORKER = 4
+"""Number of partitions per worker process when building entities in parallel."""
+
+
+class _PathState:
+    """The schema and the entities of a path from the root."""
+
+    __slots__ = ("children", "columns", "entities", "path", "paths")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.paths: list[EntityPath] = []
+        self.columns: dict[str, int] = {}
+        self.entities: list[Entity] = []
+        self.children: dict[str, _PathState] = {}
+
+    def column(
+        self, key: str, is_relation: bool, is_single_value: bool, frozen: bool = False
+    ) -> int | None:
+        """Get the column of a key, adding or widening its path if needed.
+
+        If the schema is frozen, None is returned instead of changing the schema.
+        """
+        index = self.columns.get(key)
+        if index is None:
+            if frozen:
+                return None
+            index = self.columns[key] = len(self.paths)
+            self.paths.append(EntityPath(key, is_relation, is_single_value))
+            return index
+        path = self.paths[index]
+        if (is_relation and not path.is_relation) or (path.is_single_value and not is_single_value):
+            if frozen:
+                return None
+            self.paths[index] = EntityPath(
+                key, path.is_relation or is_relation, path.is_single_value and is_single_value
             )
-            extend_path_list(path_to_entities, sub_path_to_entities)
-    else:
-        path_to_entities = _get_entity(
-            path_from_root="root",
-            path_to_schema_map=path_to_schema_map,
-            data=data,
-        )
-    return path_to_entities
+        return index
+
 
+class _EntityBuilder:
+    """Infers the schema of each path and builds entities in a single pass.
 
-def build_entities_from_data(data: dict | list) -> Entities | None:
-    """Get entities from a data object."""
-    path_to_schema_map = _get_schema(data)
-    if not path_to_schema_map:
+    The schema of a path grows while records are added. Entities that have been built
+    before a path has been discovered are back-filled with an empty value, when the
+    entities are taken. A key is a relation if any of its values is an object or a
+    list of objects, and it is a single value if none of its values is a list.
+    """
+
+    def __init__(self, minter: UriMinter | None = None) -> None:
+        self.minter = minter if minter is not None else UlidMinter()
+        self.states: dict[str, _PathState] = {}
+        self.order: dict[str, None] = {}
+        self.frozen = False
+        self.on_unseen: Callable[[str, str], None] | None = None
+        self._unseen: dict[tuple[str, str], None] = {}
+
+    @classmethod
+    def for_policy(cls, policy: SchemaPolicy, minter: UriMinter | None = None) -> "_EntityBuilder":
+        """Create a builder for a schema policy, without sampling any records."""
+        builder = cls(minter)
+        for path, schema in policy.schemata.items():
+            builder.seed(path, schema)
+        if policy.unseen_keys == "warn":
+            builder.on_unseen = policy.warn
+        return builder
+
+    def seed(self, path: str, schema: EntitySchema) -> None:
+        """Add the paths of a schema, including empty schemata for their relations."""
+        state = self._state(path)
+        for _ in schema.paths:
+            state.column(_.path, _.is_relation, _.is_single_value)
+            if _.is_relation and f"{path}/{_.path}" not in self.order:
+                self._state(f"{path}/{_.path}")
+                self.order.setdefault(f"{path}/{_.path}")
+        self.order.setdefault(path)
+
+    def observe(self, path: str, data: dict) -> None:
+        """Grow the schema with the keys of a record, without building entities."""
+        order = self.order
+        stack: list[tuple[_PathState, dict | None]] = [(self._state(path), data)]
+        while stack:
+            state, current = stack.pop()
+            if current is None:
+                order.setdefault(state.path)
+                continue
+            if state.path not in order:
+                stack.append((state, None))
+            children: list[tuple[_PathState, dict | None]] = []
+            spans: list[tuple[int, int, int]] = []
+            for key, value in current.items():
+                index = state.column(key, *_value_kind(value))
+                start = len(children)
+                if isinstance(value, dict):
+                    children.append((self._child(state, key), value))
+                elif isinstance(value, list):
+                    child = self._child(state, key)
+                    children.extend((child, _) for _ in value if isinstance(_, dict))
+                if index is not None and len(children) > start:
+                    spans.append((index, start, len(children)))
+            stack.extend(reversed(_in_column_order(children, spans)))
+
+    def add(self, path: str, data: dict) -> None:
+        """Build the entity of a record and its sub entities.
+
+        The objects are traversed depth-first with an explicit stack. Each entity is
+        built when its object is visited, the URIs of its sub entities are minted
+        before they are pushed onto the stack. The URI of the root entity is not
+        referenced by other entities, so it is left to `UriMinter.entity`.
+        """
+        order = self.order
+        stack: list[tuple[_PathState, dict | None, str | None]] = [(self._state(path), data, None)]
+        while stack:
+            state, current, current_uri = stack.pop()
+            if current is None:
+                # all sub entities of the first entity of this path have been built
+                order.setdefault(state.path)
+                continue
+            if state.path not in order:
+                stack.append((state, None, current_uri))
+            children: list[tuple[_PathState, dict | None, str | None]] = []
+            spans: list[tuple[int, int, int]] = []
+            values = self._values(state, current, children, spans)
+            state.entities.append(
+                Entity(uri=current_uri, values=values)
+                if current_uri is not None
+                else self.minter.entity(values)
+            )
+            stack.extend(reversed(_in_column_order(children, spans)))
+
+    def schemata(self) -> dict[str, EntitySchema]:
+        """Get the schema of each path, sub paths precede their parent paths."""
+        return {
+            path: EntitySchema(type_uri="", paths=list(self.states[path].paths))
+            for path in self.order
+        }
+
+    def take(self) -> dict[str, list[Entity]]:
+        """Remove and return the entities of each path, back-filling missing columns."""
+        path_to_entities = {}
+        for path in self.order:
+            state = self.states[path]
+            columns = len(state.paths)
+            for entity in state.entities:
+                missing = columns - len(entity.values)
+                if missing:
+                    entity.values.extend([""] for _ in range(missing))  # type: ignore[attr-defined]
+            path_to_entities[path] = state.entities
+            state.entities = []
+        return path_to_entities
+
+    def merge(
+        self,
+        schemata: Mapping[str, EntitySchema],
+        path_to_entities: Mapping[str, list[Entity]],
+        unseen: Iterable[tuple[str, str]],
+    ) -> None:
+        """Add the schemata and entities of a builder that has added later records.
+
+        The paths of the other builder are widened into the schema of this builder, the
+        values of its entities are rearranged if their columns are ordered differently.
+        """
+        for path, schema in schemata.items():
+            state = self._state(path)
+            indices = [state.column(_.path, _.is_relation, _.is_single_value) for _ in schema.paths]
+            self.order.setdefault(path)
+            entities = path_to_entities[path]
+            if indices != list(range(len(indices))):
+                columns = len(state.paths)
+                for entity in entities:
+                    values: list = [[""] for _ in range(columns)]
+                    for index, value in zip(indices, entity.values, strict=True):
+                        values[index] = value  # type: ignore[index]
+                    entity.values = values
+            state.entities.extend(entities)
+        for path, key in unseen:
+            self._report_unseen(path, key)
+
+    def _values(
+        self,
+        state: _PathState,
+        data: dict,
+        children: list[tuple[_PathState, dict | None, str | None]],
+        spans: list[tuple[int, int, int]],
+    ) -> list:
+        """Get the values of an object, collecting its sub objects in `children`.
+
+        The sub objects of each key are collected in the order of the keys in the data,
+        `spans` records the column and the range of `children` of each key.
+        """
+        columns = state.columns
+        values: list = [None] * len(state.paths)
+        for key, value in data.items():
+            if isinstance(value, dict | list):
+                start = len(children)
+                index, value = self._nested(state, key, value, children)  # noqa: PLW2901
+                if index is not None and len(children) > start:
+                    spans.append((index, start, len(children)))
+            else:
+                # single literal values never widen an existing path
+                index = columns.get(key)
+                if index is None:
+                    index = self._column(state, key, is_relation=False, is_single_value=True)
+                if value is not None:
+                    value = [f"{value}"]  # noqa: PLW2901
+            if index is None:
+                continue
+            if index == len(values):
+                values.append(value)
+            else:
+                values[index] = value
+        return [[""] if _ is None else _ for _ in values]
+
+    def _nested(
+        self,
+        state: _PathState,
+        key: str,
+        value: dict | list,
+        children: list[tuple[_PathState, dict | None, str | None]],
+    ) -> tuple[int | None, list[str]]:
+        """Get the column and the values of an object or a list."""
+        if isinstance(value, dict):
+            index = self._column(state, key, is_relation=True, is_single_value=True)
+            if index is None:
+                return None, []
+            uri = self.minter.mint()
+            children.append((self._child(state, key), value, uri))
+            return index, [uri]
+        is_relation = any(isinstance(_, dict) for _ in value)
+        index = self._column(state, key, is_relation=is_relation, is_single_value=False)
+        if index is None:
+            return None, []
+        if not is_relation:
+            return index, [f"{_}" for _ in value]
+        child = self._child(state, key)
+        mint = self.minter.mint
+        uris = []
+        for _ in value:
+            if isinstance(_, dict):
+                uri = mint()
+                children.append((child, _, uri))
+                uris.append(uri)
+            else:
+                uris.append(f"{_}")
+        return index, uris
+
+    def _column(
+        self, state: _PathState, key: str, is_relation: bool, is_single_value: bool
+    ) -> int | None:
+        """Get the column of a key, returns None if the key is not part of the schema."""
+        index = state.column(key, is_relation, is_single_value, frozen=self.frozen)
+        if index is None:
+            self._report_unseen(state.path, key)
+        return index
+
+    def _report_unseen(self, path: str, key: str) -> None:
+        """Report a key that is not part of the schema, each key is reported once."""
+        if (path, key) not in self._unseen:
+            self._unseen[path, key] = None
+            if self.on_unseen is not None:
+                self.on_unseen(path, key)
+
+    def _child(self, state: _PathState, key: str) -> _PathState:
+        """Get the state of the sub path of a key, the sub paths are computed once."""
+        child = state.children.get(key)
+        if child is None:
+            child = state.children[key] = self._state(f"{state.path}/{key}")
+        return child
+
+    def _state(self, path: str) -> _PathState:
+        """Get the state of a path."""
+        state = self.states.get(path)
+        if state is None:
+            state = self.states[path] = _PathState(path)
+        return state
+
+
+def _in_column_order[T](children: list[T], spans: list[tuple[int, int, int]]) -> list[T]:
+    """Order the sub objects of an object by the columns of their keys.
+
+    Sub objects are visited in the order of the paths of the schema instead of the
+    order of the keys in the data, so that the sub entity collections are ordered
+    the same for all records. The sub objects of a key keep their order.
+    """
+    if all(spans[_][0] < spans[_ + 1][0] for _ in range(len(spans) - 1)):
+        return children
+    return [child for _, start, end in sorted(spans) for child in children[start:end]]
+
+
+def build_entities_from_data(
+    data: dict | list,
+    policy: SchemaPolicy | None = None,
+    minter: UriMinter | None = None,
+    *,
+    parallel_threshold: int | None = None,
+    max_workers: int | None = None,
+) -> Entities | None:
+    """Get entities from a data object.
+
+    By default, the schema is inferred while the entities are built, so the data is
+    traversed once. A schema policy may restrict the inference to a sample of the
+    records or provide an explicit schema, see `SchemaPolicy`.
+
+    The URIs of the entities are minted by `minter`, which defaults to monotonic
+    ULIDs, see `cmem_plugin_base.dataintegration.utils.uris`.
+
+    If there are at least `parallel_threshold` records, the list is partitioned and
+    each partition is built in a pool of `max_workers` processes, which defaults to
+    the number of CPUs. The partial schemata are merged in the order of the partitions
+    and the entities are concatenated in this order, so the result equals the result
+    of building all records in a single process, apart from the URIs.
+    """
+    if not data:
         return None
-    path_to_entities = _get_entities(
-        data=data,
-        path_to_schema_map=path_to_schema_map,
-    )
+    policy = policy if policy is not None else SchemaPolicy()
+    records = data if isinstance(data, list) else [data]
+    builder = _EntityBuilder.for_policy(policy, minter)
+    for record in policy.sample(records):
+        if isinstance(record, dict):
+            builder.observe("root", record)
+    builder.frozen = policy.mode != "full" and policy.unseen_keys != "extend"
+    if parallel_threshold is not None and len(records) >= parallel_threshold:
+        _build_in_parallel(builder, records, max_workers)
+    else:
+        with gc_paused():
+            for record in records:
+                if isinstance(record, dict):
+                    builder.add("root", record)
+    if "root" not in builder.order:
+        return None
+    path_to_schema_map = builder.schemata()
+    path_to_entities = builder.take()
     return Entities(
-        entities=iter(path_to_entities.get("root")),  # type: ignore[arg-type]
+        entities=iter(path_to_entities["root"]),
         schema=path_to_schema_map["root"],
         sub_entities=[
             Entities(entities=iter(value), schema=path_to_schema_map[key])
@@ -196,3 +576,420 @@ def build_entities_from_data(data: dict | list) -> Entities | None:
             if key != "root"
         ],
     )
+
+
+def _build_in_parallel(builder: _EntityBuilder, records: list, max_workers: int | None) -> None:
+    """Build the entities of partitions of the records in a process pool and merge them.
+
+    Each worker continues a copy of the builder, with a spawned minter so that the URIs
+    of different partitions do not collide. The builder is pickled before any partition
+    is merged into it, the entities are sent back in the binary entity encoding.
+    """
+    workers = worker_count(max_workers)
+    size = max(1, -(-len(records) // (workers * PARTITIONS_PER_WORKER)))
+    on_unseen, builder.on_unseen = builder.on_unseen, None
+    template = pickle.dumps(builder)
+    builder.on_unseen = on_unseen
+    with process_pool(workers) as executor:
+        futures = [
+            executor.submit(
+                _build_partition, template, builder.minter.spawn(), records[start : start + size]
+            )
+            for start in range(0, len(records), size)
+        ]
+        for future in futures:
+            schemata, encoded, unseen = future.result()
+            with gc_paused():
+                path_to_entities = {
+                    path: EntityReader(BytesIO(data)).read_block(len(schemata[path].paths))
+                    for path, data in encoded.items()
+                }
+                builder.merge(schemata, path_to_entities, unseen)
+
+
+def _build_partition(
+    template: bytes, minter: UriMinter, records: list
+) -> tuple[dict[str, EntitySchema], dict[str, bytes], list[tuple[str, str]]]:
+    """Build the entities of a partition of the records, executed by a worker process."""
+    builder: _EntityBuilder = pickle.loads(template)  # noqa: S301
+    builder.minter = minter
+    with gc_paused():
+        for record in records:
+            if isinstance(record, dict):
+                builder.add("root", record)
+    schemata = builder.schemata()
+    encoded = {}
+    for path, entities in builder.take().items():
+        stream = BytesIO()
+        EntityWriter(stream).write_block(entities, len(schemata[path].paths))
+        encoded[path] = stream.getvalue()
+    return schemata, encoded, list(builder._unseen)  # noqa: SLF001
+
+
+def build_entities_from_columns(
+    columns: Mapping[str, Iterable], minter: UriMinter | None = None
+) -> Entities | None:
+    """Get entities from column-oriented data, with one entity per row.
+
+    Each column is a sequence of the values of all rows, such as a list or any object
+    that exposes `__array__`, e.g. a NumPy array. Columns are converted to strings at
+    once: arrays with `astype(str)`, other sequences with `str` unless they hold strings
+    already. The rows are assembled from the converted columns, so no intermediate
+    records are created.
+
+    Like in `build_entities_from_data`, a column is multi-valued if any of its values
+    is a list or a 2-dimensional array, and None is converted to an empty value.
+
+    Args:
+        columns (Mapping[str, Iterable]): The columns by path.
+        minter (UriMinter | None): How the URIs of the entities are minted, defaults
+            to monotonic ULIDs.
+
+    Returns:
+        Entities | None: The entities, or None if there are no columns or rows.
+
+    """
+    minter = minter if minter is not None else UlidMinter()
+    with gc_paused():
+        converted = {key: _column_cells(key, value) for key, value in columns.items()}
+        lengths = {len(cells) for cells, _ in converted.values()}
+        if len(lengths) > 1:
+            raise ValueError(
+                f"Columns must have the same length, but got lengths {sorted(lengths)}."
+            )
+        if not lengths or not lengths.pop():
+            return None
+        entity = minter.entity
+        rows = zip(*(cells for cells, _ in converted.values()), strict=True)
+        entities = [entity(list(values)) for values in rows]
+    schema = EntitySchema(
+        type_uri="",
+        paths=[
+            EntityPath(key, is_single_value=is_single_value)
+            for key, (_, is_single_value) in converted.items()
+        ],
+    )
+    return Entities(entities=iter(entities), schema=schema)
+
+
+def _column_cells(key: str, column: Iterable) -> tuple[list[list[str]], bool]:
+    """Convert a column to the values of each row and whether it is single-valued."""
+    if hasattr(column, "__array__"):
+        data = column.__array__()
+        if data.dtype.kind != "O" and data.ndim == 1:
+            return [[_] for _ in data.astype(str).tolist()], True
+        if data.dtype.kind != "O" and data.ndim == 2:  # noqa: PLR2004
+            return data.astype(str).tolist(), False
+        column = data.tolist()
+    cells = column if isinstance(column, list | tuple) else list(column)
+    kinds = set(map(type, cells))
+    if kinds <= {str}:
+        return [[_] for _ in cells], True
+    if not kinds & {list, tuple, dict, type(None)}:
+        return [[_] for _ in map(str, cells)], True
+    values = []
+    is_single_value = True
+    for cell in cells:
+        if isinstance(cell, list | tuple):
+            values.append(list(map(str, cell)))
+            is_single_value = False
+        elif isinstance(cell, dict):
+            raise TypeError(f"Column '{key}' must hold scalars or lists, but holds an object.")
+        else:
+            values.append(["" if cell is None else str(cell)])
+    return values, is_single_value
+
+
+def iter_json_lines(lines: Iterable[str | bytes]) -> Iterator[dict]:
+    """Parse the records of a JSON Lines stream, such as a file opened for reading.
+
+    Empty lines are skipped.
+
+    Args:
+        lines (Iterable[str | bytes]): The lines of the stream.
+
+    Returns:
+        Iterator[dict]: The parsed records.
+
+    """
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def build_entities_from_records(
+    records: Iterable[dict],
+    policy: SchemaPolicy | None = None,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    minter: UriMinter | None = None,
+) -> Entities | None:
+    """Get entities from a stream of records, such as the records of a JSON Lines file.
+
+    In contrast to `build_entities_from_data`, the entities are built lazily while they
+    are iterated. Root entities are built one record at a time. Sub entities are
+    collected in a queue per path until they are consumed, each queue spills to disk
+    above `memory_limit` bytes.
+
+    The schema is inferred according to the policy:
+
+    - `full` (default): the records are read once and spooled to a temporary file.
+    - `first`: only the sampled records are held in memory, the other records are read
+      while the entities are iterated.
+    - `reservoir`: the records are read once and spooled to a temporary file, but the
+      schema is only inferred from the sample.
+    - `explicit`: no records are read before the entities are iterated.
+
+    Entities that have been emitted cannot be extended, so unseen keys can only be
+    ignored, with or without a warning.
+
+    Args:
+        records (Iterable[dict]): The records, e.g. from `iter_json_lines`.
+        policy (SchemaPolicy | None): How the schema is inferred.
+        memory_limit (int): The number of bytes of entities each queue holds in memory.
+        minter (UriMinter | None): How the URIs of the entities are minted, defaults
+            to monotonic ULIDs.
+
+    Returns:
+        Entities | None: The entities, or None if there are no records.
+
+    """
+    policy = policy if policy is not None else SchemaPolicy()
+    if policy.mode != "full" and policy.unseen_keys == "extend":
+        raise ValueError("The schema of streamed entities cannot be extended by unseen keys.")
+    builder = _EntityBuilder.for_policy(policy, minter)
+    iterator: Iterator[dict] = map(_check_record, records)
+    sample: list[dict] = []
+    if policy.mode == "first":
+        sample = list(islice(iterator, policy.sample_size))
+        iterator = chain(sample, iterator)
+        empty = not sample
+    elif policy.mode == "explicit":
+        first = next(iterator, None)
+        empty = first is None
+        iterator = chain([first], iterator) if first is not None else iterator
+    else:
+        sample, iterator, count = _spool(iterator, policy, builder)
+        empty = count == 0
+    for record in sample:
+        builder.observe("root", record)
+    if empty:
+        return None
+    builder.frozen = True
+    return _StreamingBuilder(iterator, builder, memory_limit).build()
+
+
+def build_entities_from_json_stream(  # noqa: PLR0913
+    file: "File",
+    project_id: str,
+    item_path: str = "",
+    *,
+    policy: SchemaPolicy | None = None,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    minter: UriMinter | None = None,
+) -> Entities | None:
+    """Get entities from the items of an array in a JSON file.
+
+    The file is read through `File.bytes_stream` and parsed incrementally with
+    `iter_json_items`, so the document is never loaded as a whole. Each object in the
+    array becomes a root entity, other items are skipped. The entities are built by
+    `build_entities_from_records`. Depending on the policy, the file stays open until
+    the entities have been iterated.
+
+    Args:
+        file (File): The JSON file.
+        project_id (str): The project of the file.
+        item_path (str): The keys of the nested objects that lead to the array,
+            separated by slashes. The root value is used if the path is empty.
+        policy (SchemaPolicy | None): How the schema is inferred.
+        memory_limit (int): The number of bytes of entities each queue holds in memory.
+        minter (UriMinter | None): How the URIs of the entities are minted, defaults
+            to monotonic ULIDs.
+
+    Returns:
+        Entities | None: The entities, or None if there are no objects.
+
+    """
+    return build_entities_from_records(
+        _iter_json_objects(file, project_id, item_path), policy, memory_limit, minter
+    )
+
+
+def _iter_json_objects(file: "File", project_id: str, item_path: str) -> Iterator[dict]:
+    """Iterate over the objects in the array of a JSON file, keeping the file open."""
+    with file.bytes_stream(project_id) as stream:
+        for item in iter_json_items(stream, item_path):
+            if isinstance(item, dict):
+                yield item
+
+
+def _check_record(record: object) -> dict:
+    """Check that a record is a dict."""
+    if not isinstance(record, dict):
+        raise TypeError(f"Records must be dicts, but got {type(record).__name__}.")
+    return record
+
+
+def _spool(
+    records: Iterator[dict], policy: SchemaPolicy, builder: "_EntityBuilder"
+) -> tuple[list[dict], Iterator[dict], int]:
+    """Spool records to a temporary file.
+
+    In full mode, all records are observed by the builder while they are spooled.
+    Otherwise, a reservoir sample is kept. Returns the sample, the spooled records and
+    their number.
+    """
+    spool = tempfile.TemporaryFile()  # noqa: SIM115
+    rng = random.Random(policy.seed)  # noqa: S311
+    sample: list[dict] = []
+    count = 0
+    try:
+        for record in records:
+            spool.write(_pickle_record(record))
+            if policy.mode == "full":
+                builder.observe("root", record)
+            elif count < policy.sample_size:
+                sample.append(record)
+            else:
+                index = rng.randrange(count + 1)
+                if index < policy.sample_size:
+                    sample[index] = record
+            count += 1
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return sample, _unspool(spool), count
+
+
+def _unspool(spool: IO[bytes]) -> Iterator[dict]:
+    """Read the records of a spool file and close it."""
+    with spool:
+        while True:
+            try:
+                record = pickle.load(spool)  # noqa: S301
+            except EOFError:
+                return
+            yield _unflatten(record) if isinstance(record, _FlatRecord) else record
+
+
+class _Nested:
+    """Marks the start of an object or a list in a flattened record."""
+
+    __slots__ = ("is_dict", "size")
+
+    def __init__(self, is_dict: bool, size: int) -> None:
+        self.is_dict = is_dict
+        self.size = size
+
+    def __reduce__(self) -> tuple:
+        """Pickle the marker compactly."""
+        return _Nested, (self.is_dict, self.size)
+
+
+class _FlatRecord(list):
+    """A record that is flattened into a list of keys, values and `_Nested` markers."""
+
+    __slots__ = ()
+
+
+def _pickle_record(record: dict) -> bytes:
+    """Pickle a record, flattening it first if it is nested too deeply for pickle."""
+    try:
+        return pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+    except RecursionError:
+        return pickle.dumps(_flatten(record), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _flatten(record: dict) -> _FlatRecord:
+    """Flatten a record in depth-first order, keys precede their values."""
+    tokens = _FlatRecord()
+    stack: list = [record]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            tokens.append(_Nested(is_dict=True, size=len(value)))
+            for key, item in reversed(value.items()):
+                stack.append(item)
+                stack.append(key)
+        elif isinstance(value, list):
+            tokens.append(_Nested(is_dict=False, size=len(value)))
+            stack.extend(reversed(value))
+        else:
+            tokens.append(value)
+    return tokens
+
+
+def _unflatten(tokens: _FlatRecord) -> dict:
+    """Restore a flattened record."""
+    root = None
+    # each frame holds a container, the number of missing values and a pending key
+    stack: list[list] = []
+    for token in tokens:
+        value = ({} if token.is_dict else []) if isinstance(token, _Nested) else token
+        if not stack:
+            root = value
+        else:
+            frame = stack[-1]
+            container = frame[0]
+            if isinstance(container, list):
+                container.append(value)
+                frame[1] -= 1
+            elif frame[2] is _Nested:
+                frame[2] = value
+                continue
+            else:
+                container[frame[2]] = value
+                frame[1] -= 1
+                frame[2] = _Nested
+        if isinstance(token, _Nested) and token.size:
+            stack.append([value, token.size, _Nested])
+        while stack and not stack[-1][1]:
+            stack.pop()
+    return root  # type: ignore[return-value]
+
+
+class _StreamingBuilder:
+    """Builds entities of records on demand and queues them per path."""
+
+    def __init__(self, records: Iterator[dict], builder: _EntityBuilder, memory_limit: int) -> None:
+        self.records = records
+        self.builder = builder
+        self.path_to_schema_map = builder.schemata()
+        self.queues = {
+            path: EntityQueue(len(schema.paths), memory_limit)
+            for path, schema in self.path_to_schema_map.items()
+        }
+
+    def build(self) -> Entities:
+        """Get the root entities with one collection of sub entities per path."""
+        return Entities(
+            entities=self._entities("root"),
+            schema=self.path_to_schema_map["root"],
+            sub_entities=[
+                Entities(entities=self._entities(path), schema=schema)
+                for path, schema in self.path_to_schema_map.items()
+                if path != "root"
+            ],
+        )
+
+    def _entities(self, path: str) -> Iterator[Entity]:
+        """Iterate over the entities of a path, reading further records on demand."""
+        queue = self.queues[path]
+        while True:
+            entity = queue.popleft()
+            if entity is not None:
+                yield entity
+            elif not self._advance():
+                return
+
+    def _advance(self) -> bool:
+        """Build the entities of the next record, returns False if there are none."""
+        record = next(self.records, None)
+        if record is None:
+            return False
+        self.builder.add("root", record)
+        for path, entities in self.builder.take().items():
+            queue = self.queues[path]
+            for entity in entities:
+                queue.append(entity)
+        return True
@@ -0,0 +1,176 @@
+"""Incremental parsing of JSON documents from binary streams."""
+
+import codecs
+import json
+import re
+from collections.abc import Iterator
+from typing import IO
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+"""Default number of bytes that are read from the stream at once."""
+
+_NON_WHITESPACE = re.compile(r"[^ \t\n\r]")
+
+_NUMBER = frozenset("+-.0123456789Ee")
+"""Characters that may continue a number."""
+
+_LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+"""Literals that may be cut off by the end of the buffer."""
+
+
+class _JsonReader:
+    """Reads JSON values from a binary stream, holding at most one value in memory.
+
+    The stream is decoded into a text buffer chunk by chunk. Values are parsed with the
+    C scanner of the `json` module. If a value is cut off by the end of the buffer, more
+    text is read and the value is parsed again, the amount of text that is read grows
+    with the size of the value, so that parsing large values takes linear time. Syntax
+    errors are raised as soon as they are found.
+    """
+
+    def __init__(self, stream: IO[bytes], chunk_size: int) -> None:
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        self.offset = 0
+        self._lines = 0
+        self._line_start = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._scan = json.JSONDecoder().raw_decode
+
+    def peek(self) -> str:
+        """Skip whitespace and get the next character, returns '' at the end."""
+        while True:
+            match = _NON_WHITESPACE.search(self.buffer, self.position)
+            if match is not None:
+                self.position = match.start()
+                return self.buffer[self.position]
+            self.position = len(self.buffer)
+            if not self._fill(self.chunk_size):
+                return ""
+
+    def expect(self, characters: str) -> str:
+        """Consume the next character, which must be one of the given characters."""
+        character = self.peek()
+        if not character or character not in characters:
+            expected = " or ".join(f"'{_}'" for _ in characters)
+            found = f"'{character}'" if character else "the end of the document"
+            raise ValueError(f"Expected {expected}, but found {found}.")
+        self.position += 1
+        return character
+
+    def value(self) -> object:
+        """Parse the next value."""
+        self.peek()
+        while True:
+            grow = max(self.chunk_size, len(self.buffer) - self.position)
+            try:
+                value, end = self._scan(self.buffer, self.position)
+            except json.JSONDecodeError as error:
+                if _is_cut_off(error) and self._fill(grow):
+                    continue
+                raise self._locate(error) from None
+            # a number that is cut off by the end of the buffer is parsed partially
+            if (end == len(self.buffer) or self.buffer[end] in _NUMBER) and self._fill(grow):
+                continue
+            self.position = end
+            return value
+
+    def find(self, key: str) -> None:
+        """Move to the value of a key of the next object."""
+        self.expect("{")
+        if self.peek() == "}":
+            raise KeyError(f"Key '{key}' not found.")
+        while True:
+            if self.peek() != '"':
+                self.expect('"')
+            name = self.value()
+            self.expect(":")
+            if name == key:
+                return
+            self.value()
+            if self.expect(",}") == "}":
+                raise KeyError(f"Key '{key}' not found.")
+
+    def items(self) -> Iterator[object]:
+        """Iterate over the items of the next array."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+    def _locate(self, error: json.JSONDecodeError) -> json.JSONDecodeError:
+        """Get an error whose position is relative to the document instead of the buffer."""
+        position = self.offset + error.pos
+        lines = self.buffer.count("\n", 0, error.pos)
+        line = self._lines + lines + 1
+        column = error.colno if lines else position - self._line_start + 1
+        located = json.JSONDecodeError(error.msg, self.buffer, error.pos)
+        located.pos, located.lineno, located.colno = position, line, column
+        located.args = (f"{error.msg}: line {line} column {column} (char {position})",)
+        return located
+
+    def _fill(self, size: int) -> bool:
+        """Read more text, returns False if the stream is exhausted."""
+        if self.eof:
+            return False
+        text = ""
+        while not text and not self.eof:
+            chunk = self.stream.read(size)
+            self.eof = not chunk
+            text = self._decoder.decode(chunk, final=self.eof)
+        lines = self.buffer.count("\n", 0, self.position)
+        if lines:
+            self._lines += lines
+            self._line_start = self.offset + self.buffer.rindex("\n", 0, self.position) + 1
+        self.offset += self.position
+        self.buffer = self.buffer[self.position :] + text
+        self.position = 0
+        return bool(text)
+
+
+def _is_cut_off(error: json.JSONDecodeError) -> bool:
+    """Check if a value may be valid, but is cut off by the end of the parsed text."""
+    if error.msg.startswith("Unterminated string"):
+        return True
+    if error.msg.startswith("Invalid \\uXXXX escape"):
+        # the position of the error is the 'u' of the escape, which the scanner only
+        # decodes if it is followed by four digits and another character
+        return len(error.doc) - error.pos <= 5  # noqa: PLR2004
+    rest = error.doc[error.pos : error.pos + 10]
+    # the fraction or exponent of a number in an array or object, such as `[1.`
+    if len(rest) <= 2 and _NUMBER.issuperset(rest):  # noqa: PLR2004
+        return True
+    return any(_.startswith(rest) for _ in _LITERALS)
+
+
+def iter_json_items(
+    stream: IO[bytes], item_path: str = "", chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[object]:
+    """Iterate over the items of an array in a JSON document without loading the document.
+
+    Only the current item and the text it has been parsed from are held in memory. If
+    the value at the item path is not an array, it is the only item. The document is
+    read up to the end of the value at the item path, the remainder is not validated.
+
+    :param stream: The binary stream of a UTF-8 encoded JSON document.
+    :param item_path: The keys of the nested objects that lead to the array, separated
+        by slashes. Values of other keys are parsed and dropped one at a time.
+    :param chunk_size: The number of bytes that are read from the stream at once.
+    """
+    reader = _JsonReader(stream, chunk_size)
+    for key in filter(None, item_path.split("/")):
+        try:
+            reader.find(key)
+        except KeyError:
+            raise KeyError(f"Key '{key}' of item path '{item_path}' not found.") from None
+    if reader.peek() == "[":
+        yield from reader.items()
+    else:
+        yield reader.value()
@@ -0,0 +1,124 @@
+"""Write entities with their sub entities as nested JSON documents."""
+
+import json
+from collections.abc import Iterator
+from typing import IO
+
+from cmem_plugin_base.dataintegration.entity import Entities, Entity, EntitySchema
+from cmem_plugin_base.dataintegration.utils.replay import DEFAULT_MEMORY_LIMIT
+from cmem_plugin_base.dataintegration.utils.resolver import EntityResolver
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+"""Default number of characters that are collected before they are written to the stream."""
+
+
+def iter_nested_objects(
+    entities: Entities, memory_limit: int = DEFAULT_MEMORY_LIMIT
+) -> Iterator[dict]:
+    """Iterate over the entities as nested objects, the reverse of `build_entities_from_data`.
+
+    The sub entities are indexed by an `EntityResolver`, then each entity is turned into
+    an object with one key per path. Values of relation paths are replaced by the objects
+    of the sub entities they reference, values that do not reference a sub entity are
+    kept as they are, empty values of single value relations become None. Single value
+    paths hold their first value, all other paths a list of values.
+
+    :param entities: The entities and the sub entities they reference.
+    :param memory_limit: The number of bytes of sub entities that are held in memory,
+        further sub entities are spilled to disk.
+    """
+    with EntityResolver(entities, memory_limit) as resolver:
+        schema = entities.schema
+        for entity in entities.entities:
+            yield _nest(resolver, schema, entity)
+
+
+def write_nested_json(
+    entities: Entities,
+    stream: IO[bytes],
+    *,
+    json_lines: bool = False,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+) -> int:
+    """Write the entities as nested objects to a binary stream.
+
+    The objects are encoded one at a time and collected in a buffer, which is written
+    to the stream when it exceeds `buffer_size` characters, so that the output is never
+    held in memory as a whole. See `iter_nested_objects` for the structure of the objects.
+
+    :param entities: The entities and the sub entities they reference.
+    :param stream: The stream the UTF-8 encoded output is written to.
+    :param json_lines: Write one object per line instead of a JSON array.
+    :param memory_limit: The number of bytes of sub entities that are held in memory.
+    :param buffer_size: The number of characters that are written to the stream at once.
+    :return: The number of written objects.
+    """
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    separator = "\n" if json_lines else ","
+    buffer: list[str] = [] if json_lines else ["["]
+    size = 0
+    count = 0
+    for document in iter_nested_objects(entities, memory_limit):
+        text = encode(document)
+        if count and not json_lines:
+            buffer.append(separator)
+        buffer.append(text)
+        if json_lines:
+            buffer.append(separator)
+        size += len(text) + 1
+        count += 1
+        if size >= buffer_size:
+            stream.write("".join(buffer).encode())
+            buffer = []
+            size = 0
+    if not json_lines:
+        buffer.append("]")
+    if buffer:
+        stream.write("".join(buffer).encode())
+    return count
+
+
+def _nest(resolver: EntityResolver, schema: EntitySchema, entity: Entity) -> dict:
+    """Turn an entity into a nested object.
+
+    Sub entities are expanded with an explicit stack instead of recursion, so that deeply
+    nested entities do not exceed the recursion limit. Each object on the stack keeps the
+    URIs of its ancestors to detect entities that reference themselves.
+    """
+    root: dict = {}
+    stack: list[tuple[EntitySchema, Entity, dict, tuple | None]] = [(schema, entity, root, None)]
+    while stack:
+        schema, entity, target, ancestors = stack.pop()
+        chain = (entity.uri, ancestors)
+        for path, values in zip(schema.paths, entity.values, strict=True):
+            if not path.is_relation:
+                if path.is_single_value:
+                    target[path.path] = values[0] if values else ""
+                else:
+                    target[path.path] = list(values)
+                continue
+            nested: list = []
+            for value in values:
+                found = resolver.find(value)
+                if found is None:
+                    if value:
+                        nested.append(value)
+                    continue
+                _check_cycle(value, chain)
+                child: dict = {}
+                nested.append(child)
+                stack.append((found[0], found[1], child, chain))
+            if path.is_single_value:
+                target[path.path] = nested[0] if nested else None
+            else:
+                target[path.path] = nested
+    return root
+
+
+def _check_cycle(uri: str, chain: tuple | None) -> None:
+    """Raise an error if an URI is part of a chain of ancestors."""
+    while chain is not None:
+        if chain[0] == uri:
+            raise ValueError(f"Entity '{uri}' references itself, it cannot be nested.")
+        chain = chain[1]
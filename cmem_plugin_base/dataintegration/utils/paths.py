@@ -0,0 +1,320 @@
+r"""Compile DataIntegration paths and evaluate them against nested documents.
+
+A path is a sequence of steps:
+
+- Forward steps `/key` follow the key of an object. The leading slash of the first
+  step may be omitted, e.g. `city/name`.
+- Backward steps `\key` go back to the object that holds the current value under
+  `key`, `\..` goes back to the holding object regardless of its key.
+- Filters `[key = 'value']` keep the values whose `key` has a matching value, the
+  operators are `=`, `!=`, `<`, `<=`, `>` and `>=`. `[@lang = 'en']` matches the
+  language of JSON-LD value objects such as `{"@value": "Berlin", "@language": "en"}`.
+
+Keys that contain reserved characters are written in angle brackets, e.g.
+`<http://xmlns.com/foaf/0.1/name>`. Arrays are transparent, a step is applied to each
+of their items.
+"""
+
+import re
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import IO
+
+from cmem_plugin_base.dataintegration.entity import Entities, Entity, EntityPath, EntitySchema
+from cmem_plugin_base.dataintegration.utils.json_stream import iter_json_items
+from cmem_plugin_base.dataintegration.utils.uris import UlidMinter, UriMinter
+
+PARENT = ".."
+"""Key of a backward step that goes back regardless of the key."""
+
+LANGUAGE = "@lang"
+"""Operand of a filter that matches the language of a value."""
+
+_NAME = re.compile(r"<([^>]*)>|([^/\\\[\]]+)")
+_FILTER = re.compile(
+    r"""\[\s*(@lang|<[^>]*>|[^\s=!<>\]]+)\s*(!=|<=|>=|=|<|>)\s*"""
+    r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|[^\s\]]+)\s*\]"""
+)
+_ESCAPE = re.compile(r"\\(.)")
+
+Resolver = Callable[[str], object]
+"""Resolves a string value, such as an identifier, to the object it references or None."""
+
+_Node = tuple[object, str | None, "_Node | None"]
+"""A value, the key it has been reached with and the node of the object holding it."""
+
+
+@dataclass(frozen=True)
+class ForwardStep:
+    """Follow a key of an object."""
+
+    key: str
+
+
+@dataclass(frozen=True)
+class BackwardStep:
+    """Go back to the object that holds the current value under a key."""
+
+    key: str
+
+
+@dataclass(frozen=True)
+class PathFilter:
+    """Keep the values whose operand compares to a literal."""
+
+    operand: str
+    operator: str
+    literal: str
+
+    def matches(self, value: object) -> bool:
+        """Check if a value matches the filter."""
+        if not isinstance(value, dict):
+            return False
+        if self.operand == LANGUAGE:
+            candidates: list[str] = []
+            language = value.get("@language")
+            if isinstance(language, str):
+                candidates.append(language)
+        else:
+            candidates = _strings(_flatten(value.get(self.operand), []))
+        compare = _COMPARISONS[self.operator]
+        return any(compare(_, self.literal) for _ in candidates)
+
+
+Step = ForwardStep | BackwardStep | PathFilter
+
+
+class PathExpression:
+    """A compiled path, see the module documentation for the syntax.
+
+    Paths that only consist of forward steps are evaluated on the values directly, all
+    other paths keep track of the objects holding each value for backward steps.
+
+    :param path: The path string.
+    """
+
+    __slots__ = ("_evaluate", "path", "steps")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.steps = tuple(_parse(path))
+        if all(isinstance(_, ForwardStep) for _ in self.steps):
+            keys = tuple(_.key for _ in self.steps)  # type: ignore[union-attr]
+            self._evaluate = _forward_evaluator(keys)
+        else:
+            self._evaluate = _node_evaluator(self.steps)
+
+    def __repr__(self) -> str:
+        """Get a string representation"""
+        return f"PathExpression({self.path!r})"
+
+    def evaluate(self, document: object, resolve: Resolver | None = None) -> list[object]:
+        """Get the values of the path in a document.
+
+        :param document: A nested structure of dicts and lists, e.g. parsed JSON.
+        :param resolve: Resolves string values that a forward step is applied to, which
+            allows to hop relations between documents, e.g. by an `@id` index.
+        """
+        return self._evaluate(document, resolve)
+
+    def values(self, document: object, resolve: Resolver | None = None) -> list[str]:
+        """Get the values of the path in a document as strings.
+
+        Objects are represented by their `@value` or `@id` key and skipped otherwise,
+        None values are skipped.
+        """
+        return _strings(self._evaluate(document, resolve))
+
+
+@lru_cache(maxsize=1024)
+def _compile(path: str) -> PathExpression:
+    """Compile a path string."""
+    return PathExpression(path)
+
+
+def compile_path(path: str | EntityPath) -> PathExpression:
+    """Compile a path, expressions of recently used paths are reused."""
+    return _compile(path.path if isinstance(path, EntityPath) else path)
+
+
+class DocumentProjector:
+    """Build entities of a schema from nested documents.
+
+    Only the paths of the schema are evaluated, the documents are not flattened. Single
+    value paths keep their first value.
+
+    :param schema: The schema of the entities.
+    :param minter: The strategy to mint the URIs of the entities.
+    :param resolve: Resolves string values to referenced objects, see
+        `PathExpression.evaluate`.
+    """
+
+    def __init__(
+        self,
+        schema: EntitySchema,
+        minter: UriMinter | None = None,
+        resolve: Resolver | None = None,
+    ) -> None:
+        self.schema = schema
+        self.minter = minter if minter is not None else UlidMinter()
+        self.resolve = resolve
+        self.expressions = [
+            (compile_path(_), 1 if _.is_single_value else None) for _ in schema.paths
+        ]
+
+    def entity(self, document: object) -> Entity:
+        """Build the entity of a document."""
+        resolve = self.resolve
+        values = [
+            expression.values(document, resolve)[:limit] for expression, limit in self.expressions
+        ]
+        return self.minter.entity(values)
+
+    def entities(self, documents: Iterable[object]) -> Entities:
+        """Build the entities of documents lazily."""
+        return Entities(entities=map(self.entity, documents), schema=self.schema)
+
+
+def project_json_stream(
+    stream: IO[bytes],
+    schema: EntitySchema,
+    item_path: str = "",
+    minter: UriMinter | None = None,
+) -> Entities:
+    """Build entities of a schema from the objects of an array in a JSON document.
+
+    The document is parsed incrementally with `iter_json_items` and only the paths of
+    the schema are evaluated for each object. Items that are not objects are skipped.
+
+    :param stream: The binary stream of a UTF-8 encoded JSON document.
+    :param schema: The schema of the entities.
+    :param item_path: The keys that lead to the array, separated by slashes.
+    :param minter: The strategy to mint the URIs of the entities.
+    """
+    items = (_ for _ in iter_json_items(stream, item_path) if isinstance(_, dict))
+    return DocumentProjector(schema, minter).entities(items)
+
+
+def _parse(path: str) -> Iterator[Step]:
+    """Parse the steps of a path."""
+    position = 0
+    while position < len(path):
+        character = path[position]
+        if position == 0 and character not in "/\\[":
+            # the first step is a forward step without a leading slash
+            character = "/"
+            position = -1
+        if character == "[":
+            match = _FILTER.match(path, position)
+            if match is None:
+                raise ValueError(f"Invalid filter at position {position} of path '{path}'.")
+            operand, operator, literal = match.groups()
+            if literal[0] in "'\"":
+                literal = _ESCAPE.sub(r"\1", literal[1:-1])
+            yield PathFilter(operand.strip("<>"), operator, literal)
+        elif character in "/\\":
+            match = _NAME.match(path, position + 1)
+            if match is None:
+                raise ValueError(f"Expected a key at position {position + 1} of path '{path}'.")
+            key = match.group(1) if match.group(1) is not None else match.group(2).strip()
+            yield ForwardStep(key) if character == "/" else BackwardStep(key)
+        else:
+            raise ValueError(f"Unexpected '{character}' at position {position} of path '{path}'.")
+        position = match.end()
+
+
+def _forward_evaluator(keys: tuple[str, ...]) -> Callable[[object, Resolver | None], list]:
+    """Compile a path of forward steps."""
+
+    def evaluate(document: object, resolve: Resolver | None) -> list:
+        values = [document]
+        for key in keys:
+            found: list = []
+            for value in values:
+                if resolve is not None and isinstance(value, str):
+                    value = resolve(value)  # noqa: PLW2901
+                if isinstance(value, dict):
+                    _flatten(value.get(key), found)
+            values = found
+        return values
+
+    return evaluate
+
+
+def _node_evaluator(steps: tuple[Step, ...]) -> Callable[[object, Resolver | None], list]:
+    """Compile a path with backward steps or filters."""
+
+    def evaluate(document: object, resolve: Resolver | None) -> list:
+        nodes: list[_Node] = [(document, None, None)]
+        for step in steps:
+            if isinstance(step, ForwardStep):
+                nodes = _forward(nodes, step.key, resolve)
+            elif isinstance(step, BackwardStep):
+                nodes = _backward(nodes, step.key)
+            else:
+                nodes = [_ for _ in nodes if step.matches(_[0])]
+        return [_[0] for _ in nodes]
+
+    return evaluate
+
+
+def _forward(nodes: list[_Node], key: str, resolve: Resolver | None) -> list[_Node]:
+    """Apply a forward step to nodes."""
+    found: list[_Node] = []
+    for node in nodes:
+        value = node[0]
+        if resolve is not None and isinstance(value, str):
+            value = resolve(value)
+        if isinstance(value, dict):
+            found.extend((_, key, node) for _ in _flatten(value.get(key), []))
+    return found
+
+
+def _backward(nodes: list[_Node], key: str) -> list[_Node]:
+    """Apply a backward step to nodes, each holding object is returned once."""
+    found: dict[int, _Node] = {}
+    for _value, reached_by, parent in nodes:
+        if parent is not None and (key in (PARENT, reached_by)):
+            found.setdefault(id(parent), parent)
+    return list(found.values())
+
+
+def _flatten(value: object, into: list) -> list:
+    """Append a value or the items of nested lists to a list, skipping None."""
+    if isinstance(value, list):
+        for _ in value:
+            _flatten(_, into)
+    elif value is not None:
+        into.append(value)
+    return into
+
+
+def _strings(values: list) -> list[str]:
+    """Get the string representation of values."""
+    strings = []
+    for value in values:
+        if isinstance(value, dict):
+            value = value.get("@value", value.get("@id"))  # noqa: PLW2901
+            if value is None or isinstance(value, dict | list):
+                continue
+        strings.append(value if isinstance(value, str) else f"{value}")
+    return strings
+
+
+def _less(left: str, right: str) -> bool:
+    """Compare numerically if both values are numbers, lexicographically otherwise."""
+    try:
+        return float(left) < float(right)
+    except ValueError:
+        return left < right
+
+
+_COMPARISONS: dict[str, Callable[[str, str], bool]] = {
+    "=": str.__eq__,
+    "!=": str.__ne__,
+    "<": _less,
+    ">": lambda left, right: _less(right, left),
+    "<=": lambda left, right: not _less(right, left),
+    ">=": lambda left, right: not _less(left, right),
+}
@@ -0,0 +1,29 @@
+"""Process pools for running work in parallel."""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def worker_count(max_workers: int | None = None) -> int:
+    """Get the number of worker processes, by default the number of usable CPUs.
+
+    :param max_workers: The requested number of workers, if any.
+    """
+    return max_workers if max_workers is not None else os.process_cpu_count() or 1
+
+
+def process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Create a process pool whose workers are safe to start from any process.
+
+    Forking a multi-threaded process is unsafe, so workers are started from a fork
+    server where available and spawned otherwise.
+
+    :param max_workers: The number of worker processes.
+    """
+    start_method = (
+        "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    )
+    return ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context(start_method)
+    )
@@ -0,0 +1,313 @@
+"""Entities that are buffered in memory and spilled to disk."""
+
+import tempfile
+import weakref
+from collections import deque
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO
+
+from cmem_plugin_base.dataintegration.entity import Entities, Entity
+from cmem_plugin_base.dataintegration.utils.codec import EntityReader, EntityWriter
+
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+"""Default number of bytes of entities that are held in memory before spilling to disk."""
+
+SPILL_BLOCK_SIZE = 1000
+"""Number of entities that are written to the spill file at once."""
+
+
+def estimate_size(entity: Entity) -> int:
+    """Estimate the number of bytes an entity occupies in memory."""
+    size = 100 + len(entity.uri)
+    for values in entity.values:
+        size += 64
+        for value in values:
+            size += 56 + len(value)
+    return size
+
+
+class _SpillFile:
+    """A temporary file of spilled entities with an open writer and optionally a reader.
+
+    The file is removed when `close` is called or the object is garbage collected.
+    """
+
+    def __init__(self, readable: bool = False) -> None:
+        with tempfile.NamedTemporaryFile(prefix="entities-", suffix=".spill", delete=False) as _:
+            self.path = Path(_.name)
+        self.writer = EntityWriter(self.path.open("wb"))
+        streams = [self.writer.stream]
+        self.reader: EntityReader | None = None
+        if readable:
+            self.reader = EntityReader(self.path.open("rb"))
+            streams.append(self.reader.stream)
+        self._finalizer = weakref.finalize(self, _remove_spill_file, self.path, *streams)
+
+    def close(self) -> None:
+        """Close the streams and remove the file."""
+        self._finalizer()
+
+
+def _remove_spill_file(path: Path, *streams: IO[bytes]) -> None:
+    """Close the streams of a spill file and remove it."""
+    for stream in streams:
+        stream.close()
+    path.unlink(missing_ok=True)
+
+
+class _Recording:
+    """Records the entities of a one-shot iterator in memory and in a spill file.
+
+    Spilled entities are collected in a pending list and written in blocks of
+    `SPILL_BLOCK_SIZE` entities, using the binary entity encoding.
+    """
+
+    def __init__(self, source: Iterator[Entity], columns: int, memory_limit: int) -> None:
+        self.source = source
+        self.columns = columns
+        self.memory_limit = memory_limit
+        self.memory: list[Entity] = []
+        self.memory_size = 0
+        self.pending: list[Entity] = []
+        self.blocks: list[int] = []
+        self.spill_path: Path | None = None
+        self.exhausted = False
+        self._writer: EntityWriter | None = None
+        self._dirty = False
+        self._spill_file: _SpillFile | None = None
+
+    @property
+    def count(self) -> int:
+        """Number of entities recorded so far."""
+        return len(self.memory) + len(self.blocks) * SPILL_BLOCK_SIZE + len(self.pending)
+
+    def fill(self) -> Entity | None:
+        """Record the next entity of the source, returns None if the source is exhausted."""
+        if self.exhausted:
+            return None
+        entity = next(self.source, None)
+        if entity is None:
+            self.exhausted = True
+            self.source = iter(())
+            return None
+        if self._writer is None:
+            size = estimate_size(entity)
+            if self.memory_size + size <= self.memory_limit:
+                self.memory.append(entity)
+                self.memory_size += size
+                return entity
+            self._open_writer()
+        self.pending.append(entity)
+        if len(self.pending) == SPILL_BLOCK_SIZE:
+            stream = self._writer.stream  # type: ignore[union-attr]
+            self.blocks.append(stream.tell())
+            self._writer.write_block(self.pending, self.columns)  # type: ignore[union-attr]
+            self.pending = []
+            self._dirty = True
+        return entity
+
+    def read_block(self, reader: EntityReader, block: int) -> list[Entity]:
+        """Read a spilled block of entities."""
+        if self._dirty:
+            self._writer.stream.flush()  # type: ignore[union-attr]
+            self._dirty = False
+        reader.stream.seek(self.blocks[block])
+        return reader.read_block(self.columns)
+
+    def _open_writer(self) -> None:
+        """Create the spill file."""
+        self._spill_file = _SpillFile()
+        self.spill_path = self._spill_file.path
+        self._writer = self._spill_file.writer
+
+    def close(self) -> None:
+        """Remove the spill file and drop all recorded entities."""
+        if self._spill_file is not None:
+            self._spill_file.close()
+        self.memory = []
+        self.pending = []
+        self.blocks = []
+        self.exhausted = True
+
+
+class EntityQueue:
+    """A first-in first-out queue of entities that spills to disk.
+
+    Entities are held in memory until `memory_limit` bytes are reached. All further
+    entities are written to a temporary file in blocks of `SPILL_BLOCK_SIZE` entities,
+    until the queue has been drained. Then the file is truncated and entities are held
+    in memory again.
+
+    :param columns: The number of value sequences of each entity.
+    :param memory_limit: The number of bytes of entities that are held in memory.
+    """
+
+    def __init__(self, columns: int, memory_limit: int = DEFAULT_MEMORY_LIMIT) -> None:
+        self.columns = columns
+        self.memory_limit = memory_limit
+        self.memory: deque[tuple[Entity, int]] = deque()
+        self.memory_size = 0
+        self.spill_path: Path | None = None
+        self._spilled = 0
+        self._pending: list[Entity] = []
+        self._current: deque[Entity] = deque()
+        self._writer: EntityWriter | None = None
+        self._reader: EntityReader | None = None
+        self._spill_file: _SpillFile | None = None
+
+    def __len__(self) -> int:
+        """Get the number of queued entities."""
+        return len(self.memory) + len(self._current) + self._spilled + len(self._pending)
+
+    def append(self, entity: Entity) -> None:
+        """Add an entity to the end of the queue."""
+        if not self._spilled and not self._pending and not self._current:
+            size = estimate_size(entity)
+            if self.memory_size + size <= self.memory_limit:
+                self.memory.append((entity, size))
+                self.memory_size += size
+                return
+        self._pending.append(entity)
+        if len(self._pending) == SPILL_BLOCK_SIZE:
+            if self._writer is None:
+                self._open()
+            self._writer.write_block(self._pending, self.columns)  # type: ignore[union-attr]
+            self._spilled += len(self._pending)
+            self._pending = []
+
+    def popleft(self) -> Entity | None:
+        """Remove and return the first entity, returns None if the queue is empty."""
+        if self.memory:
+            entity, size = self.memory.popleft()
+            self.memory_size -= size
+            return entity
+        if not self._current:
+            if self._spilled:
+                writer: EntityWriter = self._writer  # type: ignore[assignment]
+                reader: EntityReader = self._reader  # type: ignore[assignment]
+                writer.stream.flush()
+                self._current.extend(reader.read_block(self.columns))
+                self._spilled -= len(self._current)
+                if not self._spilled:
+                    writer.stream.seek(0)
+                    writer.stream.truncate()
+                    reader.stream.seek(0)
+            elif self._pending:
+                self._current.extend(self._pending)
+                self._pending = []
+            else:
+                return None
+        return self._current.popleft()
+
+    def close(self) -> None:
+        """Remove the spill file and drop all queued entities."""
+        if self._spill_file is not None:
+            self._spill_file.close()
+        self.memory.clear()
+        self.memory_size = 0
+        self._current.clear()
+        self._pending = []
+        self._spilled = 0
+
+    def _open(self) -> None:
+        """Create the spill file."""
+        self._spill_file = _SpillFile(readable=True)
+        self.spill_path = self._spill_file.path
+        self._writer = self._spill_file.writer
+        self._reader = self._spill_file.reader
+
+
+class ReplayableEntities(Entities):
+    """Entities that can be iterated any number of times.
+
+    The entities of the source are recorded while they are iterated for the first time.
+    Entities are held in memory until `memory_limit` bytes are reached, all further
+    entities are spilled to a temporary file in the binary entity encoding. Each access
+    to `entities` returns a new iterator that starts at the first entity, so two-pass
+    operators can process inputs that are larger than the available memory. Sub entities
+    are replayable as well.
+
+    The temporary file is removed when `close` is called, the context is exited or the
+    object is garbage collected.
+
+    :param entities: The source entities, which are iterated at most once.
+    :param memory_limit: The number of bytes of entities that are held in memory.
+    """
+
+    _recording: _Recording
+
+    def __init__(self, entities: Entities, memory_limit: int = DEFAULT_MEMORY_LIMIT) -> None:
+        self.memory_limit = memory_limit
+        # the schema is needed to record the entities, which are assigned first
+        self.schema = entities.schema
+        super().__init__(
+            entities=entities.entities,
+            schema=entities.schema,
+            sub_entities=[ReplayableEntities(_, memory_limit) for _ in entities.sub_entities]
+            if entities.sub_entities is not None
+            else None,
+        )
+
+    @property  # type: ignore[override]
+    def entities(self) -> Iterator[Entity]:
+        """Get a new iterator over all entities."""
+        return self._replay()
+
+    @entities.setter
+    def entities(self, entities: Iterator[Entity]) -> None:
+        self._recording = _Recording(iter(entities), len(self.schema.paths), self.memory_limit)
+
+    def count(self) -> int:
+        """Count the entities, recording all remaining entities of the source."""
+        recording = self._recording
+        while recording.fill() is not None:
+            pass
+        return recording.count
+
+    def close(self) -> None:
+        """Remove all recorded entities, including the ones of the sub entities."""
+        self._recording.close()
+        for sub_entities in self.sub_entities or []:
+            if isinstance(sub_entities, ReplayableEntities):
+                sub_entities.close()
+
+    def __enter__(self) -> "ReplayableEntities":  # noqa: PYI034
+        """Enter the context."""
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close the entities when exiting the context."""
+        self.close()
+
+    def _replay(self) -> Iterator[Entity]:
+        """Iterate over the recorded entities and record further entities on demand."""
+        recording = self._recording
+        reader: EntityReader | None = None
+        index = 0
+        try:
+            while True:
+                if index < len(recording.memory):
+                    yield recording.memory[index]
+                    index += 1
+                    continue
+                block, position = divmod(index - len(recording.memory), SPILL_BLOCK_SIZE)
+                if block < len(recording.blocks):
+                    if reader is None:
+                        spill_path: Path = recording.spill_path  # type: ignore[assignment]
+                        reader = EntityReader(spill_path.open("rb"))
+                    for spilled in recording.read_block(reader, block)[position:]:
+                        yield spilled
+                        index += 1
+                elif position < len(recording.pending):
+                    yield recording.pending[position]
+                    index += 1
+                else:
+                    entity = recording.fill()
+                    if entity is None:
+                        return
+                    yield entity
+                    index += 1
+        finally:
+            if reader is not None:
+                reader.stream.close()
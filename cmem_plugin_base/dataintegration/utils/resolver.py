@@ -0,0 +1,191 @@
+"""Resolve relation values to sub entities."""
+
+from collections import OrderedDict
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+from cmem_plugin_base.dataintegration.entity import Entities, Entity, EntityPath, EntitySchema
+from cmem_plugin_base.dataintegration.utils.codec import decode_entity, encode_entity
+from cmem_plugin_base.dataintegration.utils.replay import DEFAULT_MEMORY_LIMIT, estimate_size
+from cmem_plugin_base.dataintegration.utils.sqlite import SpillDatabase
+
+if TYPE_CHECKING:
+    import sqlite3
+    from pathlib import Path
+
+SPILL_BATCH_SIZE = 1000
+"""Number of entities that are inserted into the spill database at once."""
+
+SCHEMA_CACHE_SIZE = 1024
+"""Number of spilled URIs whose schema lookups are cached."""
+
+
+class EntityResolver:
+    """Resolve the relation values of entities to the entities they reference.
+
+    Relation paths, such as the ones created by `build_entities_from_data`, hold the
+    URIs of entities in the sub entities. The resolver indexes the entities of each
+    collection of sub entities by URI, so that each relation value is resolved in
+    constant time instead of scanning all sub entities.
+
+    Entities are held in memory until `memory_limit` bytes are reached, all further
+    entities are written to a temporary SQLite database. If several entities have the
+    same URI, the last one is kept. The sub entities are consumed when the resolver is
+    created, the entities themselves are not touched.
+
+    The temporary database is removed when `close` is called, the context is exited or
+    the object is garbage collected.
+
+    :param entities: The entities whose sub entities are indexed.
+    :param memory_limit: The number of bytes of entities that are held in memory.
+    """
+
+    def __init__(self, entities: Entities, memory_limit: int = DEFAULT_MEMORY_LIMIT) -> None:
+        self.schema = entities.schema
+        self.sub_schemata = [_.schema for _ in entities.sub_entities or []]
+        self.memory_limit = memory_limit
+        self.memory_size = 0
+        self.spill_path: Path | None = None
+        self._memory: dict[str, tuple[int, Entity]] = {}
+        self._connection: sqlite3.Connection | None = None
+        self._database: SpillDatabase | None = None
+        self._schemata: OrderedDict[str, EntitySchema] = OrderedDict()
+        for index, sub_entities in enumerate(entities.sub_entities or []):
+            self._index(index, sub_entities.entities)
+        self._count = len(self._memory)
+        if self._connection is not None:
+            self._count += self._connection.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+
+    def __len__(self) -> int:
+        """Get the number of indexed entities."""
+        return self._count
+
+    def __contains__(self, uri: object) -> bool:
+        """Check if an entity with the given URI has been indexed."""
+        return isinstance(uri, str) and self._lookup(uri) is not None
+
+    def get(self, uri: str) -> Entity | None:
+        """Get an indexed entity by URI, returns None if there is no such entity."""
+        found = self._lookup(uri)
+        return found[1] if found is not None else None
+
+    def find(self, uri: str) -> tuple[EntitySchema, Entity] | None:
+        """Get an indexed entity and its schema by URI, returns None if there is no such entity."""
+        found = self._lookup(uri)
+        return (self.sub_schemata[found[0]], found[1]) if found is not None else None
+
+    def schema_of(self, entity: Entity) -> EntitySchema:
+        """Get the schema of an entity.
+
+        Indexed entities have the schema of their collection of sub entities, all other
+        entities are expected to have the schema of the root entities. The schemata of
+        recently looked up URIs are cached, so that resolving several paths of a root
+        entity queries the spill database once.
+        """
+        uri = entity.uri
+        found = self._memory.get(uri)
+        if found is not None:
+            return self.sub_schemata[found[0]]
+        if self._connection is None:
+            return self.schema
+        schema = self._schemata.get(uri)
+        if schema is not None:
+            self._schemata.move_to_end(uri)
+            return schema
+        row = self._connection.execute(
+            "SELECT stream FROM entities WHERE uri = ?", (uri,)
+        ).fetchone()
+        schema = self.sub_schemata[row[0]] if row is not None else self.schema
+        self._schemata[uri] = schema
+        if len(self._schemata) > SCHEMA_CACHE_SIZE:
+            self._schemata.popitem(last=False)
+        return schema
+
+    def resolve(self, entity: Entity, path: EntityPath | str) -> list[Entity]:
+        """Resolve the values of a relation path of an entity to the referenced entities.
+
+        Values that do not reference an indexed entity, such as empty values of missing
+        relations, are skipped.
+
+        :param entity: A root entity or an indexed sub entity.
+        :param path: The relation path whose values are resolved.
+        """
+        values = entity.values[self.schema_of(entity).index_of(path)]
+        resolved = []
+        for uri in values:
+            found = self._lookup(uri)
+            if found is not None:
+                resolved.append(found[1])
+        return resolved
+
+    def close(self) -> None:
+        """Remove the spill database and drop all indexed entities."""
+        if self._database is not None:
+            self._database.close()
+        self._connection = None
+        self._memory = {}
+        self._schemata.clear()
+        self._count = 0
+
+    def __enter__(self) -> "EntityResolver":  # noqa: PYI034
+        """Enter the context."""
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close the resolver when exiting the context."""
+        self.close()
+
+    def _index(self, index: int, entities: Iterator[Entity]) -> None:
+        """Index the entities of a collection of sub entities.
+
+        Each URI is either held in memory or spilled, an entity that replaces an entity
+        held in memory frees its memory.
+        """
+        memory = self._memory
+        pending: list[tuple[str, int, bytes]] = []
+        for entity in entities:
+            uri = entity.uri
+            replaced = memory.get(uri)
+            if replaced is not None:
+                self.memory_size -= estimate_size(replaced[1])
+            if self._connection is None:
+                size = estimate_size(entity)
+                if self.memory_size + size <= self.memory_limit:
+                    memory[uri] = (index, entity)
+                    self.memory_size += size
+                    continue
+                self._open_database()
+            if replaced is not None:
+                del memory[uri]
+            pending.append((uri, index, encode_entity(entity)))
+            if len(pending) == SPILL_BATCH_SIZE:
+                self._insert(pending)
+                pending = []
+        if pending:
+            self._insert(pending)
+
+    def _lookup(self, uri: str) -> tuple[int, Entity] | None:
+        """Find an indexed entity and the index of its collection of sub entities."""
+        found = self._memory.get(uri)
+        if found is not None or self._connection is None:
+            return found
+        row = self._connection.execute(
+            "SELECT stream, data FROM entities WHERE uri = ?", (uri,)
+        ).fetchone()
+        return (row[0], decode_entity(row[1])) if row is not None else None
+
+    def _open_database(self) -> None:
+        """Create the spill database."""
+        self._database = SpillDatabase(
+            "entities-",
+            "CREATE TABLE entities (uri TEXT PRIMARY KEY, stream INTEGER, data BLOB) WITHOUT ROWID",
+        )
+        self.spill_path = self._database.path
+        self._connection = self._database.connection
+
+    def _insert(self, rows: list[tuple[str, int, bytes]]) -> None:
+        """Insert spilled entities, later entities replace earlier ones with the same URI."""
+        with self._connection:  # type: ignore[union-attr]
+            self._connection.executemany(  # type: ignore[union-attr]
+                "INSERT OR REPLACE INTO entities VALUES (?, ?, ?)", rows
+            )
@@ -0,0 +1,41 @@
+"""Temporary SQLite databases that spill data to disk."""
+
+import sqlite3
+import tempfile
+import weakref
+from pathlib import Path
+
+
+class SpillDatabase:
+    """A temporary SQLite database for data that does not fit into memory.
+
+    Journaling and synchronous writes are disabled, since the database does not need
+    to survive a crash. The database is removed when `close` is called or the object
+    is garbage collected.
+
+    :param prefix: The prefix of the file name.
+    :param table: The statement that creates the table of the database.
+    """
+
+    def __init__(self, prefix: str, table: str) -> None:
+        with tempfile.NamedTemporaryFile(prefix=prefix, suffix=".sqlite", delete=False) as _:
+            self.path = Path(_.name)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA journal_mode = OFF")
+        self.connection.execute("PRAGMA synchronous = OFF")
+        self.connection.execute(table)
+        self._finalizer = weakref.finalize(self, remove_database, self.connection, self.path)
+
+    def close(self) -> None:
+        """Close and remove the database."""
+        self._finalizer()
+
+
+def remove_database(connection: sqlite3.Connection, path: Path) -> None:
+    """Close and remove a spill database.
+
+    :param connection: The connection to the database.
+    :param path: The path of the database file, a missing file is ignored.
+    """
+    connection.close()
+    path.unlink(missing_ok=True)
@@ -0,0 +1,255 @@
+"""Strategies for minting entity URIs."""
+
+import hashlib
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+
+from ulid import ULID
+
+from cmem_plugin_base.dataintegration.entity import Entity
+
+DEFAULT_ULID_BATCH_SIZE = 4096
+"""Default number of ULIDs that share a timestamp."""
+
+_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_PAIRS = [first + second for first in _BASE32 for second in _BASE32]
+"""The Crockford base32 encodings of all 10 bit values."""
+
+_LOW_BITS = 40
+_LOW_LIMIT = 1 << _LOW_BITS
+
+
+class UriMinter(ABC):
+    """Base class of strategies that mint the URIs of new entities.
+
+    Strategies that derive the URI from the content of an entity expect the content as
+    a sequence of strings, all other strategies ignore it.
+    """
+
+    @abstractmethod
+    def mint(self, content: Sequence[str] | None = None) -> str:
+        """Mint the URI of an entity.
+
+        :param content: The strings that identify the entity.
+        """
+
+    def entity(
+        self, values: Sequence[Sequence[str]], content: Sequence[str] | None = None
+    ) -> Entity:
+        """Create an entity with a new URI.
+
+        :param values: The values of the entity.
+        :param content: The strings that identify the entity.
+        """
+        return Entity(uri=self.mint(content), values=values)
+
+    def spawn(self) -> "UriMinter":
+        """Get a minter for another process, whose URIs do not collide with these URIs.
+
+        Minters that derive URIs from the content only are returned unchanged.
+        """
+        return self
+
+
+class UlidMinter(UriMinter):
+    """Mint monotonically increasing ULIDs in batches.
+
+    The timestamp and the random part of the ULID are generated once per batch, the
+    ULIDs within a batch are consecutive. Only the last eight characters are encoded
+    for each URI, so minting is considerably faster than creating a `ULID` object.
+    The URIs are valid ULIDs that sort in the order in which they have been minted.
+
+    :param batch_size: The number of ULIDs that share a timestamp.
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_ULID_BATCH_SIZE) -> None:
+        if batch_size < 1:
+            raise ValueError(f"Batch size must be positive, but got {batch_size}.")
+        self.batch_size = batch_size
+        self._milliseconds = -1
+        self._high = 0
+        self._low = 0
+        self._end = 0
+        self._prefix = ""
+
+    def mint(self, content: Sequence[str] | None = None) -> str:
+        """Mint the next ULID."""
+        low = self._low
+        if low >= self._end:
+            self._renew()
+            low = self._low
+        self._low = low + 1
+        return (
+            self._prefix
+            + _PAIRS[low >> 30 & 1023]
+            + _PAIRS[low >> 20 & 1023]
+            + _PAIRS[low >> 10 & 1023]
+            + _PAIRS[low & 1023]
+        )
+
+    def _renew(self) -> None:
+        """Start a new batch, which continues the previous one within a millisecond."""
+        milliseconds = time.time_ns() // 1_000_000
+        if milliseconds > self._milliseconds:
+            randomness = int.from_bytes(os.urandom(10), "big")
+            self._milliseconds = milliseconds
+            self._high = randomness >> _LOW_BITS
+            # the low bits start in the lower half, so that a batch rarely overflows
+            self._low = randomness & (_LOW_LIMIT >> 1) - 1
+        elif self._low >= _LOW_LIMIT:
+            self._high += 1
+            self._low = 0
+            if self._high >= _LOW_LIMIT:
+                raise OverflowError("Too many ULIDs have been minted within a millisecond.")
+        self._end = min(self._low + self.batch_size, _LOW_LIMIT)
+        value = (self._milliseconds << 80) | (self._high << _LOW_BITS)
+        self._prefix = f"urn:x-ulid:{str(ULID.from_int(value))[:18]}"
+
+    def spawn(self) -> "UlidMinter":
+        """Get a new minter, the random part of the ULIDs keeps them apart."""
+        return UlidMinter(self.batch_size)
+
+
+class CounterMinter(UriMinter):
+    """Mint URIs by appending a counter to a prefix that is unique for each run.
+
+    This is the fastest strategy, but the URIs are only unique among the URIs of
+    minters with the same prefix if the prefix is unique.
+
+    :param prefix: The prefix of the URIs, defaults to a new ULID URN.
+    """
+
+    def __init__(self, prefix: str | None = None) -> None:
+        self.prefix = prefix if prefix is not None else f"urn:x-ulid:{ULID()}:"
+        self._count = 0
+
+    def mint(self, content: Sequence[str] | None = None) -> str:
+        """Mint the next URI."""
+        count = self._count
+        self._count = count + 1
+        return f"{self.prefix}{count}"
+
+    def spawn(self) -> "CounterMinter":
+        """Get a minter whose prefix extends a URI that this minter does not mint again."""
+        return CounterMinter(f"{self.mint()}.")
+
+
+class ContentHashMinter(UriMinter):
+    """Mint URIs from a hash of the content of an entity.
+
+    Entities with the same content get the same URI. The content strings are separated
+    by a unit separator, so that their boundaries are part of the hash.
+
+    :param prefix: The prefix of the URIs.
+    :param digest_size: The number of bytes of the BLAKE2b hash.
+    """
+
+    def __init__(self, prefix: str = "urn:x-hash:", digest_size: int = 16) -> None:
+        self.prefix = prefix
+        self.digest_size = digest_size
+
+    def mint(self, content: Sequence[str] | None = None) -> str:
+        """Mint the URI of the given content."""
+        if content is None:
+            raise ValueError("Content hash URIs cannot be minted without content.")
+        data = "\x1f".join(content).encode("utf-8", "surrogatepass")
+        return f"{self.prefix}{hashlib.blake2b(data, digest_size=self.digest_size).hexdigest()}"
+
+
+class Uuid5Minter(UriMinter):
+    """Mint name based UUID URNs from the concatenated content of an entity.
+
+    The URIs are equal to `urn:uuid:{uuid.uuid5(namespace, "".join(content))}`, but
+    are computed without creating `UUID` objects.
+
+    :param namespace: The namespace of the UUIDs.
+    """
+
+    def __init__(self, namespace: uuid.UUID = uuid.NAMESPACE_DNS) -> None:
+        self.namespace = namespace
+        self._hash = hashlib.sha1(namespace.bytes, usedforsecurity=False)
+
+    def mint(self, content: Sequence[str] | None = None) -> str:
+        """Mint the URI of the given content."""
+        if content is None:
+            raise ValueError("Name based URIs cannot be minted without content.")
+        digest = self._hash.copy()
+        digest.update("".join(content).encode())
+        data = bytearray(digest.digest()[:16])
+        data[6] = (data[6] & 0x0F) | 0x50
+        data[8] = (data[8] & 0x3F) | 0x80
+        hex_ = data.hex()
+        return f"urn:uuid:{hex_[:8]}-{hex_[8:12]}-{hex_[12:16]}-{hex_[16:20]}-{hex_[20:]}"
+
+
+class LazyMinter(UriMinter):
+    """Defer minting the URIs of entities until they are read.
+
+    Entities created by `entity` mint their URI with the wrapped minter on first access,
+    so no URI is minted for entities whose URI is never read. URIs returned by `mint`,
+    such as the URIs of sub entities that are referenced by other entities, are minted
+    right away.
+
+    :param minter: The strategy that mints the URIs.
+    """
+
+    def __init__(self, minter: UriMinter) -> None:
+        self.minter = minter
+
+    def mint(self, content: Sequence[str] | None = None) -> str:
+        """Mint a URI with the wrapped minter."""
+        return self.minter.mint(content)
+
+    def entity(
+        self, values: Sequence[Sequence[str]], content: Sequence[str] | None = None
+    ) -> Entity:
+        """Create an entity that mints its URI when it is read."""
+        return LazyEntity(self.minter, values, content)
+
+    def spawn(self) -> "LazyMinter":
+        """Get a lazy minter that wraps a spawned minter."""
+        return LazyMinter(self.minter.spawn())
+
+
+class LazyEntity(Entity):
+    """An entity that mints its URI when it is read for the first time.
+
+    :param minter: The strategy that mints the URI.
+    :param values: The values of the entity.
+    :param content: The strings that identify the entity.
+    """
+
+    __slots__ = ("_content", "_minter", "_uri")
+
+    def __init__(
+        self,
+        minter: UriMinter,
+        values: Sequence[Sequence[str]],
+        content: Sequence[str] | None = None,
+    ) -> None:
+        self._minter: UriMinter | None = minter
+        self._content = content
+        self._uri: str | None = None
+        self.values = values
+
+    @property  # type: ignore[override]
+    def uri(self) -> str:
+        """Get the URI, minting it on first access."""
+        if self._uri is None:
+            self._uri = self._minter.mint(self._content)  # type: ignore[union-attr]
+            self._minter = None
+            self._content = None
+        return self._uri
+
+    @uri.setter
+    def uri(self, uri: str) -> None:
+        self._uri = uri
+        self._minter = None
+        self._content = None
+
+    def __reduce__(self) -> tuple:
+        """Pickle as a plain entity, so that copies do not mint their URIs separately."""
+        return Entity, (self.uri, self.values)
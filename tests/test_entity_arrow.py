@@ -0,0 +1,96 @@
+"""Tests for the Apache Arrow interchange of entities."""
+
+import pytest
+
+from cmem_plugin_base.dataintegration.entity import Entities, Entity, EntityPath, EntitySchema
+
+pa = pytest.importorskip("pyarrow")
+
+SCHEMA = EntitySchema(
+    type_uri="urn:type:person",
+    paths=[
+        EntityPath("name", is_single_value=True),
+        EntityPath("email"),
+        EntityPath("city", is_relation=True),
+    ],
+)
+SUB_SCHEMA = EntitySchema(
+    type_uri="urn:type:city",
+    paths=[EntityPath("label", is_single_value=True)],
+    path_to_root=EntityPath("city"),
+)
+
+
+def _entities() -> Entities:
+    return Entities(
+        entities=iter(
+            [
+                Entity(
+                    "urn:person:1", [["Alice"], ["a@example.com", "b@example.com"], ["urn:c:1"]]
+                ),
+                Entity("urn:person:2", [[], [], []]),
+                Entity("urn:person:3", [["Carol"], ["c@example.com"], ["urn:c:1"]]),
+            ]
+        ),
+        schema=SCHEMA,
+        sub_entities=[
+            Entities(entities=iter([Entity("urn:c:1", [["Berlin"]])]), schema=SUB_SCHEMA)
+        ],
+    )
+
+
+def test_to_arrow() -> None:
+    """Test the layout of the Arrow record batches."""
+    stream = _entities().to_arrow(batch_size=2)
+    table = stream.reader.read_all()
+    assert table.column_names == ["#uri", "name", "email", "city"]
+    assert table.schema.field("name").type == pa.string()
+    assert table.schema.field("email").type == pa.list_(pa.string())
+    assert table.column("name").to_pylist() == ["Alice", None, "Carol"]
+    assert table.column("email").to_pylist() == [
+        ["a@example.com", "b@example.com"],
+        [],
+        ["c@example.com"],
+    ]
+    assert len(stream.sub_streams) == 1
+    assert stream.sub_streams[0].reader.read_all().column("label").to_pylist() == ["Berlin"]
+
+
+def test_round_trip() -> None:
+    """Test that entities survive the conversion to Arrow and back."""
+    entities = Entities.from_arrow(_entities().to_arrow(batch_size=2))
+    assert entities.schema == SCHEMA
+    assert [(_.uri, _.values) for _ in entities.entities] == [
+        ("urn:person:1", [["Alice"], ["a@example.com", "b@example.com"], ["urn:c:1"]]),
+        ("urn:person:2", [[], [], []]),
+        ("urn:person:3", [["Carol"], ["c@example.com"], ["urn:c:1"]]),
+    ]
+    assert entities.sub_entities is not None
+    assert entities.sub_entities[0].schema == SUB_SCHEMA
+    assert [_.values for _ in entities.sub_entities[0].entities] == [[["Berlin"]]]
+
+
+def test_from_foreign_arrow() -> None:
+    """Test conversion of Arrow data that has not been created from entities."""
+    table = pa.table(
+        {
+            "id": pa.array([1, 2, None]),
+            "tags": pa.array([["a"], None, ["b", "c"]], pa.list_(pa.string())),
+        }
+    )
+    reader = pa.RecordBatchReader.from_batches(table.schema, table.slice(1).to_batches())
+    entities = Entities.from_arrow(reader)
+    assert entities.schema == EntitySchema(
+        type_uri="",
+        paths=[EntityPath("id", is_single_value=True), EntityPath("tags")],
+    )
+    rows = list(entities.entities)
+    assert [_.values for _ in rows] == [[["2"], []], [[], ["b", "c"]]]
+    assert all(_.uri.startswith("urn:x-ulid:") for _ in rows)
+
+
+def test_single_value_violation() -> None:
+    """Test that single value paths must not hold multiple values."""
+    entities = Entities(entities=iter([Entity("urn:1", [["a", "b"], [], []])]), schema=SCHEMA)
+    with pytest.raises(ValueError, match=r"Path 'name' is single valued"):
+        entities.to_arrow().reader.read_all()
@@ -0,0 +1,70 @@
+"""Tests for the columnar `EntityBatch` representation."""
+
+import pytest
+
+from cmem_plugin_base.dataintegration.entity import (
+    Entities,
+    Entity,
+    EntityBatch,
+    EntityPath,
+    EntitySchema,
+)
+
+SCHEMA = EntitySchema(
+    type_uri="urn:type:person",
+    paths=[EntityPath("name", is_single_value=True), EntityPath("email")],
+)
+
+
+def _entities() -> list[Entity]:
+    return [
+        Entity(uri="urn:person:1", values=[["Alice"], ["alice@example.com", "a@example.com"]]),
+        Entity(uri="urn:person:2", values=[["Bob"], []]),
+        Entity(uri="urn:person:3", values=[["Carol"], ["carol@example.com"]]),
+    ]
+
+
+def test_batch_from_entities() -> None:
+    """Test the columnar layout of a batch."""
+    batch = EntityBatch.from_entities(_entities(), SCHEMA)
+    assert len(batch) == 3
+    assert batch.uris == ["urn:person:1", "urn:person:2", "urn:person:3"]
+    assert batch.values[1] == ["alice@example.com", "a@example.com", "carol@example.com"]
+    assert list(batch.offsets[1]) == [0, 2, 2, 3]
+    assert batch.column(0) == [["Alice"], ["Bob"], ["Carol"]]
+    assert batch.column(1) == [["alice@example.com", "a@example.com"], [], ["carol@example.com"]]
+    assert batch.row_values(1) == [["Bob"], []]
+    assert batch.entity(2).uri == "urn:person:3"
+
+
+def test_batch_round_trip() -> None:
+    """Test that batches can be converted back to row entities."""
+    batch = EntityBatch.from_entities(_entities(), SCHEMA)
+    assert [(_.uri, _.values) for _ in batch] == [(_.uri, _.values) for _ in _entities()]
+
+
+def test_invalid_batch() -> None:
+    """Test that inconsistent columns are rejected."""
+    with pytest.raises(ValueError, match=r"Expected 2 columns"):
+        EntityBatch(SCHEMA, uris=["urn:1"], values=[["a"]], offsets=[[0, 1]])
+    with pytest.raises(ValueError, match=r"Expected 2 offsets per column"):
+        EntityBatch(SCHEMA, uris=["urn:1"], values=[["a"], []], offsets=[[0, 1], [0]])
+    with pytest.raises(ValueError, match=r"zip\(\)"):
+        EntityBatch.from_entities([Entity(uri="urn:1", values=[["a"]])], SCHEMA)
+
+
+def test_iter_batches() -> None:
+    """Test iterating entities in batches and back."""
+    entities = Entities(entities=iter(_entities()), schema=SCHEMA)
+    batches = list(entities.iter_batches(2))
+    assert [len(_) for _ in batches] == [2, 1]
+
+    restored = Entities.from_batches(batches, SCHEMA)
+    assert restored.schema == SCHEMA
+    assert [(_.uri, _.values) for _ in restored.entities] == [
+        (_.uri, _.values) for _ in _entities()
+    ]
+
+    assert list(Entities(entities=iter([]), schema=SCHEMA).iter_batches(10)) == []
+    with pytest.raises(ValueError, match=r"Batch size must be positive"):
+        next(entities.iter_batches(0))
@@ -0,0 +1,159 @@
+"""Tests for the compact entity representation."""
+
+import tracemalloc
+from collections.abc import Callable, Sequence
+
+import pytest
+
+from cmem_plugin_base.dataintegration.entity import (
+    Entities,
+    Entity,
+    EntityPath,
+    EntitySchema,
+    ValueInterner,
+)
+from tests.utils import needs_benchmark
+
+SCHEMA = EntitySchema(
+    type_uri="urn:type:label",
+    paths=[EntityPath("label"), EntityPath("language", is_single_value=True)],
+    sub_schemata=[EntitySchema(type_uri="urn:type:sub", paths=[EntityPath("value")])],
+)
+
+
+class LegacyEntity:
+    """Entity as it has been implemented before, i.e., with a `__dict__` and lists."""
+
+    def __init__(self, uri: str, values: Sequence[Sequence[str]]) -> None:
+        self.uri = uri
+        self.values = values
+
+
+def test_attributes() -> None:
+    """Test that the core entity classes accept additional attributes."""
+    entity = Entity(uri="urn:1", values=[])
+    entity.origin = "test"  # type: ignore[attr-defined]
+    path = EntityPath("label")
+    path.origin = "test"  # type: ignore[attr-defined]
+    schema = EntitySchema(type_uri="urn:type", paths=[])
+    schema.origin = "test"  # type: ignore[attr-defined]
+    assert entity.origin == path.origin == schema.origin == "test"  # type: ignore[attr-defined]
+
+
+def test_interner() -> None:
+    """Test interning of low-cardinality values."""
+    interner = ValueInterner(max_size=2, max_length=3)
+    first = interner(b"en".decode())
+    assert interner(b"en".decode()) is first
+    assert len(interner) == 1
+    interner("de")
+    interner("fr")
+    assert len(interner) == 2
+    assert interner("long value") == "long value"
+    assert len(interner) == 2
+
+
+def test_compact_entities() -> None:
+    """Test conversion of entities to the compact form."""
+    entities = Entities(
+        entities=iter(
+            [
+                Entity(uri="urn:1", values=[["Berlin", "Berlino"], [b"en".decode()]]),
+                Entity(uri="urn:2", values=[["Paris"], [b"en".decode()]]),
+            ]
+        ),
+        schema=SCHEMA,
+        sub_entities=[Entities(entities=iter([]), schema=SCHEMA.sub_schemata[0])],  # type: ignore[index]
+    ).compact()
+    assert entities.schema == SCHEMA
+    assert entities.sub_entities is not None
+    assert len(entities.sub_entities) == 1
+    compact = list(entities.entities)
+    assert compact[0].values == (("Berlin", "Berlino"), ("en",))
+    assert compact[0].values[1][0] is compact[1].values[1][0]
+
+
+def test_schema_hash_cache() -> None:
+    """Test that the cached schema hash follows changes of the schema."""
+    paths = [EntityPath("a")]
+    sub_schema = EntitySchema(type_uri="urn:sub", paths=[])
+    schema = EntitySchema(type_uri="urn:type", paths=paths, sub_schemata=[sub_schema])
+    paths.append(EntityPath("b"))
+    assert schema.paths == (EntityPath("a"),)
+    assert isinstance(schema.sub_schemata, tuple)
+
+    def same(**kwargs: object) -> None:
+        other = EntitySchema(
+            type_uri=schema.type_uri,
+            paths=list(schema.paths),
+            path_to_root=schema.path_to_root,
+            sub_schemata=[EntitySchema(type_uri="urn:sub", paths=list(sub_schema.paths))],
+        )
+        for name, value in kwargs.items():
+            setattr(other, name, value)
+        assert other == schema
+        assert hash(other) == hash(schema)
+
+    same()
+    for name, value in [
+        ("type_uri", "urn:other"),
+        ("paths", [EntityPath("b")]),
+        ("path_to_root", EntityPath("root")),
+    ]:
+        before = hash(schema)
+        setattr(schema, name, value)
+        assert hash(schema) != before
+        same()
+    schema.paths = [EntityPath("c"), EntityPath("d")]
+    assert schema.index_of("d") == 1
+    sub_schema.paths = [EntityPath("e")]
+    same()
+
+
+def _peak_memory(create: Callable[[int], object], count: int) -> int:
+    """Measure the peak memory needed to buffer a number of entities."""
+    tracemalloc.start()
+    try:
+        buffered = [create(_) for _ in range(count)]
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del buffered
+    return peak
+
+
+@needs_benchmark
+@pytest.mark.parametrize("count", [1_000_000])
+def test_memory_benchmark(count: int) -> None:
+    """Compare the memory of compact and legacy entities."""
+    languages = ["en", "de", "fr", "es"]
+
+    def legacy(index: int) -> object:
+        return LegacyEntity(
+            uri=f"urn:entity:{index}",
+            values=[
+                [f"label {index}"],
+                [str(index % 10)],
+                [languages[index % 4].encode().decode()],
+            ],
+        )
+
+    interner = ValueInterner()
+
+    def compact(index: int) -> object:
+        return Entity(
+            uri=f"urn:entity:{index}",
+            values=[
+                [f"label {index}"],
+                [str(index % 10)],
+                [languages[index % 4].encode().decode()],
+            ],
+        ).compact(interner)
+
+    legacy_peak = _peak_memory(legacy, count)
+    compact_peak = _peak_memory(compact, count)
+    print(  # noqa: T201
+        f"\n{count} entities: legacy {legacy_peak / 2**20:.1f} MiB,"
+        f" compact {compact_peak / 2**20:.1f} MiB"
+    )
+    assert compact_peak < legacy_peak
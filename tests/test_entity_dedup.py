@@ -0,0 +1,74 @@
+"""Tests for the streaming deduplication of entities."""
+
+import pytest
+
+from cmem_plugin_base.dataintegration.entity import Entities, Entity, EntityPath, EntitySchema
+from cmem_plugin_base.dataintegration.utils.dedup import BloomFilter, KeySet, deduplicate
+from tests.utils import tracked
+
+SCHEMA = EntitySchema(type_uri="urn:type", paths=[EntityPath("name"), EntityPath("group")])
+
+
+def _entities(count: int, consumed: list[int] | None = None) -> Entities:
+    source = (
+        Entity(f"urn:{index % 100}", [[f"name {index % 7}"], [str(index % 3)]])
+        for index in range(count)
+    )
+    return Entities(entities=tracked(source, consumed), schema=SCHEMA)
+
+
+def test_deduplicate_by_uri() -> None:
+    """Test dropping entities with duplicate URIs lazily."""
+    consumed: list[int] = []
+    entities = deduplicate(_entities(250, consumed))
+    assert consumed == []
+    assert [_.uri for _ in entities.entities] == [f"urn:{_}" for _ in range(100)]
+    assert len(consumed) == 250
+
+
+def test_deduplicate_by_paths() -> None:
+    """Test dropping entities with duplicate values."""
+    entities = deduplicate(_entities(250), ["group", EntityPath("name")])
+    assert len(list(entities.entities)) == 21
+    entities = deduplicate(_entities(250), ["group"])
+    assert [_.values for _ in entities.entities] == [
+        [["name 0"], ["0"]],
+        [["name 1"], ["1"]],
+        [["name 2"], ["2"]],
+    ]
+    with pytest.raises(KeyError, match=r"Path 'missing' not found"):
+        deduplicate(_entities(1), ["missing"])
+
+
+def test_deduplicate_approximate() -> None:
+    """Test dropping duplicates with a Bloom filter."""
+    entities = deduplicate(_entities(250), approximate=True, expected_count=100)
+    assert 95 <= len(list(entities.entities)) <= 100
+
+
+def test_key_set_spilling() -> None:
+    """Test that the exact key set stays exact after spilling to disk."""
+    keys = KeySet(memory_limit=2000)
+    assert all(keys.add(f"key {_}") for _ in range(5000))
+    assert not any(keys.add(f"key {_}") for _ in range(5000))
+    assert len(keys) == 5000
+    assert "key 42" in keys
+    assert "key 5000" not in keys
+    spill_path = keys.spill_path
+    assert spill_path is not None
+    assert spill_path.exists()
+    keys.close()
+    assert not spill_path.exists()
+
+
+def test_bloom_filter() -> None:
+    """Test the false positive rate of the Bloom filter."""
+    bloom = BloomFilter(expected_count=10000, false_positive_rate=0.01)
+    assert all(bloom.add(f"key {_}") for _ in range(100))
+    assert all(f"key {_}" in bloom for _ in range(100))
+    for index in range(100, 10000):
+        bloom.add(f"key {index}")
+    false_positives = sum(f"other {_}" in bloom for _ in range(10000))
+    assert false_positives < 200
+    with pytest.raises(ValueError, match=r"False positive rate"):
+        BloomFilter(false_positive_rate=1)
@@ -0,0 +1,96 @@
+"""Tests for the lazy entity pipeline combinators."""
+
+from collections.abc import Iterator
+
+import pytest
+
+from cmem_plugin_base.dataintegration.entity import (
+    Entities,
+    Entity,
+    EntityBatch,
+    EntityPath,
+    EntityPipeline,
+    EntitySchema,
+)
+from tests.utils import tracked
+
+SCHEMA = EntitySchema(
+    type_uri="urn:type:person",
+    paths=[EntityPath("name"), EntityPath("age"), EntityPath("email")],
+)
+SUB_ENTITIES = [Entities(entities=iter([]), schema=EntitySchema(type_uri="urn:sub", paths=[]))]
+
+
+def _entities(consumed: list[int] | None = None) -> Entities:
+    source = (
+        Entity(f"urn:{index}", [[f"name {index}"], [str(20 + index)], [f"{index}@x"]])
+        for index in range(6)
+    )
+    return Entities(entities=tracked(source, consumed), schema=SCHEMA, sub_entities=SUB_ENTITIES)
+
+
+def test_lazy_map_and_filter() -> None:
+    """Test that map and filter are evaluated lazily and fused."""
+    consumed: list[int] = []
+    pipeline = (
+        _entities(consumed)
+        .filter(lambda _: int(_.values[1][0]) % 2 == 0)
+        .map(lambda _: Entity(_.uri.upper(), _.values))
+        .filter(lambda _: _.uri != "URN:2")
+    )
+    assert isinstance(pipeline, EntityPipeline)
+    assert consumed == []
+    assert pipeline.schema is SCHEMA
+    assert pipeline.sub_entities is SUB_ENTITIES
+    assert [_.uri for _ in pipeline.entities] == ["URN:0", "URN:4"]
+    assert len(consumed) == 6
+
+
+def test_select_paths() -> None:
+    """Test selecting paths, including fusing consecutive selections."""
+    pipeline = _entities().select_paths(["email", "name"]).select_paths(["name"])
+    assert pipeline.schema.paths == (EntityPath("name"),)
+    assert len(pipeline._steps) == 1  # noqa: SLF001
+    assert [_.values for _ in pipeline.entities][:2] == [(["name 0"],), (["name 1"],)]
+    with pytest.raises(KeyError, match=r"Path 'phone' not found"):
+        _entities().select_paths(["phone"])
+
+
+def test_select_removed_path() -> None:
+    """Test that paths removed by a previous selection cannot be selected again."""
+    pipeline = _entities().select_paths([EntityPath("name")])
+    with pytest.raises(KeyError, match=r"Path 'email' not found"):
+        pipeline.select_paths([EntityPath("email")])
+    assert [_.values for _ in pipeline.entities][:1] == [(["name 0"],)]
+
+
+def test_flat_map_and_batch() -> None:
+    """Test steps that change the number of entities."""
+    schema = EntitySchema(type_uri="urn:type:count", paths=[EntityPath("count")])
+
+    def count(batch: EntityBatch) -> Iterator[Entity]:
+        yield Entity(batch.uris[0], [[str(len(batch))]])
+
+    pipeline = (
+        _entities()
+        .flat_map(lambda _: [_, Entity(_.uri + "-copy", _.values)])
+        .select_paths(["name"])
+        .batch(5, count, schema)
+        .map(lambda _: Entity(_.uri, [[_.values[0][0] + "!"]]))
+    )
+    assert pipeline.schema is schema
+    assert [(_.uri, _.values) for _ in pipeline.entities] == [
+        ("urn:0", [["5!"]]),
+        ("urn:2-copy", [["5!"]]),
+        ("urn:5", [["2!"]]),
+    ]
+    with pytest.raises(ValueError, match=r"Batch size must be positive"):
+        _entities().batch(0, count)
+
+
+def test_entities_are_iterated_once() -> None:
+    """Test that a pipeline behaves like a one-shot iterator."""
+    pipeline = _entities().map(lambda _: _)
+    assert pipeline.entities is pipeline.entities
+    assert len(list(pipeline.entities)) == 6
+    assert list(pipeline.entities) == []
@@ -0,0 +1,109 @@
+"""Tests for replayable entities."""
+
+from collections.abc import Iterator
+
+from cmem_plugin_base.dataintegration.entity import Entities, Entity, EntityPath, EntitySchema
+from cmem_plugin_base.dataintegration.utils.replay import (
+    EntityQueue,
+    ReplayableEntities,
+    estimate_size,
+)
+from tests.utils import tracked
+
+SCHEMA = EntitySchema(type_uri="urn:type", paths=[EntityPath("label"), EntityPath("tags")])
+
+
+def _source(count: int, consumed: list[int] | None = None) -> Iterator[Entity]:
+    source = (
+        Entity(uri=f"urn:{index}", values=[[f"label {index}"], ["a", "b"] if index % 2 else []])
+        for index in range(count)
+    )
+    return tracked(source, consumed)
+
+
+def _rows(entities: Iterator[Entity]) -> list[tuple[str, list[list[str]]]]:
+    return [(_.uri, [list(values) for values in _.values]) for _ in entities]
+
+
+def test_replay_in_memory() -> None:
+    """Test replaying entities that fit into memory."""
+    consumed: list[int] = []
+    entities = ReplayableEntities(Entities(entities=_source(10, consumed), schema=SCHEMA))
+    assert consumed == []
+    first = _rows(entities.entities)
+    assert len(first) == 10
+    assert _rows(entities.entities) == first
+    assert entities.count() == 10
+    assert len(consumed) == 10
+    assert entities.schema == SCHEMA
+
+
+def test_replay_with_spilling() -> None:
+    """Test replaying entities that exceed the memory limit."""
+    limit = 3 * estimate_size(next(_source(1)))
+    expected = _rows(_source(2500))
+    with ReplayableEntities(
+        Entities(entities=_source(2500), schema=SCHEMA), memory_limit=limit
+    ) as entities:
+        assert entities.count() == 2500
+        assert _rows(entities.entities) == expected
+        assert _rows(entities.entities) == expected
+        spill_path = entities._recording.spill_path  # noqa: SLF001
+        assert spill_path is not None
+        assert spill_path.exists()
+    assert not spill_path.exists()
+
+
+def test_interleaved_iterators() -> None:
+    """Test multiple iterators that record the source concurrently."""
+    limit = 5 * estimate_size(next(_source(1)))
+    expected = _rows(_source(3500))
+    entities = ReplayableEntities(Entities(entities=_source(3500), schema=SCHEMA), limit)
+    first = entities.entities
+    second = entities.entities
+    rows_first = []
+    rows_second = []
+    for _ in range(1200):
+        rows_first.extend(_rows(iter([next(first)])))
+    for _ in range(2900):
+        rows_second.extend(_rows(iter([next(second)])))
+    rows_first.extend(_rows(first))
+    rows_second.extend(_rows(second))
+    assert rows_first == expected
+    assert rows_second == expected
+    entities.close()
+
+
+def test_replay_sub_entities() -> None:
+    """Test that sub entities are replayable as well."""
+    entities = ReplayableEntities(
+        Entities(
+            entities=_source(2),
+            schema=SCHEMA,
+            sub_entities=[Entities(entities=_source(3), schema=SCHEMA)],
+        )
+    )
+    assert entities.sub_entities is not None
+    sub_entities = entities.sub_entities[0]
+    assert len(list(sub_entities.entities)) == 3
+    assert len(list(sub_entities.entities)) == 3
+
+
+def test_entity_queue() -> None:
+    """Test a queue that spills to disk and is drained while entities are added."""
+    queue = EntityQueue(columns=2, memory_limit=3 * estimate_size(next(_source(1))))
+    expected = _rows(_source(5000))
+    rows = []
+    for index, entity in enumerate(_source(5000)):
+        queue.append(entity)
+        if index % 3 == 0:
+            rows.extend(_rows(iter([queue.popleft()])))  # type: ignore[list-item]
+    assert queue.spill_path is not None
+    assert len(queue) == 5000 - len(rows)
+    while (queued := queue.popleft()) is not None:
+        rows.extend(_rows(iter([queued])))
+    assert rows == expected
+    spill_path = queue.spill_path
+    assert spill_path.stat().st_size == 0
+    queue.close()
+    assert not spill_path.exists()
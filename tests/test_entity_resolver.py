@@ -0,0 +1,128 @@
+"""Tests for resolving relation values to sub entities."""
+
+from cmem_plugin_base.dataintegration.entity import Entities, Entity, EntityPath, EntitySchema
+from cmem_plugin_base.dataintegration.utils.entity_builder import build_entities_from_data
+from cmem_plugin_base.dataintegration.utils.replay import estimate_size
+from cmem_plugin_base.dataintegration.utils.resolver import EntityResolver
+
+DATA = [
+    {
+        "name": f"person {index}",
+        "city": {"name": f"city {index}", "country": {"code": f"c{index % 3}"}},
+        "pets": [{"name": f"pet {index}.{pet}"} for pet in range(index % 3)],
+    }
+    for index in range(50)
+]
+
+
+def _rebuild(resolver: EntityResolver, entity: Entity) -> dict:
+    """Rebuild the nested structure of an entity."""
+    schema = resolver.schema_of(entity)
+    result: dict = {}
+    for path, values in zip(schema.paths, entity.values, strict=True):
+        if not path.is_relation:
+            result[path.path] = values[0] if path.is_single_value else list(values)
+            continue
+        nested = [_rebuild(resolver, _) for _ in resolver.resolve(entity, path)]
+        result[path.path] = nested[0] if path.is_single_value else nested
+    return result
+
+
+def test_resolve_nested_structure() -> None:
+    """Test rebuilding nested structures from entities and their sub entities."""
+    entities = build_entities_from_data(DATA)
+    assert entities is not None
+    with EntityResolver(entities) as resolver:
+        assert len(resolver) == 50 + 50 + sum(index % 3 for index in range(50))
+        assert resolver.spill_path is None
+        assert [_rebuild(resolver, _) for _ in entities.entities] == DATA
+
+
+def test_resolve_with_spilling() -> None:
+    """Test resolving entities that exceed the memory limit."""
+    entities = build_entities_from_data(DATA)
+    assert entities is not None
+    resolver = EntityResolver(entities, memory_limit=10 * estimate_size(Entity("urn:x", [["x"]])))
+    spill_path = resolver.spill_path
+    assert spill_path is not None
+    assert spill_path.exists()
+    assert [_rebuild(resolver, _) for _ in entities.entities] == DATA
+    resolver.close()
+    assert not spill_path.exists()
+
+
+def test_resolve_missing_values() -> None:
+    """Test that unknown URIs and missing relations are skipped."""
+    schema = EntitySchema(
+        type_uri="urn:type", paths=[EntityPath("knows", is_relation=True, is_single_value=False)]
+    )
+    sub_schema = EntitySchema(type_uri="urn:sub", paths=[EntityPath("label")])
+    known = Entity("urn:known", [["Known"]])
+    entities = Entities(
+        entities=iter([]),
+        schema=schema,
+        sub_entities=[Entities(entities=iter([known]), schema=sub_schema)],
+    )
+    resolver = EntityResolver(entities)
+    entity = Entity("urn:root", [["", "urn:unknown", "urn:known"]])
+    assert resolver.resolve(entity, "knows") == [known]
+    assert resolver.get("urn:unknown") is None
+    assert "urn:known" in resolver
+    assert resolver.schema_of(known) is sub_schema
+    assert resolver.schema_of(entity) is schema
+
+
+def _sub_entities(*entities: Entity) -> Entities:
+    """Create root entities without values whose sub entities are the given entities."""
+    return Entities(
+        entities=iter([]),
+        schema=EntitySchema(type_uri="urn:type", paths=[]),
+        sub_entities=[
+            Entities(entities=iter(entities), schema=EntitySchema(type_uri="urn:sub", paths=[]))
+        ],
+    )
+
+
+def test_resolve_duplicate_uris() -> None:
+    """Test that the last entity with a URI is kept and counted once."""
+    first = Entity("urn:a", [])
+    last = Entity("urn:a", [])
+    other = Entity("urn:b", [])
+    with EntityResolver(_sub_entities(first, other, last)) as resolver:
+        assert len(resolver) == 2
+        assert resolver.get("urn:a") is last
+        assert resolver.memory_size == estimate_size(last) + estimate_size(other)
+
+
+def test_resolve_duplicate_uris_with_spilling() -> None:
+    """Test that an entity spilled later replaces an entity held in memory."""
+    first = Entity("urn:a", [["first"]])
+    other = Entity("urn:b", [["other" * 100]])
+    last = Entity("urn:a", [["last"]])
+    memory_limit = estimate_size(first) + estimate_size(other) - 1
+    with EntityResolver(_sub_entities(first, other, last, other), memory_limit) as resolver:
+        assert resolver.spill_path is not None
+        assert len(resolver) == 2
+        assert resolver.memory_size == 0
+        assert resolver.get("urn:a").values == last.values  # type: ignore[union-attr]
+        assert resolver.get("urn:b").values == other.values  # type: ignore[union-attr]
+
+
+def test_schema_of_is_cached() -> None:
+    """Test that schema lookups of spilled URIs are cached."""
+    entities = build_entities_from_data(DATA)
+    assert entities is not None
+    with EntityResolver(entities, memory_limit=0) as resolver:
+        root = next(entities.entities)
+        assert resolver.schema_of(root) is entities.schema
+        assert root.uri in resolver._schemata  # noqa: SLF001
+        resolver._connection = _Failing()  # type: ignore[assignment]  # noqa: SLF001
+        assert resolver.schema_of(root) is entities.schema
+
+
+class _Failing:
+    """A connection that fails on use."""
+
+    def execute(self, *args: object) -> None:
+        """Fail on every query."""
+        raise AssertionError("unexpected query")
@@ -0,0 +1,79 @@
+"""Tests for the path index and projection of entity schemata."""
+
+import pytest
+
+from cmem_plugin_base.dataintegration.entity import Entities, Entity, EntityPath, EntitySchema
+from cmem_plugin_base.dataintegration.typed_entities import path_uri
+from cmem_plugin_base.dataintegration.typed_entities.file import FileEntitySchema, LocalFile
+
+SOURCE = EntitySchema(
+    type_uri="urn:type:person",
+    paths=[EntityPath("name"), EntityPath("email"), EntityPath("city"), EntityPath("name")],
+)
+TARGET = EntitySchema(type_uri="urn:type:person", paths=[EntityPath("city"), EntityPath("name")])
+
+
+def test_path_index() -> None:
+    """Test the cached path index."""
+    assert dict(SOURCE.path_index) == {"name": 0, "email": 1, "city": 2}
+    assert SOURCE.path_index is SOURCE.path_index
+    assert SOURCE.index_of("city") == 2
+    assert SOURCE.index_of(EntityPath("email")) == 1
+    with pytest.raises(KeyError, match=r"Path 'phone' not found"):
+        SOURCE.index_of("phone")
+
+    schema = EntitySchema(type_uri="urn:type", paths=[EntityPath("a")])
+    assert schema.index_of("a") == 0
+    schema.paths = [EntityPath("b"), EntityPath("a")]
+    assert schema.index_of("a") == 1
+
+
+def test_projector() -> None:
+    """Test projecting entities onto another schema."""
+    projector = SOURCE.projector(TARGET)
+    assert projector.indices == (2, 0)
+    assert not projector.is_identity
+    assert projector([["Alice"], ["a@example.com"], ["Berlin"], []]) == (["Berlin"], ["Alice"])
+
+    entities = projector.entities(
+        Entities(
+            entities=iter([Entity("urn:1", [["Alice"], [], ["Berlin"], []])]),
+            schema=SOURCE,
+        )
+    )
+    assert entities.schema is TARGET
+    assert [(_.uri, _.values) for _ in entities.entities] == [("urn:1", (["Berlin"], ["Alice"]))]
+
+    single = SOURCE.projector(EntitySchema(type_uri="", paths=[EntityPath("email")]))
+    assert single([["Alice"], ["a@example.com"], [], []]) == (["a@example.com"],)
+    assert SOURCE.projector(EntitySchema(type_uri="", paths=[]))([["Alice"]]) == ()
+    assert TARGET.projector(TARGET).is_identity
+
+
+def test_projector_missing_paths() -> None:
+    """Test projecting onto a schema with paths that are not in the source schema."""
+    target = EntitySchema(type_uri="urn:type", paths=[EntityPath("phone"), EntityPath("email")])
+    with pytest.raises(ValueError, match=r"\['phone'\]"):
+        SOURCE.projector(target)
+    projector = SOURCE.projector(target, strict=False)
+    assert projector([["Alice"], ["a@example.com"], [], []]) == ((), ["a@example.com"])
+
+
+def test_typed_entities_with_reordered_paths() -> None:
+    """Test that typed schemata accept entities with differently ordered paths."""
+    schema = FileEntitySchema()
+    reordered = EntitySchema(
+        type_uri=schema.type_uri,
+        paths=[
+            EntityPath(path_uri("fileType"), is_single_value=True),
+            EntityPath(path_uri("filePath"), is_single_value=True),
+        ],
+    )
+    entities = Entities(
+        entities=iter([Entity("urn:1", [["Local"], ["test.txt"]])]), schema=reordered
+    )
+    files = list(schema.from_entities(entities).values)
+    assert len(files) == 1
+    assert isinstance(files[0], LocalFile)
+    assert files[0].path == "test.txt"
+    assert files[0].mime is None
@@ -0,0 +1,163 @@
+"""Tests for the strategies that mint entity URIs."""
+
+import pickle
+import timeit
+import uuid
+from functools import partial
+
+import pytest
+from ulid import ULID
+
+from cmem_plugin_base.dataintegration.entity import Entity
+from cmem_plugin_base.dataintegration.typed_entities.quads import (
+    LanguageLiteral,
+    Quad,
+    QuadEntitySchema,
+    Resource,
+)
+from cmem_plugin_base.dataintegration.utils.entity_builder import (
+    build_entities_from_data,
+    build_entities_from_records,
+)
+from cmem_plugin_base.dataintegration.utils.uris import (
+    ContentHashMinter,
+    CounterMinter,
+    LazyEntity,
+    LazyMinter,
+    UlidMinter,
+    UriMinter,
+    Uuid5Minter,
+)
+from tests.utils import needs_benchmark
+
+DATA = [{"name": f"person {_}", "city": {"name": f"city {_}"}} for _ in range(5)]
+
+QUAD = Quad(
+    subject=Resource(value="urn:instance:person1"),
+    predicate=Resource(value="urn:instance:hasCity"),
+    object=LanguageLiteral(value="Berlin", language="en"),
+)
+
+
+def test_ulid_minter() -> None:
+    """Test that minted ULIDs are valid, unique and increasing across batches."""
+    minter = UlidMinter(batch_size=3)
+    uris = [minter.mint() for _ in range(100)]
+    assert len(set(uris)) == len(uris)
+    assert uris == sorted(uris)
+    for uri in uris:
+        assert uri.startswith("urn:x-ulid:")
+        assert str(ULID.from_str(uri.removeprefix("urn:x-ulid:"))) == uri[11:]
+    with pytest.raises(ValueError, match="Batch size"):
+        UlidMinter(batch_size=0)
+
+
+def test_counter_minter() -> None:
+    """Test that counter URIs share a unique prefix per minter."""
+    minter = CounterMinter("urn:run:")
+    assert [minter.mint() for _ in range(3)] == ["urn:run:0", "urn:run:1", "urn:run:2"]
+    assert CounterMinter().prefix != CounterMinter().prefix
+    spawned = minter.spawn()
+    assert spawned.mint() == "urn:run:3.0"
+    assert minter.mint() == "urn:run:4"
+    assert LazyMinter(minter).spawn().mint() == "urn:run:5.0"
+
+
+def test_abstract_minter() -> None:
+    """Test that strategies must implement `mint`."""
+    with pytest.raises(TypeError, match="abstract method 'mint'"):
+        UriMinter()  # type: ignore[abstract]
+
+
+def test_content_minters() -> None:
+    """Test that content based URIs only depend on the content."""
+    hashed = ContentHashMinter()
+    assert hashed.mint(["a", "b"]) == ContentHashMinter().mint(["a", "b"])
+    assert hashed.mint(["a", "b"]) != hashed.mint(["ab", ""])
+    assert hashed.mint(["a"]).startswith("urn:x-hash:")
+    with pytest.raises(ValueError, match="without content"):
+        hashed.mint()
+    namespace = uuid.UUID("6ba7b811-9dad-11d1-80b4-00c04fd430c8")
+    for content in [[], ["ä", "b"], ["urn:x" * 100]]:
+        expected = uuid.uuid5(namespace, "".join(content))
+        assert Uuid5Minter(namespace).mint(content) == f"urn:uuid:{expected}"
+    with pytest.raises(ValueError, match="without content"):
+        Uuid5Minter().mint()
+
+
+def test_lazy_minter() -> None:
+    """Test that lazy entities mint their URI once, when it is read."""
+    counter = CounterMinter("urn:run:")
+    minter = LazyMinter(counter)
+    first = minter.entity([["a"]])
+    second = minter.entity([["b"]])
+    assert isinstance(first, LazyEntity)
+    assert minter.mint() == "urn:run:0"
+    assert second.uri == "urn:run:1"
+    assert second.uri == "urn:run:1"
+    assert first.uri == "urn:run:2"
+    third = minter.entity([["c"]])
+    third.uri = "urn:explicit"
+    assert third.uri == "urn:explicit"
+    copy = pickle.loads(pickle.dumps(minter.entity([["d"]])))  # noqa: S301
+    assert type(copy) is Entity
+    assert copy.uri == "urn:run:3"
+    assert copy.values == [["d"]]
+    hashed = LazyMinter(ContentHashMinter()).entity([["a"]], content=["a"])
+    assert hashed.uri == ContentHashMinter().mint(["a"])
+
+
+def test_build_entities_with_minter() -> None:
+    """Test that the entity builders mint URIs with the given strategy."""
+    entities = build_entities_from_data(DATA, minter=CounterMinter("urn:run:"))
+    assert entities is not None
+    roots = list(entities.entities)
+    assert entities.sub_entities is not None
+    cities = list(entities.sub_entities[0].entities)
+    assert {_.uri for _ in roots} | {_.uri for _ in cities} == {f"urn:run:{_}" for _ in range(10)}
+    assert [_.values[1] for _ in roots] == [[_.uri] for _ in cities]
+    lazy = build_entities_from_records(DATA, minter=LazyMinter(CounterMinter("urn:lazy:")))
+    assert lazy is not None
+    roots = list(lazy.entities)
+    assert all(isinstance(_, LazyEntity) for _ in roots)
+    assert len({_.uri for _ in roots}) == len(DATA)
+
+
+def test_quad_minter() -> None:
+    """Test that quad URIs stay name based UUIDs by default and can be customized."""
+    schema = QuadEntitySchema()
+    expected = uuid.uuid5(uuid.NAMESPACE_DNS, "urn:instance:person1urn:instance:hasCityBerlinen")
+    assert schema.to_entity(QUAD).uri == f"urn:uuid:{expected}"
+    default = schema.minter
+    try:
+        schema.minter = ContentHashMinter()
+        assert schema.to_entity(QUAD).uri == schema.to_entity(QUAD.model_copy()).uri
+        assert schema.to_entity(QUAD).uri.startswith("urn:x-hash:")
+    finally:
+        schema.minter = default
+
+
+@needs_benchmark
+def test_minting_benchmark() -> None:
+    """Compare the strategies with creating ULID and UUID objects."""
+    number = 200_000
+    content = ["urn:instance:person1", "urn:instance:hasCity", "Berlin", "en", "", ""]
+    ulid = timeit.timeit(lambda: f"urn:x-ulid:{ULID()}", number=number)
+    uuid5 = timeit.timeit(
+        lambda: f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_DNS, ''.join(content))}", number=number
+    )
+    minters: list[tuple[str, UriMinter]] = [
+        ("ulid", UlidMinter()),
+        ("counter", CounterMinter()),
+        ("hash", ContentHashMinter()),
+        ("uuid5", Uuid5Minter()),
+    ]
+    timings = {
+        name: timeit.timeit(partial(minter.mint, content), number=number)
+        for name, minter in minters
+    }
+    print(f"ULID(): {ulid:.3f}s, uuid5(): {uuid5:.3f}s, minters: {timings}")  # noqa: T201
+    assert timings["ulid"] < ulid / 4
+    assert timings["uuid5"] < uuid5 / 2
+    assert timings["counter"] < timings["ulid"]
+    assert timings["hash"] < uuid5
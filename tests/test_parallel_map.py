@@ -0,0 +1,72 @@
+"""Tests for the parallel map over entities."""
+
+import pytest
+
+from cmem_plugin_base.dataintegration.entity import (
+    Entities,
+    Entity,
+    EntityBatch,
+    EntityPath,
+    EntitySchema,
+)
+from cmem_plugin_base.dataintegration.plugins import parallel_map
+
+SCHEMA = EntitySchema(type_uri="urn:type", paths=[EntityPath("value")])
+COUNT_SCHEMA = EntitySchema(type_uri="urn:type:count", paths=[EntityPath("count")])
+
+
+def _entities(count: int) -> Entities:
+    return Entities(
+        entities=(Entity(f"urn:{_}", [[str(_)]]) for _ in range(count)),
+        schema=SCHEMA,
+        sub_entities=[],
+    )
+
+
+def square(entity: Entity) -> Entity:
+    """Square the value of an entity."""
+    value = int(entity.values[0][0])
+    return Entity(entity.uri, [[str(value * value)]])
+
+
+def count(batch: EntityBatch) -> list[Entity]:
+    """Count the entities of a batch."""
+    return [Entity(batch.uris[0], [[str(len(batch))]])]
+
+
+def identity(batch: EntityBatch) -> EntityBatch:
+    """Return the batch unchanged."""
+    return batch
+
+
+def test_parallel_map_per_entity() -> None:
+    """Test that results are returned in input order."""
+    result = parallel_map(_entities(1000), square, chunk_size=7, max_workers=2, max_in_flight=3)
+    assert result.schema is SCHEMA
+    assert result.sub_entities == []
+    assert [_.values[0][0] for _ in result.entities] == [str(_ * _) for _ in range(1000)]
+
+
+def test_parallel_map_per_batch() -> None:
+    """Test functions that are applied to batches."""
+    result = parallel_map(
+        _entities(25), count, schema=COUNT_SCHEMA, per_batch=True, chunk_size=10, max_workers=2
+    )
+    assert result.schema is COUNT_SCHEMA
+    assert [(_.uri, _.values) for _ in result.entities] == [
+        ("urn:0", [["10"]]),
+        ("urn:10", [["10"]]),
+        ("urn:20", [["5"]]),
+    ]
+    identical = parallel_map(_entities(25), identity, per_batch=True, chunk_size=10, max_workers=2)
+    assert [_.uri for _ in identical.entities] == [f"urn:{_}" for _ in range(25)]
+
+
+def test_parallel_map_is_lazy() -> None:
+    """Test that nothing is computed before iterating and that parameters are validated."""
+    result = parallel_map(_entities(10), square, max_workers=1)
+    assert next(result.entities).values == [["0"]]
+    with pytest.raises(ValueError, match=r"Chunk size must be positive"):
+        parallel_map(_entities(10), square, chunk_size=0)
+    with pytest.raises(ValueError, match=r"in-flight chunks must be positive"):
+        parallel_map(_entities(10), square, max_in_flight=0)
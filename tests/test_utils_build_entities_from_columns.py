@@ -0,0 +1,101 @@
+"""Tests for `utils.build_entities_from_columns`"""
+
+import time
+
+import pytest
+
+from cmem_plugin_base.dataintegration.entity import Entities
+from cmem_plugin_base.dataintegration.utils.entity_builder import (
+    build_entities_from_columns,
+    build_entities_from_data,
+)
+from cmem_plugin_base.dataintegration.utils.uris import CounterMinter
+from tests.utils import needs_benchmark
+
+COLUMNS = {
+    "name": [f"person {_}" for _ in range(20)],
+    "age": range(20, 40),
+    "score": [_ / 3 for _ in range(20)],
+    "active": [_ % 2 == 0 for _ in range(20)],
+    "email": [None if _ % 3 else f"p{_}@example.com" for _ in range(20)],
+    "tags": [[f"tag {tag}" for tag in range(_ % 3)] for _ in range(20)],
+}
+
+
+def _rows(entities: Entities) -> tuple:
+    """Get the schema and the values of all entities."""
+    return entities.schema, [[list(_) for _ in entity.values] for entity in entities.entities]
+
+
+def test_same_as_build_entities_from_data() -> None:
+    """Test that columns yield the same entities as the corresponding records."""
+    records = [dict(zip(COLUMNS, row, strict=True)) for row in zip(*COLUMNS.values(), strict=True)]
+    expected = build_entities_from_data(records)
+    entities = build_entities_from_columns(COLUMNS)
+    assert expected is not None
+    assert entities is not None
+    assert _rows(entities) == _rows(expected)
+    assert entities.sub_entities is None
+
+
+def test_minter_and_empty_columns() -> None:
+    """Test minting URIs and columns without rows."""
+    entities = build_entities_from_columns({"a": ("x", "y")}, CounterMinter("urn:row:"))
+    assert entities is not None
+    assert [_.uri for _ in entities.entities] == ["urn:row:0", "urn:row:1"]
+    assert build_entities_from_columns({}) is None
+    assert build_entities_from_columns({"a": [], "b": []}) is None
+
+
+def test_invalid_columns() -> None:
+    """Test that columns of different length and nested objects are rejected."""
+    with pytest.raises(ValueError, match="same length"):
+        build_entities_from_columns({"a": [1, 2], "b": [1]})
+    with pytest.raises(TypeError, match="Column 'a'"):
+        build_entities_from_columns({"a": [{"b": 1}]})
+
+
+def test_array_columns() -> None:
+    """Test that arrays are converted to strings at once."""
+    np = pytest.importorskip("numpy")
+    entities = build_entities_from_columns(
+        {
+            "int": np.arange(3),
+            "float": np.array([0.5, 1.0, np.nan]),
+            "pair": np.arange(6).reshape(3, 2),
+            "object": np.array(["a", None, 1], dtype=object),
+        }
+    )
+    assert entities is not None
+    assert [_.is_single_value for _ in entities.schema.paths] == [True, True, False, True]
+    assert _rows(entities)[1] == [
+        [["0"], ["0.5"], ["0", "1"], ["a"]],
+        [["1"], ["1.0"], ["2", "3"], [""]],
+        [["2"], ["nan"], ["4", "5"], ["1"]],
+    ]
+
+
+@needs_benchmark
+def test_columns_benchmark() -> None:
+    """Compare building entities from columns with transposing them into records."""
+    size = 200_000
+    columns: dict[str, list] = {
+        "id": list(range(size)),
+        "name": [f"item {_}" for _ in range(size)],
+        "score": [_ / 7 for _ in range(size)],
+        "flag": [_ % 2 == 0 for _ in range(size)],
+    }
+    start = time.perf_counter()
+    records = [dict(zip(columns, row, strict=True)) for row in zip(*columns.values(), strict=True)]
+    rows = build_entities_from_data(records)
+    assert rows is not None
+    expected = list(rows.entities)
+    rows_time = time.perf_counter() - start
+    start = time.perf_counter()
+    entities = build_entities_from_columns(columns)
+    assert entities is not None
+    built = list(entities.entities)
+    columns_time = time.perf_counter() - start
+    print(f"records: {rows_time:.2f}s, columns: {columns_time:.2f}s")  # noqa: T201
+    assert [_.values for _ in built] == [_.values for _ in expected]
+    assert columns_time < rows_time / 2
@@ -1,9 +1,17 @@
 """Tests for `utils.build_entities_from_data`"""
 
 import json
+import random
+import time
+
+import pytest
 
 from cmem_plugin_base.dataintegration.entity import Entities, EntityPath, EntitySchema
-from cmem_plugin_base.dataintegration.utils.entity_builder import build_entities_from_data
+from cmem_plugin_base.dataintegration.utils.entity_builder import (
+    build_entities_from_data,
+)
+from tests import baseline_entity_builder
+from tests.utils import canonical_entities, needs_benchmark
 
 
 def build_entities_from_json(json_data: str) -> Entities:
@@ -225,3 +233,74 @@ def test_empty_object() -> None:
     test_data = """[]"""
     data = json.loads(test_data)
     assert build_entities_from_data(data) is None
+
+
+def test_late_paths_are_back_filled() -> None:
+    """Test that paths discovered in later records are added to earlier entities."""
+    entities = build_entities_from_data(
+        [
+            {"name": "a", "tags": "x"},
+            {"name": "b", "tags": ["y", "z"], "address": {"city": "c"}},
+            {"email": "d"},
+        ]
+    )
+    assert entities is not None
+    assert entities.schema == EntitySchema(
+        type_uri="",
+        paths=[
+            EntityPath("name", False, is_single_value=True),
+            EntityPath("tags", False, is_single_value=False),
+            EntityPath("address", True, is_single_value=True),
+            EntityPath("email", False, is_single_value=True),
+        ],
+    )
+    values = [_.values for _ in entities.entities]
+    assert values[0] == [["a"], ["x"], [""], [""]]
+    assert values[1][:2] == [["b"], ["y", "z"]]
+    assert values[2] == [[""], [""], [""], ["d"]]
+
+
+def _wide_heterogeneous_data(count: int, width: int) -> list[dict]:
+    """Generate records with many optional keys and nested objects."""
+    rng = random.Random(42)  # noqa: S311
+    records = []
+    for index in range(count):
+        record: dict = {f"key{_}": f"value {index}" for _ in rng.sample(range(width), width // 4)}
+        record["tags"] = [f"tag {_}" for _ in range(index % 4)]
+        record["address"] = {f"field{_}": str(_) for _ in rng.sample(range(20), 5)}
+        record["contacts"] = [
+            {"kind": f"kind {_}", "geo": {"lat": str(_), "long": str(index)}}
+            for _ in range(index % 3)
+        ]
+        records.append(record)
+    return records
+
+
+def test_equals_baseline_builder() -> None:
+    """Test that schemata, entities and sub entity collections are built in the same order."""
+    data = _wide_heterogeneous_data(300, 40)
+    expected = baseline_entity_builder.build_entities_from_data(data)
+    entities = build_entities_from_data(data)
+    assert expected is not None
+    assert entities is not None
+    assert canonical_entities(entities) == canonical_entities(expected)
+
+
+@needs_benchmark
+@pytest.mark.parametrize(("count", "width"), [(20_000, 200)])
+def test_single_pass_benchmark(count: int, width: int) -> None:
+    """Compare the single-pass builder with walking the data twice."""
+    data = _wide_heterogeneous_data(count, width)
+    start = time.perf_counter()
+    two_pass = baseline_entity_builder.build_entities_from_data(data)
+    two_pass_time = time.perf_counter() - start
+    start = time.perf_counter()
+    entities = build_entities_from_data(data)
+    single_pass_time = time.perf_counter() - start
+    assert entities is not None
+    assert two_pass is not None
+    assert len(list(entities.entities)) == len(list(two_pass.entities))
+    print(  # noqa: T201
+        f"\ntwo passes: {two_pass_time:.2f}s, single pass: {single_pass_time:.2f}s"
+    )
+    assert single_pass_time < two_pass_time
@@ -0,0 +1,149 @@
+"""Tests for `utils.build_entities_from_json_stream` and `utils.json_stream`"""
+
+import json
+import random
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from cmem_plugin_base.dataintegration.typed_entities.file import LocalFile
+from cmem_plugin_base.dataintegration.utils.entity_builder import (
+    build_entities_from_data,
+    build_entities_from_json_stream,
+)
+from cmem_plugin_base.dataintegration.utils.json_stream import iter_json_items
+from tests.test_utils_build_entities_from_records import RECORDS, _strip_uris
+from tests.utils import needs_benchmark
+
+
+def _random_value(rng: random.Random, depth: int = 0) -> object:
+    """Get a random JSON value."""
+    kind = rng.random()
+    if depth > 3 or kind < 0.4:
+        return rng.choice(
+            [rng.randint(-(10**6), 10**6), rng.random() * 1e5, -2e20, 'ä\U0001f600"\\', True, None]
+        )
+    if kind < 0.7:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {f"k{_}": _random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 4096])
+def test_iter_json_items(chunk_size: int) -> None:
+    """Test that items are parsed like `json.loads` for any chunk boundaries."""
+    rng = random.Random(chunk_size)  # noqa: S311
+    for _ in range(50):
+        items = [_random_value(rng) for _ in range(rng.randint(0, 10))]
+        document = {"skip": _random_value(rng), "data": {"other": ["]"], "items": items}}
+        text = json.dumps(document, indent=rng.choice([None, 2]), ensure_ascii=False)
+        stream = BytesIO(text.encode())
+        assert list(iter_json_items(stream, "data/items", chunk_size)) == items
+        stream = BytesIO(json.dumps(items).encode())
+        assert list(iter_json_items(stream, chunk_size=chunk_size)) == items
+
+
+def test_iter_json_items_single_value() -> None:
+    """Test that a value at the item path which is not an array is the only item."""
+    assert list(iter_json_items(BytesIO(b'\xef\xbb\xbf{"a": {"b": 1}}'), "a")) == [{"b": 1}]
+    assert list(iter_json_items(BytesIO(b"12345"), chunk_size=1)) == [12345]
+
+
+@pytest.mark.parametrize(
+    ("document", "item_path", "error"),
+    [
+        (b"[1, 2", "", ValueError),
+        (b"[1 2]", "", ValueError),
+        (b'{"a": [1, }', "a", ValueError),
+        (b"", "", ValueError),
+        (b"[1]", "a", ValueError),
+        (b'{"a": 1}', "b", KeyError),
+        (b'{"a": {}}', "a/b", KeyError),
+    ],
+)
+def test_iter_json_items_errors(document: bytes, item_path: str, error: type) -> None:
+    """Test that malformed documents and missing keys are reported."""
+    with pytest.raises(error):
+        list(iter_json_items(BytesIO(document), item_path, chunk_size=2))
+
+
+class _CountingStream(BytesIO):
+    """A stream that counts the bytes read from it."""
+
+    read_bytes = 0
+
+    def read(self, size: int | None = -1) -> bytes:
+        """Read and count bytes."""
+        data = super().read(size)
+        self.read_bytes += len(data)
+        return data
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_iter_json_items_syntax_error(chunk_size: int) -> None:
+    """Test that syntax errors are raised early and located in the whole document."""
+    items = [{"name": f"item {_}", "tags": ["a", "b"]} for _ in range(20_000)]
+    text = json.dumps(items, indent=2)
+    error_at = text.index("item 100")
+    text = text[:error_at] + text[error_at:].replace('"b"\n', '"b",\n', 1)
+    with pytest.raises(json.JSONDecodeError) as expected:
+        json.loads(text)
+    stream = _CountingStream(text.encode())
+    with pytest.raises(json.JSONDecodeError) as error:
+        list(iter_json_items(stream, chunk_size=chunk_size))
+    assert (error.value.msg, error.value.pos) == (expected.value.msg, expected.value.pos)
+    assert (error.value.lineno, error.value.colno) == (
+        expected.value.lineno,
+        expected.value.colno,
+    )
+    assert str(error.value) == str(expected.value)
+    assert stream.read_bytes < error_at + 2 * max(chunk_size, 1024)
+
+
+def test_same_as_build_entities_from_data(tmp_path: Path) -> None:
+    """Test that streaming a JSON file yields the same entities as loading it."""
+    path = tmp_path / "records.json"
+    path.write_text(json.dumps({"meta": {"count": 200}, "results": [*RECORDS, 1]}, indent=2))
+    expected = build_entities_from_data(RECORDS)
+    entities = build_entities_from_json_stream(LocalFile(str(path)), "project", "results")
+    assert expected is not None
+    assert entities is not None
+    assert _strip_uris(entities) == _strip_uris(expected)
+
+
+def test_empty_json_stream(tmp_path: Path) -> None:
+    """Test that documents without objects yield no entities."""
+    path = tmp_path / "empty.json"
+    path.write_text('{"results": [1, 2]}')
+    assert build_entities_from_json_stream(LocalFile(str(path)), "project", "results") is None
+
+
+@needs_benchmark
+def test_json_stream_benchmark() -> None:
+    """Compare memory and time of incremental parsing with loading the whole document."""
+    document = json.dumps(
+        [
+            {"id": _, "name": f"item {_}", "tags": ["a", "b"], "geo": {"x": 1.5}}
+            for _ in range(200_000)
+        ]
+    ).encode()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    loaded = len(json.loads(document.decode()))
+    loads_time = time.perf_counter() - start
+    loads_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    streamed = sum(1 for _ in iter_json_items(BytesIO(document)))
+    stream_time = time.perf_counter() - start
+    stream_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(  # noqa: T201
+        f"json.loads: {loads_time:.2f}s, {loads_peak / 2**20:.0f} MiB, "
+        f"iter_json_items: {stream_time:.2f}s, {stream_peak / 2**20:.0f} MiB"
+    )
+    assert loaded == streamed
+    assert stream_peak < loads_peak / 10
@@ -0,0 +1,80 @@
+"""Tests for `utils.build_entities_from_records`"""
+
+import json
+from io import StringIO
+
+import pytest
+
+from cmem_plugin_base.dataintegration.entity import Entities
+from cmem_plugin_base.dataintegration.utils.entity_builder import (
+    build_entities_from_data,
+    build_entities_from_records,
+    iter_json_lines,
+)
+
+RECORDS = [
+    {
+        "name": f"person {index}",
+        "tags": [f"tag {_}" for _ in range(index % 3)],
+        "city": {"name": f"city {index % 4}", "geo": {"lat": str(index)}},
+        "pets": [{"name": f"pet {index}.{_}"} for _ in range(index % 2)],
+    }
+    for index in range(200)
+]
+RECORDS[5]["email"] = "late@example.com"
+
+
+def _strip_uris(entities: Entities) -> list:
+    """Get the values of all entities with relation values replaced by markers."""
+    result = []
+    for collection in [entities, *(entities.sub_entities or [])]:
+        relations = [_.is_relation for _ in collection.schema.paths]
+        result.append(
+            (
+                collection.schema,
+                [
+                    [
+                        [uri[:11] for uri in values] if is_relation else list(values)
+                        for values, is_relation in zip(entity.values, relations, strict=True)
+                    ]
+                    for entity in collection.entities
+                ],
+            )
+        )
+    return result
+
+
+def test_same_as_build_entities_from_data() -> None:
+    """Test that streaming yields the same entities as building them at once."""
+    expected = build_entities_from_data(RECORDS)
+    entities = build_entities_from_records(iter(RECORDS))
+    assert expected is not None
+    assert entities is not None
+    assert _strip_uris(entities) == _strip_uris(expected)
+
+
+def test_sub_entities_reference_root_entities() -> None:
+    """Test that relations point to sub entities when consuming collections in any order."""
+    entities = build_entities_from_records(iter(RECORDS), memory_limit=2000)
+    assert entities is not None
+    assert entities.sub_entities is not None
+    sub_uris = {_.uri for sub in reversed(entities.sub_entities) for _ in sub.entities}
+    root = list(entities.entities)
+    assert len(root) == len(RECORDS)
+    city_index = entities.schema.index_of("city")
+    assert all(_.values[city_index][0] in sub_uris for _ in root)
+
+
+def test_json_lines() -> None:
+    """Test building entities from a JSON Lines stream."""
+    stream = StringIO("\n".join(json.dumps(_) for _ in RECORDS[:3]) + "\n\n")
+    entities = build_entities_from_records(iter_json_lines(stream))
+    assert entities is not None
+    assert [_.values[0] for _ in entities.entities] == [["person 0"], ["person 1"], ["person 2"]]
+
+
+def test_invalid_records() -> None:
+    """Test empty and invalid records."""
+    assert build_entities_from_records(iter([])) is None
+    with pytest.raises(TypeError, match=r"Records must be dicts, but got list"):
+        build_entities_from_records([{"a": 1}, [1]])  # type: ignore[list-item]
@@ -0,0 +1,80 @@
+"""Tests for building entities in a process pool with `utils.build_entities_from_data`"""
+
+import os
+import time
+
+import pytest
+
+from cmem_plugin_base.dataintegration.context import ExecutionReport
+from cmem_plugin_base.dataintegration.utils.entity_builder import (
+    SchemaPolicy,
+    build_entities_from_data,
+)
+from cmem_plugin_base.dataintegration.utils.resolver import EntityResolver
+from cmem_plugin_base.dataintegration.utils.uris import CounterMinter
+from tests.test_entity_resolver import _rebuild
+from tests.test_utils_build_entities_from_data import _wide_heterogeneous_data
+from tests.test_utils_build_entities_from_records import RECORDS, _strip_uris
+from tests.test_utils_schema_policy import DATA
+from tests.utils import needs_benchmark
+
+HETEROGENEOUS = _wide_heterogeneous_data(300, 40)
+
+
+@pytest.mark.parametrize("data", [RECORDS, HETEROGENEOUS], ids=["records", "heterogeneous"])
+def test_same_as_single_process(data: list[dict]) -> None:
+    """Test that partitions are merged into the entities of a single process."""
+    expected = build_entities_from_data(data)
+    entities = build_entities_from_data(data, parallel_threshold=len(data), max_workers=3)
+    assert expected is not None
+    assert entities is not None
+    assert _strip_uris(entities) == _strip_uris(expected)
+    assert build_entities_from_data(data, parallel_threshold=len(data) + 1) is not None
+
+
+def test_relations_resolve_across_partitions() -> None:
+    """Test that URIs are unique and relations point to the sub entities of their partition."""
+    entities = build_entities_from_data(
+        RECORDS, minter=CounterMinter("urn:run:"), parallel_threshold=1, max_workers=2
+    )
+    assert entities is not None
+    with EntityResolver(entities) as resolver:
+        roots = list(entities.entities)
+        uris = [_.uri for _ in roots]
+        assert len(set(uris)) == len(uris)
+        assert len(resolver) == sum(2 + len(_["pets"]) for _ in RECORDS)
+        assert [_rebuild(resolver, _) for _ in roots] == [
+            {**_, "email": _.get("email", "")} for _ in RECORDS
+        ]
+
+
+def test_policy_in_parallel() -> None:
+    """Test that sampled schemata are used by all workers and unseen keys reported once."""
+    report = ExecutionReport()
+    entities = build_entities_from_data(
+        DATA, SchemaPolicy.first(10, report=report), parallel_threshold=1, max_workers=2
+    )
+    assert entities is not None
+    assert [_.path for _ in entities.schema.paths] == ["name", "city"]
+    assert len(list(entities.entities)) == len(DATA)
+    assert report.warnings == [
+        "Ignored key 'email' of path 'root', which is not part of the schema.",
+        "Ignored key 'zip' of path 'root/city', which is not part of the schema.",
+    ]
+
+
+@needs_benchmark
+def test_parallel_benchmark() -> None:
+    """Compare building entities in a process pool with a single process."""
+    workers = os.process_cpu_count() or 1
+    if workers < 4:
+        pytest.skip("Needs at least 4 CPUs")
+    data = _wide_heterogeneous_data(100_000, 40)
+    start = time.perf_counter()
+    build_entities_from_data(data)
+    single = time.perf_counter() - start
+    start = time.perf_counter()
+    build_entities_from_data(data, parallel_threshold=1, max_workers=workers)
+    parallel = time.perf_counter() - start
+    print(f"single process: {single:.2f}s, {workers} workers: {parallel:.2f}s")  # noqa: T201
+    assert parallel < single
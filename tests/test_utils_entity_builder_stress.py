@@ -0,0 +1,150 @@
+"""Depth and breadth stress tests for the entity builder."""
+
+import random
+import sys
+
+import pytest
+
+from cmem_plugin_base.dataintegration.utils.entity_builder import (
+    SchemaPolicy,
+    build_entities_from_data,
+    build_entities_from_records,
+    generate_paths_from_data,
+)
+from tests import baseline_entity_builder
+from tests.utils import canonical_entities
+
+DEPTH = 5 * sys.getrecursionlimit()
+
+
+def _deep(depth: int, in_lists: bool = False) -> dict:
+    """Create an object that nests `depth` levels of objects."""
+    data: dict = {"leaf": "value"}
+    for level in range(depth):
+        data = {"level": str(level), "child": [data] if in_lists else data}
+    return data
+
+
+@pytest.mark.parametrize("in_lists", [False, True])
+def test_deep_objects(in_lists: bool) -> None:
+    """Test objects that are nested deeper than the recursion limit."""
+    data = _deep(DEPTH, in_lists)
+    paths_map = generate_paths_from_data(data)
+    assert len(paths_map) == DEPTH + 1
+    entities = build_entities_from_data(data)
+    assert entities is not None
+    assert entities.sub_entities is not None
+    assert len(entities.sub_entities) == DEPTH
+    deepest = entities.sub_entities[0]
+    assert [_.path for _ in deepest.schema.paths] == ["leaf"]
+    assert [_.values for _ in deepest.entities] == [[["value"]]]
+    root = next(entities.entities)
+    assert root.values[0] == [str(DEPTH - 1)]
+
+
+def test_deep_records_stream() -> None:
+    """Test streaming records that are nested deeper than the recursion limit."""
+    for policy in [SchemaPolicy.full(), SchemaPolicy.first(1)]:
+        entities = build_entities_from_records(iter([_deep(DEPTH), _deep(DEPTH)]), policy)
+        assert entities is not None
+        assert entities.sub_entities is not None
+        assert len(list(entities.entities)) == 2
+        assert len(list(entities.sub_entities[0].entities)) == 2
+
+
+def test_wide_objects() -> None:
+    """Test objects with many keys and long lists."""
+    width = 20_000
+    data = {
+        **{f"key{_}": _ for _ in range(width)},
+        "items": [{"index": _} for _ in range(width)],
+        "values": list(range(width)),
+    }
+    entities = build_entities_from_data(data)
+    assert entities is not None
+    assert entities.sub_entities is not None
+    assert len(entities.schema.paths) == width + 2
+    root = next(entities.entities)
+    assert len(root.values[width]) == width
+    assert root.values[width + 1][-1] == str(width - 1)
+    items = list(entities.sub_entities[0].entities)
+    assert [_.values[0][0] for _ in items[:3]] == ["0", "1", "2"]
+    assert [_.uri for _ in items] == root.values[width]
+
+
+def test_many_records_with_nested_lists() -> None:
+    """Test many records with several objects per list and sub entities in order."""
+    data = [
+        {"id": str(record), "children": [{"id": f"{record}.{_}"} for _ in range(3)]}
+        for record in range(5_000)
+    ]
+    entities = build_entities_from_data(data)
+    assert entities is not None
+    assert entities.sub_entities is not None
+    children = [_.values[0][0] for _ in entities.sub_entities[0].entities]
+    assert children[:4] == ["0.0", "0.1", "0.2", "1.0"]
+    assert len(children) == 15_000
+
+
+def _random_object(rng: random.Random, depth: int) -> dict:
+    """Create an object with keys in random order and nested objects and lists."""
+    data: dict = {}
+    for key in rng.sample("abcdef", rng.randint(1, 4)):
+        kind = rng.choice(["literal", "list", "object", "objects"] if depth else ["literal"])
+        if kind == "literal":
+            data[key] = str(rng.randint(0, 9))
+        elif kind == "list":
+            data[key] = [str(_) for _ in range(rng.randint(1, 3))]
+        elif kind == "object":
+            data[key] = _random_object(rng, depth - 1)
+        else:
+            data[key] = [_random_object(rng, depth - 1) for _ in range(rng.randint(1, 3))]
+    return data
+
+
+def test_sub_entity_order_matches_baseline() -> None:
+    """Test that sub entity collections are ordered like the recursive builder orders them."""
+    data = [{"a": {"x": 1}, "b": [{"y": {"z": 1}}]}, {"c": {"q": 1}, "a": {"w": {"k": 1}}}]
+    entities = build_entities_from_data(data)
+    assert entities is not None
+    assert entities.sub_entities is not None
+    assert [[_.path for _ in sub.schema.paths] for sub in entities.sub_entities] == [
+        ["x", "w"],
+        ["z"],
+        ["y"],
+        ["k"],
+        ["q"],
+    ]
+    rng = random.Random(7)  # noqa: S311
+    for _ in range(200):
+        # every key has one kind, as the baseline does not widen paths of other kinds
+        kinds: dict = {}
+        records = [
+            record
+            for record in (_random_object(rng, 3) for _ in range(rng.randint(1, 6)))
+            if _consistent(record, "root", kinds)
+        ]
+        if not records:
+            continue
+        expected = baseline_entity_builder.build_entities_from_data(records)
+        actual = build_entities_from_data(records)
+        assert expected is not None
+        assert actual is not None
+        assert canonical_entities(actual) == canonical_entities(expected)
+
+
+def _consistent(data: dict, path: str, kinds: dict) -> bool:
+    """Check that the keys of an object have the same kinds as in the previous objects."""
+    for key, value in data.items():
+        kind = type(value).__name__
+        if isinstance(value, list) and any(isinstance(_, dict) for _ in value):
+            kind = "objects"
+        if kinds.setdefault(f"{path}/{key}", kind) != kind:
+            return False
+        if isinstance(value, dict) and not _consistent(value, f"{path}/{key}", kinds):
+            return False
+        if isinstance(value, list) and not all(
+            _consistent(_, f"{path}/{key}", kinds) for _ in value if isinstance(_, dict)
+        ):
+            return False
+    return True
@@ -0,0 +1,118 @@
+"""Tests for writing entities as nested JSON with `utils.json_writer`"""
+
+import json
+import time
+from io import BytesIO
+
+import pytest
+
+from cmem_plugin_base.dataintegration.entity import Entities, Entity, EntityPath, EntitySchema
+from cmem_plugin_base.dataintegration.utils.entity_builder import build_entities_from_data
+from cmem_plugin_base.dataintegration.utils.json_writer import (
+    iter_nested_objects,
+    write_nested_json,
+)
+from cmem_plugin_base.dataintegration.utils.replay import estimate_size
+from tests.test_entity_resolver import DATA
+from tests.utils import needs_benchmark
+
+
+def _entities(data: list[dict]) -> Entities:
+    """Build entities from data."""
+    entities = build_entities_from_data(data)
+    assert entities is not None
+    return entities
+
+
+@pytest.mark.parametrize("json_lines", [False, True])
+def test_round_trip(json_lines: bool) -> None:
+    """Test that nested objects are rebuilt from the entities of `build_entities_from_data`."""
+    stream = BytesIO()
+    assert write_nested_json(_entities(DATA), stream, json_lines=json_lines, buffer_size=100) == 50
+    text = stream.getvalue().decode()
+    if json_lines:
+        assert [json.loads(_) for _ in text.splitlines()] == DATA
+    else:
+        assert json.loads(text) == DATA
+
+
+def test_spilled_sub_entities() -> None:
+    """Test that sub entities are resolved when they exceed the memory limit."""
+    limit = 10 * estimate_size(Entity("urn:x", [["x"]]))
+    assert list(iter_nested_objects(_entities(DATA), memory_limit=limit)) == DATA
+
+
+def test_empty_and_unresolved_values() -> None:
+    """Test that empty relations become None and unresolved values are kept."""
+    data: list[dict] = [
+        {"name": "ä", "city": {"name": "Berlin"}},
+        {"name": "b", "tags": ["x", {"y": "1"}]},
+    ]
+    entities = _entities(data)
+    assert list(iter_nested_objects(entities)) == [
+        {"name": "ä", "city": {"name": "Berlin"}, "tags": []},
+        {"name": "b", "city": None, "tags": ["x", {"y": "1"}]},
+    ]
+    stream = BytesIO()
+    assert write_nested_json(_entities(data), stream) == 2
+    assert "ä" in stream.getvalue().decode()
+
+
+def test_no_entities() -> None:
+    """Test writing an empty array and empty JSON lines."""
+    schema = EntitySchema(type_uri="urn:type", paths=[EntityPath("name")])
+    for json_lines, expected in [(False, b"[]"), (True, b"")]:
+        stream = BytesIO()
+        entities = Entities(entities=iter([]), schema=schema)
+        assert write_nested_json(entities, stream, json_lines=json_lines) == 0
+        assert stream.getvalue() == expected
+
+
+def test_cycle() -> None:
+    """Test that entities that reference themselves are rejected."""
+    schema = EntitySchema(type_uri="urn:type", paths=[EntityPath("knows", is_relation=True)])
+    entities = Entities(
+        entities=iter([Entity("urn:root", [["urn:a"]])]),
+        schema=schema,
+        sub_entities=[Entities(entities=iter([Entity("urn:a", [["urn:a"]])]), schema=schema)],
+    )
+    with pytest.raises(ValueError, match="references itself"):
+        list(iter_nested_objects(entities))
+
+
+@needs_benchmark
+def test_json_writer_benchmark() -> None:
+    """Compare writing nested JSON with scanning the sub entities for each relation value."""
+    data = [{"name": f"n{_}", "child": {"name": f"c{_}"}} for _ in range(5_000)]
+    entities = build_entities_from_data(data)
+    assert entities is not None
+    assert entities.sub_entities is not None
+    children = list(entities.sub_entities[0].entities)
+    roots = list(entities.entities)
+    start = time.perf_counter()
+    naive = json.dumps(
+        [
+            {
+                "name": root.values[0][0],
+                "child": next(
+                    {"name": _.values[0][0]} for _ in children if _.uri == root.values[1][0]
+                ),
+            }
+            for root in roots
+        ]
+    )
+    naive_time = time.perf_counter() - start
+    start = time.perf_counter()
+    stream = BytesIO()
+    write_nested_json(
+        Entities(
+            entities=iter(roots),
+            schema=entities.schema,
+            sub_entities=[Entities(iter(children), entities.sub_entities[0].schema)],
+        ),
+        stream,
+    )
+    writer_time = time.perf_counter() - start
+    print(f"scanning: {naive_time:.2f}s, write_nested_json: {writer_time:.2f}s")  # noqa: T201
+    assert json.loads(stream.getvalue()) == json.loads(naive) == data
+    assert writer_time < naive_time / 10
@@ -0,0 +1,158 @@
+"""Tests for compiling and evaluating paths with `utils.paths`"""
+
+import json
+import time
+from io import BytesIO
+
+import pytest
+
+from cmem_plugin_base.dataintegration.entity import EntityPath, EntitySchema
+from cmem_plugin_base.dataintegration.utils.entity_builder import build_entities_from_data
+from cmem_plugin_base.dataintegration.utils.paths import (
+    BackwardStep,
+    DocumentProjector,
+    ForwardStep,
+    PathFilter,
+    compile_path,
+    project_json_stream,
+)
+from cmem_plugin_base.dataintegration.utils.uris import CounterMinter
+from tests.utils import needs_benchmark
+
+DOCUMENT = {
+    "name": "Alice",
+    "age": 42,
+    "city": {
+        "label": [
+            {"@value": "Munich", "@language": "en"},
+            {"@value": "München", "@language": "de"},
+        ],
+        "population": 1_500_000,
+    },
+    "pets": [{"name": "Tom", "age": 3}, {"name": "Rex", "age": 12}, None],
+    "friend": "urn:bob",
+    "odd/key": True,
+}
+
+PEOPLE = {"urn:bob": {"name": "Bob", "friend": "urn:alice"}, "urn:alice": DOCUMENT}
+
+
+def test_parse() -> None:
+    """Test parsing forward and backward steps, filters and bracketed keys."""
+    assert compile_path("city/label[@lang = 'en']").steps == (
+        ForwardStep("city"),
+        ForwardStep("label"),
+        PathFilter("@lang", "=", "en"),
+    )
+    assert compile_path('/pets\\..[<a b> != "x\\"y"]/<http://x/y>').steps == (
+        ForwardStep("pets"),
+        BackwardStep(".."),
+        PathFilter("a b", "!=", 'x"y'),
+        ForwardStep("http://x/y"),
+    )
+    assert compile_path(EntityPath("name")) is compile_path("name")
+    assert compile_path("").steps == ()
+
+
+@pytest.mark.parametrize(
+    ("path", "error"),
+    [("a//b", "Expected a key at position 2"), ("a[b]", "Invalid filter"), ("a]", "Unexpected")],
+)
+def test_parse_errors(path: str, error: str) -> None:
+    """Test that invalid paths are rejected with their position."""
+    with pytest.raises(ValueError, match=error):
+        compile_path(path)
+
+
+@pytest.mark.parametrize(
+    ("path", "expected"),
+    [
+        ("name", ["Alice"]),
+        ("age", ["42"]),
+        ("city/label", ["Munich", "München"]),
+        ("city/label[@lang = 'de']", ["München"]),
+        ("pets/name", ["Tom", "Rex"]),
+        ("pets[age >= 10]/name", ["Rex"]),
+        ("pets[age < 10]/name", ["Tom"]),
+        ("pets[name != 'Tom']/age", ["12"]),
+        ("pets/name\\name/age", ["3", "12"]),
+        ("pets/name\\pets", []),
+        ("city/population\\..\\city/name", ["Alice"]),
+        ("pets/age\\..\\..[age > 40]/name", ["Alice"]),
+        ("<odd/key>", ["True"]),
+        ("missing/name", []),
+    ],
+)
+def test_values(path: str, expected: list[str]) -> None:
+    """Test evaluating paths against a document."""
+    assert compile_path(path).values(DOCUMENT) == expected
+
+
+def test_relation_hops() -> None:
+    """Test that string values are resolved when a forward step is applied to them."""
+    expression = compile_path("friend/friend/name")
+    assert expression.values(DOCUMENT) == []
+    assert expression.values(DOCUMENT, PEOPLE.get) == ["Alice"]
+    assert compile_path("friend\\friend/name").values(DOCUMENT, PEOPLE.get) == ["Alice"]
+    assert compile_path("city").evaluate(DOCUMENT) == [DOCUMENT["city"]]
+
+
+def test_document_projector() -> None:
+    """Test building entities of a schema from documents."""
+    schema = EntitySchema(
+        type_uri="urn:person",
+        paths=[
+            EntityPath("name", is_single_value=True),
+            EntityPath("pets/name"),
+            EntityPath("city/label[@lang = 'en']", is_single_value=True),
+            EntityPath("friend/name", is_single_value=True),
+        ],
+    )
+    projector = DocumentProjector(schema, CounterMinter("urn:p:"), resolve=PEOPLE.get)
+    entities = projector.entities([DOCUMENT, PEOPLE["urn:bob"]])
+    assert entities.schema is schema
+    assert [(_.uri, _.values) for _ in entities.entities] == [
+        ("urn:p:0", [["Alice"], ["Tom", "Rex"], ["Munich"], ["Bob"]]),
+        ("urn:p:1", [["Bob"], [], [], ["Alice"]]),
+    ]
+
+
+def test_project_json_stream() -> None:
+    """Test projecting the objects of a streamed JSON document."""
+    stream = BytesIO(json.dumps({"results": [DOCUMENT, 1, {"name": "Carol"}]}).encode())
+    schema = EntitySchema(type_uri="urn:person", paths=[EntityPath("name"), EntityPath("age")])
+    entities = project_json_stream(stream, schema, "results")
+    assert [_.values for _ in entities.entities] == [[["Alice"], ["42"]], [["Carol"], []]]
+
+
+@needs_benchmark
+def test_projection_benchmark() -> None:
+    """Compare projecting two paths with flattening whole documents."""
+    documents = [
+        {
+            "id": _,
+            "name": f"person {_}",
+            "address": {"city": f"city {_ % 100}", "street": "Main Street", "zip": "12345"},
+            "tags": [f"tag {tag}" for tag in range(5)],
+            "scores": {f"s{score}": score for score in range(20)},
+        }
+        for _ in range(50_000)
+    ]
+    schema = EntitySchema(
+        type_uri="urn:person",
+        paths=[EntityPath("name", is_single_value=True), EntityPath("address/city")],
+    )
+    start = time.perf_counter()
+    flattened = build_entities_from_data(documents)
+    assert flattened is not None
+    assert flattened.sub_entities is not None
+    list(flattened.entities)
+    for _ in flattened.sub_entities:
+        list(_.entities)
+    flatten_time = time.perf_counter() - start
+    start = time.perf_counter()
+    projected = list(DocumentProjector(schema).entities(documents).entities)
+    project_time = time.perf_counter() - start
+    print(f"flatten: {flatten_time:.2f}s, project: {project_time:.2f}s")  # noqa: T201
+    assert projected[1].values == [["person 1"], ["city 1"]]
+    assert project_time < flatten_time / 2
@@ -0,0 +1,104 @@
+"""Tests for the schema inference policies of the entity builder."""
+
+import pytest
+
+from cmem_plugin_base.dataintegration.context import ExecutionReport
+from cmem_plugin_base.dataintegration.entity import EntityPath, EntitySchema
+from cmem_plugin_base.dataintegration.utils.entity_builder import (
+    SchemaPolicy,
+    build_entities_from_data,
+    build_entities_from_records,
+)
+from tests.utils import tracked
+
+DATA = [{"name": f"n{_}", "city": {"name": f"c{_}"}} for _ in range(100)]
+DATA[50] = {"name": "late", "email": "late@example.com", "city": {"name": "c", "zip": "1"}}
+
+
+def test_full_scan() -> None:
+    """Test that all keys are part of the schema by default."""
+    entities = build_entities_from_data(DATA, SchemaPolicy.full())
+    assert entities is not None
+    assert [_.path for _ in entities.schema.paths] == ["name", "city", "email"]
+
+
+@pytest.mark.parametrize("policy", [SchemaPolicy.first(10), SchemaPolicy.reservoir(10, seed=1)])
+def test_sample_with_warnings(policy: SchemaPolicy) -> None:
+    """Test that unseen keys are ignored and reported once."""
+    report = ExecutionReport()
+    policy.report = report
+    entities = build_entities_from_data(DATA, policy)
+    assert entities is not None
+    assert entities.sub_entities is not None
+    assert [_.path for _ in entities.schema.paths] == ["name", "city"]
+    assert [_.path for _ in entities.sub_entities[0].schema.paths] == ["name"]
+    assert len(list(entities.entities)) == 100
+    assert report.warnings == [
+        "Ignored key 'email' of path 'root', which is not part of the schema.",
+        "Ignored key 'zip' of path 'root/city', which is not part of the schema.",
+    ]
+
+
+def test_sample_ignore_and_extend() -> None:
+    """Test ignoring unseen keys silently and extending the schema with them."""
+    entities = build_entities_from_data(DATA, SchemaPolicy.first(10, unseen_keys="ignore"))
+    assert entities is not None
+    assert len(entities.schema.paths) == 2
+    entities = build_entities_from_data(DATA, SchemaPolicy.first(10, unseen_keys="extend"))
+    assert entities is not None
+    assert [_.path for _ in entities.schema.paths] == ["name", "city", "email"]
+    assert next(entities.entities).values[2] == [""]
+
+
+def test_explicit_schema() -> None:
+    """Test building entities of an explicit schema."""
+    schema = EntitySchema(
+        type_uri="", paths=[EntityPath("email"), EntityPath("city", is_relation=True)]
+    )
+    entities = build_entities_from_data(DATA, SchemaPolicy.explicit(schema, unseen_keys="ignore"))
+    assert entities is not None
+    assert entities.schema == schema
+    assert entities.sub_entities is not None
+    assert entities.sub_entities[0].schema.paths == ()
+    values = [_.values for _ in entities.entities]
+    assert values[0][0] == [""]
+    assert values[50][0] == ["late@example.com"]
+    with pytest.raises(ValueError, match=r"needs a schema for the 'root' path"):
+        SchemaPolicy.explicit({"root/city": schema})
+
+
+def test_streaming_first_records() -> None:
+    """Test that only the sample is read before the entities are iterated."""
+    consumed: list[int] = []
+    entities = build_entities_from_records(
+        tracked(DATA, consumed), SchemaPolicy.first(10, unseen_keys="ignore")
+    )
+    assert entities is not None
+    assert len(consumed) == 10
+    assert len(entities.schema.paths) == 2
+    assert len(list(entities.entities)) == 100
+    assert len(consumed) == 100
+
+
+def test_streaming_explicit_and_reservoir() -> None:
+    """Test streaming with an explicit schema and a reservoir sample."""
+    consumed: list[int] = []
+    policy = SchemaPolicy.explicit(
+        {
+            "root": EntitySchema(type_uri="", paths=[EntityPath("city", is_relation=True)]),
+            "root/city": EntitySchema(type_uri="", paths=[EntityPath("zip")]),
+        },
+        unseen_keys="ignore",
+    )
+    entities = build_entities_from_records(tracked(DATA, consumed), policy)
+    assert entities is not None
+    assert len(consumed) == 1
+    assert entities.sub_entities is not None
+    assert [_.values for _ in entities.sub_entities[0].entities][50] == [["1"]]
+    entities = build_entities_from_records(iter(DATA), SchemaPolicy.reservoir(100))
+    assert entities is not None
+    assert len(entities.schema.paths) == 3
+    with pytest.raises(ValueError, match=r"cannot be extended"):
+        build_entities_from_records(iter(DATA), SchemaPolicy.first(10, unseen_keys="extend"))
+    with pytest.raises(ValueError, match=r"Sample size must be positive"):
+        SchemaPolicy.first(0)
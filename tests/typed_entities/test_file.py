@@ -0,0 +1,418 @@
+"""Tests for reading file entities without loading them into memory."""
+
+import gzip
+import io
+import mmap
+import os
+import time
+import tracemalloc
+import zipfile
+from functools import partial
+from pathlib import Path
+from typing import IO
+
+import pytest
+from requests import HTTPError
+
+from cmem_plugin_base.dataintegration.typed_entities import file as file_module
+from cmem_plugin_base.dataintegration.typed_entities.archives import ArchivePool
+from cmem_plugin_base.dataintegration.typed_entities.file import (
+    File,
+    FileMetadata,
+    LocalFile,
+    ProjectFile,
+    _prepare_stream_for_processing,
+)
+from tests.utils import needs_benchmark
+
+TEXT = "äöü line\n" * 1000
+
+
+class _Unseekable(io.RawIOBase, IO[bytes]):  # type: ignore[misc]
+    """A stream that can only be read forward, like the body of an HTTP response."""
+
+    def __init__(self, content: bytes) -> None:
+        self._content = io.BytesIO(content)
+        self.read_size = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: memoryview) -> int:  # type: ignore[override]
+        size = self._content.readinto(buffer)
+        self.read_size += size
+        return size
+
+
+class _Response:
+    """A streamed response of a project resource."""
+
+    def __init__(self, content: bytes | None) -> None:
+        self.status_code = 200 if content is not None else 404
+        self.raw = _Unseekable(content or b"")
+
+    def close(self) -> None:
+        self.raw.close()
+
+
+@pytest.fixture
+def resources(monkeypatch: pytest.MonkeyPatch) -> dict:
+    """Serve project resources from a dict and record the responses."""
+    content: dict[str, bytes] = {}
+    modified: dict[str, str] = {}
+    responses: list[_Response] = []
+
+    def get_resource_response(project_id: str, path: str) -> _Response:
+        assert project_id == "project"
+        responses.append(_Response(content.get(path)))
+        return responses[-1]
+
+    def get_resource_metadata(project_id: str, path: str) -> dict:
+        assert project_id == "project"
+        if path not in content:
+            raise HTTPError("404 Client Error")
+        return {"name": path, "size": len(content[path]), "modified": modified.get(path, "t0")}
+
+    monkeypatch.setattr(file_module, "get_resource_response", get_resource_response)
+    monkeypatch.setattr(file_module, "get_resource_metadata", get_resource_metadata)
+    monkeypatch.setattr(File, "archive_pool", ArchivePool())
+    return {"content": content, "modified": modified, "responses": responses}
+
+
+def _archive(stream: io.IOBase | None = None) -> bytes:
+    """Create an archive with a stored and a deflated entry."""
+    target = stream if stream is not None else io.BytesIO()
+    entries = [
+        ("skipped.bin", bytes(range(256)) * 100, zipfile.ZIP_DEFLATED),
+        ("stored.txt", b"stored", zipfile.ZIP_STORED),
+        ("data/ä.txt", TEXT.encode(), zipfile.ZIP_DEFLATED),
+    ]
+    with zipfile.ZipFile(target, "w") as archive:  # type: ignore[arg-type]
+        for name, data, compress_type in entries:
+            info = zipfile.ZipInfo(name)
+            info.compress_type = compress_type
+            with archive.open(info, "w") as entry:
+                entry.write(data)
+    return target.getvalue() if isinstance(target, io.BytesIO) else b""
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_prepare_unseekable_stream(compress: bool) -> None:
+    """Test sniffing text and gzip through `peek`, without seeking."""
+    content = TEXT.encode()
+    stream, is_text = _prepare_stream_for_processing(
+        _Unseekable(gzip.compress(content) if compress else content)
+    )
+    assert is_text
+    assert stream.read() == TEXT
+    stream, is_text = _prepare_stream_for_processing(_Unseekable(b"\x00\xff" * 1000))
+    assert not is_text
+    assert stream.read() == b"\x00\xff" * 1000
+
+
+def test_sniff_character_at_sample_end() -> None:
+    """Test that a multibyte character cut off by the sample does not make text binary."""
+    _, is_text = _prepare_stream_for_processing(_Unseekable(b"a" + "ä".encode() * 1000))
+    assert is_text
+
+
+def test_project_file_streams_response(resources: dict) -> None:
+    """Test that project files are read from the response as they are consumed."""
+    resources["content"]["large.txt"] = TEXT.encode() * 100
+    file = ProjectFile("large.txt")
+    with file.text_stream("project") as stream:
+        assert stream.readline() == "äöü line\n"
+        assert resources["responses"][0].raw.read_size < len(TEXT.encode()) * 10
+    with pytest.raises(FileNotFoundError, match="missing"):
+        ProjectFile("missing").read_stream("project")
+
+
+def test_project_file_streams_zip_entries(resources: dict) -> None:
+    """Test that the first entry is streamed and further entries are read from the pool."""
+    resources["content"]["archive.zip"] = _archive()
+    assert ProjectFile("archive.zip", entry_path="data/ä.txt").read_text("project") == TEXT
+    assert resources["responses"][0].raw.closed
+    assert len(File.archive_pool) == 0
+    assert ProjectFile("archive.zip", entry_path="stored.txt").read_text("project") == "stored"
+    assert ProjectFile("archive.zip", entry_path="data/ä.txt").read_text("project") == TEXT
+    assert len(File.archive_pool) == 1
+    with pytest.raises(FileNotFoundError, match="Entry 'other'"):
+        ProjectFile("archive.zip", entry_path="other").read_stream("project")
+    assert len(resources["responses"]) == 2
+    resources["modified"]["archive.zip"] = "t1"
+    assert ProjectFile("archive.zip", entry_path="stored.txt").read_text("project") == "stored"
+    assert len(resources["responses"]) == 3
+
+
+def test_project_file_spools_zip_entries(resources: dict) -> None:
+    """Test that archives with entry sizes after the entry data are spooled."""
+    unseekable = _Sink()
+    _archive(unseekable)
+    resources["content"]["archive.zip"] = unseekable.getvalue()
+    assert ProjectFile("archive.zip", entry_path="data/ä.txt").read_text("project") == TEXT
+    assert len(resources["responses"]) == 2
+    with pytest.raises(FileNotFoundError, match="Entry 'other'"):
+        ProjectFile("archive.zip", entry_path="other").read_stream("project")
+
+
+class _Sink(io.BytesIO):
+    """A stream that can only be written forward, which makes archives use data descriptors."""
+
+    def seekable(self) -> bool:
+        return False
+
+    def seek(self, *args: object) -> int:
+        raise io.UnsupportedOperation
+
+    def tell(self) -> int:
+        raise io.UnsupportedOperation
+
+
+def test_probe_local_file(tmp_path: Path) -> None:
+    """Test that local files are probed once per version."""
+    path = tmp_path / "data.json"
+    path.write_text('{"a": "ä"}')
+    file = LocalFile(str(path))
+    metadata = file.probe("project")
+    assert metadata == FileMetadata(
+        compression=None,
+        is_text=True,
+        size=len('{"a": "ä"}'.encode()),
+        mime="application/json",
+        version=file.version("project"),
+    )
+    assert file.mime == "application/json"
+    assert file.probe("project") is metadata
+    path.write_bytes(gzip.compress(b"\x00\xff" * 100))
+    os.utime(path, ns=(0, 0))
+    assert file.is_bytes("project")
+    assert file.probe("project").compression == "gzip"
+    assert file.mime == "application/json"
+    pdf = LocalFile(str(Path(__file__).parent.parent / "fixture" / "sample.pdf"), mime="x/y")
+    assert pdf.probe("project").mime == "application/pdf"
+    assert pdf.mime == "x/y"
+
+
+def test_probe_project_file(resources: dict) -> None:
+    """Test that project files are not downloaded again while their version is unchanged."""
+    resources["content"]["notes"] = b"plain text"
+    file = ProjectFile("notes")
+    assert file.is_text("project")
+    assert not file.is_bytes("project")
+    metadata = file.probe("project")
+    assert (metadata.size, metadata.mime) == (10, "text/plain")
+    assert len(resources["responses"]) == 1
+    resources["modified"]["notes"] = "t1"
+    assert file.is_text("project")
+    assert len(resources["responses"]) == 2
+    file.probe("project", refresh=True)
+    assert len(resources["responses"]) == 3
+    resources["content"]["archive.zip"] = _archive()
+    entry = ProjectFile("archive.zip", entry_path="data/ä.txt")
+    assert entry.probe("project").size is None
+    assert entry.mime == "text/plain"
+    with pytest.raises(FileNotFoundError, match="missing"):
+        ProjectFile("missing").is_text("project")
+
+
+def test_local_file_buffer(tmp_path: Path) -> None:
+    """Test that uncompressed local files are memory-mapped."""
+    path = tmp_path / "lines.txt"
+    path.write_bytes(b"first\nsecond\r\n\nlast")
+    file = LocalFile(str(path))
+    with file.buffer("project") as view:
+        assert isinstance(view.obj, mmap.mmap)
+        assert view.readonly
+        assert bytes(view[6:12]) == b"second"
+    with pytest.raises(ValueError, match="released"):
+        bytes(view)
+    lines = [bytes(_) for _ in file.iter_lines("project")]
+    assert lines == [b"first\n", b"second\r\n", b"\n", b"last"]
+    kept = next(file.iter_lines("project"))
+    assert bytes(kept) == b"first\n"
+
+
+@pytest.mark.parametrize("content", [b"", gzip.compress(b"a\nb\n")])
+def test_local_file_buffer_in_memory(tmp_path: Path, content: bytes) -> None:
+    """Test that empty and compressed files are read into memory."""
+    path = tmp_path / "data"
+    path.write_bytes(content)
+    file = LocalFile(str(path))
+    with file.buffer("project") as view:
+        assert isinstance(view.obj, bytes)
+        assert bytes(view) == (gzip.decompress(content) if content else b"")
+    assert [bytes(_) for _ in file.iter_lines("project")] == ([b"a\n", b"b\n"] if content else [])
+
+
+def test_project_file_buffer(resources: dict) -> None:
+    """Test that the content of project files and archive entries is buffered."""
+    resources["content"]["archive.zip"] = _archive()
+    file = ProjectFile("archive.zip", entry_path="stored.txt")
+    with file.buffer("project") as view:
+        assert bytes(view) == b"stored"
+    assert [bytes(_) for _ in file.iter_lines("project")] == [b"stored"]
+
+
+# a byte order mark, CRLF line breaks and an invalid byte after the sniffed sample
+RAW_TEXT = b"\xef\xbb\xbf" + "ä line\r\n".encode() * 200 + b"\xff end"
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_bytes_pass_through(tmp_path: Path, compress: bool) -> None:
+    """Test that the decompressed bytes are read unchanged, without decoding text."""
+    path = tmp_path / "raw.txt"
+    path.write_bytes(gzip.compress(RAW_TEXT) if compress else RAW_TEXT)
+    file = LocalFile(str(path))
+    assert file.is_text("project")
+    assert file.read_bytes("project") == RAW_TEXT
+    with file.bytes_stream("project") as stream:
+        assert stream.read() == RAW_TEXT
+    chunks = list(file.iter_chunks("project", size=100))
+    assert b"".join(chunks) == RAW_TEXT
+    assert {len(_) for _ in chunks[:-1]} == {100}
+    with pytest.raises(ValueError, match="positive"):
+        next(file.iter_chunks("project", size=0))
+
+
+def test_bytes_check_utf8(tmp_path: Path) -> None:
+    """Test the optional incremental UTF-8 check and transcoding to other encodings."""
+    path = tmp_path / "raw.txt"
+    path.write_bytes(RAW_TEXT)
+    file = LocalFile(str(path))
+    chunks = file.iter_chunks("project", size=1024, check_utf8=True)
+    assert next(chunks) == RAW_TEXT[:1024]
+    with pytest.raises(UnicodeDecodeError):
+        list(chunks)
+    valid = RAW_TEXT[: -len(b"\xff end")]
+    path.write_bytes(valid)
+    with file.bytes_stream("project", check_utf8=True) as stream:
+        assert b"".join(iter(partial(stream.read, 7), b"")) == valid
+    path.write_bytes(valid[:-2] + "ä".encode()[:1])
+    with file.bytes_stream("project", check_utf8=True) as stream, pytest.raises(UnicodeDecodeError):
+        stream.read()
+    path.write_bytes("ä line\n".encode())
+    with file.bytes_stream("project", encoding="latin-1") as stream:
+        assert stream.read() == "ä line\n".encode("latin-1")
+    with file.bytes_stream("project", encoding="UTF8") as stream:
+        assert stream.read() == "ä line\n".encode()
+
+
+@needs_benchmark
+def test_bytes_stream_benchmark(tmp_path: Path) -> None:
+    """Compare copying text byte for byte with decoding and encoding it again."""
+    path = tmp_path / "large.txt"
+    path.write_bytes("äöü line\n".encode() * 2_000_000)
+    file = LocalFile(str(path))
+    start = time.perf_counter()
+    with file.text_stream("project") as text_stream:
+        for chunk in iter(partial(text_stream.read, 65536), ""):
+            chunk.encode()
+    round_trip_time = time.perf_counter() - start
+    start = time.perf_counter()
+    copied = sum(len(_) for _ in file.iter_chunks("project"))
+    copy_time = time.perf_counter() - start
+    print(f"round trip: {round_trip_time:.3f}s, copy: {copy_time:.3f}s")  # noqa: T201
+    assert copied == path.stat().st_size
+    assert copy_time < round_trip_time / 2
+
+
+@needs_benchmark
+def test_buffer_benchmark(tmp_path: Path) -> None:
+    """Compare iterating over the lines of a memory-mapped file with reading it into memory."""
+    path = tmp_path / "large.bin"
+    path.write_bytes((b"x" * 99 + b"\n") * 500_000)
+    file = LocalFile(str(path))
+    tracemalloc.start()
+    start = time.perf_counter()
+    copied = len(file.read_bytes("project").splitlines())
+    read_time = time.perf_counter() - start
+    read_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    mapped = sum(1 for _ in file.iter_lines("project"))
+    buffer_time = time.perf_counter() - start
+    buffer_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(  # noqa: T201
+        f"read_bytes: {read_time:.3f}s, {read_peak / 2**20:.0f} MiB, "
+        f"buffer: {buffer_time:.3f}s, {buffer_peak / 2**20:.0f} MiB"
+    )
+    assert copied == mapped
+    assert buffer_peak < read_peak / 10
+
+
+def test_archive_pool(tmp_path: Path) -> None:
+    """Test that archives are shared, evicted and closed with their last open entry."""
+    pool = ArchivePool(max_size=1)
+    opened: list[zipfile.ZipFile] = []
+
+    def open_archive(path: Path) -> zipfile.ZipFile:
+        opened.append(zipfile.ZipFile(path))
+        return opened[-1]
+
+    paths = [tmp_path / "a.zip", tmp_path / "b.zip"]
+    for path in paths:
+        path.write_bytes(_archive())
+    with pool.open("a", "stored.txt", partial(open_archive, paths[0])) as first:
+        with pool.open("a", "data/ä.txt", partial(open_archive, paths[0])) as second:
+            assert second.read().decode() == TEXT
+        assert len(opened) == 1
+        with pool.open("b", "stored.txt", partial(open_archive, paths[1])) as third:
+            assert "a" not in pool
+            assert first.read() == third.read() == b"stored"
+        assert opened[0].fp is not None
+    assert opened[0].fp is None
+    assert opened[1].fp is not None
+    with pytest.raises(KeyError):
+        pool.open("b", "other", partial(open_archive, paths[1]))
+    pool.clear()
+    assert len(pool) == 0
+    assert opened[1].fp is None
+    with pytest.raises(ValueError, match="negative"):
+        ArchivePool(-1)
+
+
+def test_local_file_entries_share_archive(tmp_path: Path) -> None:
+    """Test that entries of local archives are read from a pooled archive."""
+    path = tmp_path / "archive.zip"
+    path.write_bytes(_archive())
+    pool = ArchivePool()
+    files = [LocalFile(str(path), entry_path=_) for _ in ("stored.txt", "data/ä.txt")]
+    for file in files:
+        file.archive_pool = pool
+    assert files[0].read_text("project") == "stored"
+    assert files[1].read_text("project") == TEXT
+    assert len(pool) == 1
+    path.write_bytes(_archive())
+    os.utime(path, ns=(0, 0))
+    assert files[0].read_text("project") == "stored"
+    assert len(pool) == 2
+    missing = LocalFile(str(path), entry_path="other")
+    missing.archive_pool = pool
+    with pytest.raises(FileNotFoundError, match="Entry 'other'"):
+        missing.read_stream("project")
+
+
+@needs_benchmark
+def test_archive_pool_benchmark(tmp_path: Path) -> None:
+    """Compare reading many entries through the pool with opening the archive each time."""
+    path = tmp_path / "many.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        for index in range(1_000):
+            archive.writestr(f"entry-{index}.txt", f"entry {index}")
+    names = [f"entry-{_}.txt" for _ in range(1_000)]
+    start = time.perf_counter()
+    for name in names:
+        with zipfile.ZipFile(path) as archive, archive.open(name) as entry:
+            entry.read()
+    reopen_time = time.perf_counter() - start
+    pool = ArchivePool()
+    start = time.perf_counter()
+    for name in names:
+        file = LocalFile(str(path), entry_path=name)
+        file.archive_pool = pool
+        with file.read_stream("project") as entry:
+            entry.read()
+    pool_time = time.perf_counter() - start
+    print(f"reopen: {reopen_time:.2f}s, pool: {pool_time:.2f}s")  # noqa: T201
+    assert pool_time < reopen_time / 5
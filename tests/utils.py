@@ -1,10 +1,12 @@
 """Testing utilities."""
 
 import os
+from collections.abc import Iterable, Iterator
 
 import pytest
 
 from cmem_plugin_base.dataintegration.context import PluginContext
+from cmem_plugin_base.dataintegration.entity import Entities
 from cmem_plugin_base.dataintegration.types import ParameterType
 
 needs_cmem = pytest.mark.skipif(
@@ -24,3 +26,46 @@ def get_autocomplete_values(
             query_terms=query_terms, depend_on_parameter_values=[], context=context
         )
     ]
+
+
+def tracked[T](items: Iterable[T], consumed: list[int] | None = None) -> Iterator[T]:
+    """Yield items lazily and record the index of each consumed item.
+
+    This allows to test that entities or records are consumed lazily.
+    """
+    for index, item in enumerate(items):
+        if consumed is not None:
+            consumed.append(index)
+        yield item
+
+
+needs_benchmark = pytest.mark.skipif(
+    # benchmarks are expensive, so they only run if explicitly requested
+    "CMEM_BENCHMARK" not in os.environ,
+    reason="Needs CMEM_BENCHMARK environment variable",
+)
+
+
+def canonical_entities(entities: Entities) -> list[tuple[list[tuple], list[list[list[str]]]]]:
+    """Get the schemata and values of entities and their sub entities in order.
+
+    URIs are replaced by the position of their entity, so that entities built with
+    different URIs can be compared, including the order of the sub entity collections.
+    """
+    collections = [entities, *(entities.sub_entities or [])]
+    materialized = [list(_.entities) for _ in collections]
+    positions = {
+        entity.uri: f"{collection}:{index}"
+        for collection, items in enumerate(materialized)
+        for index, entity in enumerate(items)
+    }
+    return [
+        (
+            [(_.path, _.is_relation, _.is_single_value) for _ in collection.schema.paths],
+            [
+                [[positions.get(value, value) for value in values] for values in entity.values]
+                for entity in items
+            ],
+        )
+        for collection, items in zip(collections, materialized, strict=True)
+    ]